@@ -0,0 +1,244 @@
+import logging
+import threading
+from collections import OrderedDict
+
+from alert_filters import stored_filters
+from config import Config
+import db_manager
+
+logger = logging.getLogger(__name__)
+
+
+class AlertCache:
+    """Read-through, in-process cache of every stored alert, keyed by alert ID and by user.
+
+    ``start()`` loads all alerts once and then keeps them fresh from a Mongo
+    change stream, or, where change streams are unavailable (standalone
+    mongod), by polling the alerts version stamp in db_manager. Per-user
+    views are built on demand and kept in an LRU. Subscribers (such as a
+    matcher.AlertIndex) get add/remove calls for every change; see subscribe()
+    for the thread they arrive on.
+    """
+
+    def __init__(self, collection=None, max_users=None, poll_interval=None):
+        self._collection = collection
+        self._max_users = max_users
+        self._poll_interval = poll_interval
+        self.alerts = {}
+        self.by_user = {}
+        self.views = OrderedDict()
+        self.loaded = False
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.subscribers = []
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def collection(self):
+        # Resolved on first use so the module-level cache doesn't open a connection at import
+        return self._collection if self._collection is not None else db_manager.alerts_collection
+
+    @property
+    def max_users(self):
+        # Settings are read on use: the module-level cache is built at import, before Config loads
+        return self._max_users or Config.ALERT_CACHE_MAX_USERS
+
+    @property
+    def poll_interval(self):
+        return self._poll_interval or Config.ALERT_CACHE_POLL_INTERVAL
+
+    def subscribe(self, subscriber, loop=None):
+        """Register an object with add(alert_id, filters) / remove(alert_id) for change notifications.
+
+        The alerts already cached are added right away, from the calling
+        thread. Later changes come from whichever thread applied them (the
+        watch or poll thread, or a caller of refresh_users()), so a subscriber
+        that isn't thread-safe, such as an AlertIndex matched on an event loop,
+        must pass that ``loop``: its calls are then scheduled there with
+        call_soon_threadsafe(), in the order the changes were applied.
+        Subscribe from the loop's thread in that case, so the initial adds
+        don't race its own use of the subscriber.
+        """
+        with self._lock:
+            self.subscribers.append((subscriber, loop))
+            for alert_id, alert in self.alerts.items():
+                filters = stored_filters(alert)
+                if filters is not None:
+                    subscriber.add(alert_id, filters)
+
+    def _notify(self, method, *args):
+        for subscriber, loop in self.subscribers:
+            callback = getattr(subscriber, method)
+            if loop is None:
+                callback(*args)
+            else:
+                loop.call_soon_threadsafe(callback, *args)
+
+    def _put(self, alert):
+        alert_id = str(alert["_id"])
+        previous = self.alerts.get(alert_id)
+        if previous is not None and previous["user_id"] != alert["user_id"]:
+            self._discard(alert_id)
+        self.alerts[alert_id] = alert
+        self.by_user.setdefault(alert["user_id"], set()).add(alert_id)
+        self.views.pop(alert["user_id"], None)
+        if self.subscribers:
+            filters = stored_filters(alert)
+            if filters is None:
+                # Legacy filters that don't validate can't be matched; drop any earlier version
+                self._notify("remove", alert_id)
+            else:
+                self._notify("add", alert_id, filters)
+
+    def _discard(self, alert_id):
+        alert = self.alerts.pop(alert_id, None)
+        if alert is None:
+            return
+        user_ids = self.by_user.get(alert["user_id"])
+        if user_ids is not None:
+            user_ids.discard(alert_id)
+            if not user_ids:
+                del self.by_user[alert["user_id"]]
+        self.views.pop(alert["user_id"], None)
+        self._notify("remove", alert_id)
+
+    def load(self):
+        """(Re)load every alert, applying only the differences to subscribers."""
+        version = db_manager.get_alerts_version()
+        alerts = {str(alert["_id"]): alert for alert in self.collection.find()}
+        with self._lock:
+            for alert_id in set(self.alerts) - set(alerts):
+                self._discard(alert_id)
+            for alert_id, alert in alerts.items():
+                if self.alerts.get(alert_id) != alert:
+                    self._put(alert)
+            self.version = version
+            self.loaded = True
+
+    def get(self, alert_id):
+        """Return one alert by ID, or None."""
+        with self._lock:
+            if self.loaded:
+                alert = self.alerts.get(str(alert_id))
+                if alert is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                return alert
+            self.misses += 1
+        # Not loaded, so nothing keeps cached entries fresh: read through to Mongo
+        alerts = db_manager.get_alerts([alert_id])
+        return alerts[0] if alerts else None
+
+    def list_user_alerts(self, user_id):
+        """Return a user's alerts, from the cache whenever it is loaded."""
+        with self._lock:
+            view = self.views.get(user_id)
+            if view is not None:
+                self.views.move_to_end(user_id)
+                self.hits += 1
+                return view
+            self.misses += 1
+            if self.loaded:
+                view = [self.alerts[alert_id] for alert_id in sorted(self.by_user.get(user_id, ()))]
+                self.views[user_id] = view
+                if len(self.views) > self.max_users:
+                    self.views.popitem(last=False)
+                return view
+        # Not loaded (e.g. a web worker that never called start()): nothing would invalidate a cached
+        # view when another process writes, so read through to Mongo every time
+        return db_manager.list_alerts(user_id)
+
+    def refresh_user(self, user_id):
+        """Re-read one user's alerts after a local write, so the writer sees it immediately."""
+        self.refresh_users([user_id])
+
+    def refresh_users(self, user_ids):
+        """refresh_user() for several users with a single read."""
+        if not self.loaded:
+            # Reads go straight to Mongo until the cache is loaded, so there is nothing to refresh
+            return
+        user_ids = set(user_ids)
+        alerts = db_manager.list_users_alerts(user_ids)
+        current = {str(alert["_id"]) for alert in alerts}
+        with self._lock:
+            for user_id in user_ids:
+                for alert_id in self.by_user.get(user_id, set()) - current:
+                    self._discard(alert_id)
+            for alert in alerts:
+                self._put(alert)
+
+    def stats(self):
+        return {"alerts": len(self.alerts), "users": len(self.by_user), "views": len(self.views),
+                "hits": self.hits, "misses": self.misses}
+
+    def start(self):
+        """Load all alerts and keep them fresh from a background thread.
+
+        The change stream is opened before the load, so writes made while
+        loading are replayed from it instead of being missed.
+        """
+        stream = self._open_stream()
+        self.load()
+        self._thread = threading.Thread(target=self._follow, args=(stream,), name="alert-cache", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _open_stream(self):
+        """A change stream on the alerts, or None where there are none (standalone mongod, mongomock)."""
+        from pymongo.errors import PyMongoError
+
+        if not hasattr(type(self.collection), "watch"):
+            logger.info("Collection has no change streams; polling alerts version instead")
+            return None
+        try:
+            return self.collection.watch(full_document="updateLookup", max_await_time_ms=1000)
+        except PyMongoError as e:
+            logger.info("Change streams unavailable (%s); polling alerts version instead", e)
+            return None
+
+    def _follow(self, stream):
+        from pymongo.errors import PyMongoError
+
+        if stream is not None:
+            try:
+                self._watch(stream)
+            except PyMongoError as e:
+                logger.warning("Alert change stream failed (%s); polling alerts version instead", e)
+            else:
+                if self._stop.is_set():
+                    return
+                logger.info("Alert change stream closed; polling alerts version instead")
+        # The first poll compares versions, so changes made since the stream ended are picked up
+        self._poll()
+
+    def _watch(self, stream):
+        with stream:
+            # An invalidate event (collection dropped or renamed) closes the stream for good
+            while not self._stop.is_set() and stream.alive:
+                change = stream.try_next()
+                if change is None:
+                    continue
+                with self._lock:
+                    if change["operationType"] == "delete":
+                        self._discard(str(change["documentKey"]["_id"]))
+                    elif change.get("fullDocument") is not None:
+                        self._put(change["fullDocument"])
+
+    def _poll(self):
+        from pymongo.errors import PyMongoError
+
+        while not self._stop.wait(self.poll_interval):
+            try:
+                if db_manager.get_alerts_version() != self.version:
+                    self.load()
+            except PyMongoError as e:
+                logger.warning("Alert cache refresh failed: %s", e)
+
+
+alert_cache = AlertCache()
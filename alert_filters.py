@@ -0,0 +1,131 @@
+import hashlib
+import json
+import logging
+
+from keywords import parse_keywords
+
+logger = logging.getLogger(__name__)
+
+TIERS = (1, 2, 3)
+JOB_TYPES = {'0': 0, '1': 1, 'hourly': 0, 'fixed': 1}
+TRUE_VALUES = {'1', 'true', 'yes'}
+FALSE_VALUES = {'0', 'false', 'no'}
+RANGE_FIELDS = ('amount', 'client_hires', 'proposals')
+
+
+def parse_range(value):
+    """Parse '1000-4999', '5000-', '10+', '0' or a [low, high] pair into [low, high] (high None = open)."""
+    if isinstance(value, (list, tuple)):
+        if len(value) != 2:
+            raise ValueError(f"Invalid range: {value!r}")
+        low, high = value
+    else:
+        value = str(value).strip()
+        if value.endswith('+'):
+            low, high = value[:-1], None
+        elif '-' in value:
+            low, high = value.split('-', 1)
+            low, high = low or 0, high or None
+        else:
+            low = high = value
+    try:
+        low = float(low)
+        high = float(high) if high is not None else None
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid range: {value!r}")
+    if low < 0 or (high is not None and high < low):
+        raise ValueError(f"Invalid range: {value!r}")
+    return [low, high]
+
+
+def parse_bool(value):
+    """Parse the '1'/'0' style flags the wizard stores."""
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValueError(f"Invalid flag: {value!r}")
+
+
+def tier_mask(tiers):
+    """Fold a list of tiers (possibly with duplicates) into a bitmask; 0 means any tier."""
+    if isinstance(tiers, (str, int)):
+        tiers = [tiers]
+    mask = 0
+    for tier in tiers:
+        tier = int(tier)
+        if tier not in TIERS:
+            raise ValueError(f"Invalid contractor tier: {tier!r}")
+        mask |= 1 << tier
+    return mask
+
+
+def normalize_filters(filters):
+    """Validate raw alert filters and return their canonical, typed form.
+
+    Accepts the keys saved by the scraper wizard (contractor_tier, t, amount, ...) as
+    well as the ones posted by the web app form (experience, job_type).
+    """
+    if not isinstance(filters, dict):
+        raise ValueError("Filters must be an object")
+
+    category = filters.get('category')
+    if category in (None, ''):
+        category = None
+    else:
+        category = str(category)
+        if not category.isdigit():
+            raise ValueError(f"Invalid category: {category!r}")
+
+    tiers = filters.get('contractor_tier', filters.get('experience'))
+    job_type = filters.get('t', filters.get('job_type'))
+    if job_type in (None, ''):
+        job_type = None
+    elif str(job_type) in JOB_TYPES:
+        job_type = JOB_TYPES[str(job_type)]
+    else:
+        raise ValueError(f"Invalid job type: {job_type!r}")
+
+    normalized = {
+        'category': category,
+        'tier_mask': tier_mask(tiers) if tiers not in (None, '') else 0,
+        't': job_type,
+    }
+    for field in RANGE_FIELDS:
+        value = filters.get(field)
+        normalized[field] = parse_range(value) if value not in (None, '') else None
+    # Payment verification is a requirement: "No" means "don't care", not "unverified only"
+    payment_verified = filters.get('payment_verified')
+    normalized['payment_verified'] = parse_bool(payment_verified) if payment_verified not in (None, '') else False
+    contract_to_hire = filters.get('contract_to_hire')
+    normalized['contract_to_hire'] = parse_bool(contract_to_hire) if contract_to_hire not in (None, '') else None
+    keywords = filters.get('keywords')
+    if isinstance(keywords, list):
+        keywords = ', '.join(keywords)
+    normalized['keywords'] = parse_keywords(keywords) if keywords else None
+    return normalized
+
+
+def filters_hash(normalized):
+    """Stable hash of canonical filters, used to spot identical alerts."""
+    payload = json.dumps(normalized, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def stored_filters(alert):
+    """Canonical filters of a stored alert document, normalizing ones saved before write-time normalization.
+
+    Returns None for a legacy alert whose filters don't validate (the old
+    POST /alerts stored anything), so callers can skip it instead of failing.
+    """
+    filters = alert.get('filters') or {}
+    if 'filters_hash' in alert:
+        return filters
+    try:
+        return normalize_filters(filters)
+    except ValueError as e:
+        logger.warning("Skipping alert %s with invalid legacy filters: %s", alert.get('_id'), e)
+        return None
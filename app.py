@@ -1,9 +1,22 @@
-from flask import Flask, request, jsonify, render_template
-from db_manager import add_alert, list_alerts, delete_alert
+import hashlib
+from bisect import bisect_right
+
+import orjson
+from bson.errors import InvalidId
+from bson.objectid import ObjectId
+from flask import Flask, Response, request, jsonify, render_template
+from db_manager import add_alert, add_alerts_bulk, delete_alert, delete_alerts, ensure_indexes, get_client
+from db_manager import get_alerts as get_alerts_by_id, list_alerts_page
+from alert_cache import alert_cache
 from config import Config
+from log_setup import setup_logging
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, registry
 
 app = Flask(__name__)
-app.config.from_object(Config)
+_settings_loaded = False
+
+# Set by start_webhook() when the bot receives updates through this app
+webhook_server = None
 
 # Sample job categories for users to select
 categories = {
@@ -21,10 +34,46 @@ categories = {
     "Writing": "531770282580668423",
 }
 
+# Fields an alert can be projected to in API responses; "id" is always included
+ALERT_FIELDS = ("user_id", "filters", "filters_hash")
+
+def json_response(payload, status=200, etag=None):
+    """Serialize with orjson, which is several times faster than jsonify on large alert lists."""
+    response = Response(orjson.dumps(payload), status=status, mimetype='application/json')
+    if etag is not None:
+        response.set_etag(etag)
+    return response
+
+def not_modified(etag):
+    """304 response if the client already holds this ETag, else None."""
+    if etag in request.if_none_match:
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    return None
+
+def alert_to_json(alert, fields=ALERT_FIELDS):
+    """API representation of an alert document (ObjectId as a string)."""
+    result = {"id": str(alert["_id"])}
+    for field in fields:
+        if field in alert:
+            result[field] = alert[field]
+    return result
+
+@app.before_request
+def load_settings():
+    """Copy the settings into app.config on the first request, so importing the app reads no .env."""
+    global _settings_loaded
+    if not _settings_loaded:
+        app.config.from_mapping(Config.as_dict())
+        _settings_loaded = True
+
+_categories_etag = hashlib.sha1(orjson.dumps(categories, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
 @app.route('/categories', methods=['GET'])
 def get_categories():
     """Return available job categories."""
-    return jsonify(categories)
+    return not_modified(_categories_etag) or json_response(categories, etag=_categories_etag)
 
 @app.route('/alerts', methods=['POST'])
 def create_alert():
@@ -36,19 +85,105 @@ def create_alert():
     if not user_id or not filters:
         return jsonify({"error": "Missing user_id or filters"}), 400
 
-    add_alert(user_id, filters)
-    return jsonify({"message": "Alert created successfully"}), 201
+    try:
+        alert_id = add_alert(user_id, filters)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    alert_cache.refresh_user(user_id)
+    return jsonify({"message": "Alert created successfully", "id": alert_id}), 201
+
+@app.route('/alerts:batch', methods=['POST'])
+def create_alerts():
+    """Create many alerts, for any number of users, in one bulk write.
+
+    Body: {"alerts": [{"user_id": ..., "filters": {...}}, ...]}; returns the IDs in order.
+    """
+    items = (request.get_json(silent=True) or {}).get('alerts')
+    if not isinstance(items, list) or not items:
+        return json_response({"error": "Missing alerts"}, 400)
+    if any(not isinstance(item, dict) or not item.get('user_id') or not item.get('filters') for item in items):
+        return json_response({"error": "Every alert needs user_id and filters"}, 400)
+
+    try:
+        alert_ids = add_alerts_bulk([(item['user_id'], item['filters']) for item in items])
+    except ValueError as e:
+        return json_response({"error": str(e)}, 400)
+    alert_cache.refresh_users(item['user_id'] for item in items)
+    return json_response({"ids": alert_ids}, 201)
+
+@app.route('/alerts:batch', methods=['DELETE'])
+def remove_alerts():
+    """Delete many alerts by ID in one bulk write. Body: {"ids": [...]}."""
+    alert_ids = (request.get_json(silent=True) or {}).get('ids')
+    if not isinstance(alert_ids, list) or not alert_ids:
+        return json_response({"error": "Missing ids"}, 400)
+
+    if any(not isinstance(alert_id, str) or not ObjectId.is_valid(alert_id) for alert_id in alert_ids):
+        return json_response({"error": "ids must be alert IDs"}, 400)
+
+    try:
+        # One read for the owners, whose cached alerts are refreshed after the delete
+        user_ids = {alert["user_id"] for alert in get_alerts_by_id(alert_ids)}
+        deleted = delete_alerts(alert_ids)
+    except (InvalidId, TypeError) as e:
+        return json_response({"error": str(e)}, 400)
+    alert_cache.refresh_users(user_ids)
+    return json_response({"deleted": deleted}, 200)
 
 @app.route('/alerts/<user_id>', methods=['GET'])
 def get_alerts(user_id):
-    """Retrieve alerts for a specific user."""
-    alerts = list_alerts(user_id)
-    return jsonify(alerts)
+    """Retrieve a page of a user's alerts.
+
+    Query parameters: ``limit`` (page size), ``cursor`` (the ``next_cursor`` of
+    the previous page) and ``fields`` (comma-separated subset of ALERT_FIELDS).
+    Responses carry an ETag derived from alert IDs and filter hashes (the
+    user's whole list when the cache is loaded, else the page), so an
+    unchanged list costs a 304 and no serialization.
+    """
+    try:
+        limit = min(int(request.args.get('limit', Config.API_PAGE_SIZE)), Config.API_MAX_PAGE_SIZE)
+    except ValueError:
+        return json_response({"error": "limit must be an integer"}, 400)
+    if limit < 1:
+        return json_response({"error": "limit must be positive"}, 400)
+    fields = ALERT_FIELDS
+    if 'fields' in request.args:
+        fields = tuple(field for field in request.args['fields'].split(',') if field)
+        unknown = set(fields) - set(ALERT_FIELDS)
+        if unknown:
+            return json_response({"error": f"Unknown fields: {', '.join(sorted(unknown))}"}, 400)
+
+    # Alerts are ordered by ID, so the cursor is simply the last ID of the previous page
+    cursor = request.args.get('cursor', '')
+    if cursor and not ObjectId.is_valid(cursor):
+        return json_response({"error": "Invalid cursor"}, 400)
+    if alert_cache.loaded:
+        alerts = alert_cache.list_user_alerts(user_id)
+        start = bisect_right(alerts, cursor, key=lambda alert: str(alert["_id"]))
+        page, more = alerts[start:start + limit], start + limit < len(alerts)
+    else:
+        # Read through: the cursor, page size and projection go to Mongo, so only the page is read
+        alerts = list_alerts_page(user_id, cursor, limit + 1, fields + ("filters_hash",))
+        page, more = alerts[:limit], len(alerts) > limit
+    digest = hashlib.sha1(request.query_string)
+    for alert in alerts:
+        digest.update(f"{alert['_id']}:{alert.get('filters_hash')};".encode())
+    etag = digest.hexdigest()
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    next_cursor = str(page[-1]["_id"]) if more else None
+    body = {"alerts": [alert_to_json(alert, fields) for alert in page], "next_cursor": next_cursor}
+    return json_response(body, etag=etag)
 
 @app.route('/alerts/<alert_id>', methods=['DELETE'])
 def remove_alert(alert_id):
     """Delete a specific alert by its ID."""
+    alert = alert_cache.get(alert_id)
     delete_alert(alert_id)
+    if alert is not None:
+        alert_cache.refresh_user(alert["user_id"])
     return jsonify({"message": "Alert deleted successfully"}), 200
 
 # Route to render the alert form in a Web View
@@ -57,5 +192,61 @@ def alert_form():
     """Render the HTML form for alert setup."""
     return render_template("alert_form.html", categories=categories)
 
+@app.route('/telegram/webhook', methods=['POST'])
+def telegram_webhook():
+    """Receive a Telegram update and queue it for the bot's worker pool."""
+    if webhook_server is None or not webhook_server.ready.is_set():
+        return jsonify({"error": "Webhook not ready"}), 503
+    if Config.WEBHOOK_SECRET and request.headers.get('X-Telegram-Bot-Api-Secret-Token') != Config.WEBHOOK_SECRET:
+        return jsonify({"error": "Forbidden"}), 403
+    if not webhook_server.feed(request.get_json(force=True)):
+        # Worker queue is full; Telegram redelivers the update later
+        return jsonify({"error": "Busy"}), 503
+    return jsonify({"ok": True}), 200
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    """Liveness probe."""
+    return jsonify({"status": "ok"}), 200
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Readiness probe: Mongo reachable and, in webhook mode, the bot pipeline running."""
+    status = {}
+    try:
+        get_client().admin.command('ping')
+        status["mongo"] = True
+    except Exception:
+        status["mongo"] = False
+    if webhook_server is not None:
+        status["webhook"] = webhook_server.health()
+    ready = status["mongo"] and (webhook_server is None or status["webhook"]["ready"])
+    return jsonify(status), 200 if ready else 503
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus scrape endpoint."""
+    return Response(registry.render(), mimetype=METRICS_CONTENT_TYPE)
+
+def start_webhook():
+    """Run the alert bot from this app in webhook mode instead of long polling."""
+    global webhook_server
+    from scraper import build_application
+    from webhook import WebhookServer
+
+    alert_cache.start()
+    webhook_server = WebhookServer(build_application())
+    webhook_server.start(Config.WEBHOOK_URL, Config.WEBHOOK_SECRET)
+
+def main(host=None, port=None, debug=True):
+    """Run the API (and, if WEBHOOK_URL is set, the bot in webhook mode)."""
+    setup_logging()
+    ensure_indexes()
+    if Config.WEBHOOK_URL:
+        start_webhook()
+    else:
+        alert_cache.start()
+    app.run(host=host, port=port, debug=debug, use_reloader=False)
+
 if __name__ == '__main__':
-    app.run(debug=True)
+    main()
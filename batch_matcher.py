@@ -0,0 +1,153 @@
+import numpy as np
+
+from alert_filters import RANGE_FIELDS, stored_filters
+from keywords import KeywordIndex, job_text
+
+# Upper bound on the size of one job-chunk x alerts comparison matrix
+MAX_CELLS = 1 << 22
+
+
+class BatchMatcher:
+    """Columnar alert store that matches a whole batch of jobs with broadcasted comparisons.
+
+    Each alert is one row across NumPy columns (category code, tier bitmask,
+    job type, range bounds and flags), with "any" encoded so the comparison
+    always passes. Deleted rows are flagged inactive and reused by later adds.
+    This is the throughput path for backfills and large poll cycles; matcher.AlertIndex
+    remains the per-job path.
+    """
+
+    def __init__(self, capacity=1024):
+        self.categories = {}
+        self.alert_ids = []
+        self.rows = {}
+        self.free_rows = []
+        self.keywords = KeywordIndex()
+        self.size = 0
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        columns = {
+            'active': np.zeros(capacity, dtype=bool),
+            'category': np.full(capacity, -1, dtype=np.int32),
+            'tier_mask': np.zeros(capacity, dtype=np.uint8),
+            't': np.full(capacity, -1, dtype=np.int8),
+            'payment_verified': np.zeros(capacity, dtype=bool),
+            'contract_to_hire': np.full(capacity, -1, dtype=np.int8),
+        }
+        for field in RANGE_FIELDS:
+            columns[f'{field}_min'] = np.full(capacity, -np.inf)
+            columns[f'{field}_max'] = np.full(capacity, np.inf)
+        for name, column in columns.items():
+            old = getattr(self, name, None)
+            if old is not None:
+                column[:len(old)] = old
+            setattr(self, name, column)
+        self.alert_ids.extend([None] * (capacity - len(self.alert_ids)))
+        self.capacity = capacity
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _category_code(self, category):
+        if category is None:
+            return -1
+        return self.categories.setdefault(category, len(self.categories))
+
+    def add(self, alert_id, filters):
+        """Store an alert's canonical filters, replacing any previous version."""
+        self.remove(alert_id)
+        if self.free_rows:
+            row = self.free_rows.pop()
+        else:
+            if self.size == self.capacity:
+                self._allocate(self.capacity * 2)
+            row = self.size
+            self.size += 1
+        self.rows[alert_id] = row
+        self.alert_ids[row] = alert_id
+        self.active[row] = True
+        self.category[row] = self._category_code(filters.get('category'))
+        self.tier_mask[row] = filters.get('tier_mask') or 0
+        self.t[row] = -1 if filters.get('t') is None else filters['t']
+        self.payment_verified[row] = bool(filters.get('payment_verified'))
+        contract_to_hire = filters.get('contract_to_hire')
+        self.contract_to_hire[row] = -1 if contract_to_hire is None else int(contract_to_hire)
+        for field in RANGE_FIELDS:
+            low, high = filters.get(field) or (None, None)
+            getattr(self, f'{field}_min')[row] = -np.inf if low is None else low
+            getattr(self, f'{field}_max')[row] = np.inf if high is None else high
+        if filters.get('keywords'):
+            self.keywords.add(alert_id, filters['keywords'])
+
+    def remove(self, alert_id):
+        row = self.rows.pop(alert_id, None)
+        if row is None:
+            return
+        self.active[row] = False
+        self.alert_ids[row] = None
+        self.free_rows.append(row)
+        self.keywords.remove(alert_id)
+
+    def load(self, alerts):
+        """Store alert documents as returned by db_manager."""
+        for alert in alerts:
+            filters = stored_filters(alert)
+            if filters is not None:
+                self.add(str(alert['_id']), filters)
+
+    def _job_columns(self, jobs):
+        unknown = len(self.categories)
+        return {
+            # Categories no alert mentions get a code that only matches "any category"
+            'category': np.array([self.categories.get(job.category, unknown) for job in jobs], dtype=np.int32),
+            'tier_bit': np.array([1 << job.tier if 0 < job.tier < 8 else 0 for job in jobs], dtype=np.uint8),
+            't': np.array([job.t for job in jobs], dtype=np.int8),
+            'payment_verified': np.array([job.payment_verified for job in jobs], dtype=bool),
+            'contract_to_hire': np.array([job.contract_to_hire for job in jobs], dtype=np.int8),
+            **{field: np.array([getattr(job, field) for job in jobs], dtype=np.float64) for field in RANGE_FIELDS},
+        }
+
+    def match_matrix(self, jobs):
+        """Match a batch of jobs; returns the sparse match matrix as (job indices, alert rows)."""
+        n = self.size
+        if not jobs or not n:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+        columns = self._job_columns(jobs)
+        active = self.active[:n]
+        category, tier_mask, t = self.category[:n], self.tier_mask[:n], self.t[:n]
+        payment, contract = self.payment_verified[:n], self.contract_to_hire[:n]
+        bounds = {field: (getattr(self, f'{field}_min')[:n], getattr(self, f'{field}_max')[:n])
+                  for field in RANGE_FIELDS}
+        job_rows, alert_rows = [], []
+        step = max(1, MAX_CELLS // n)
+        for start in range(0, len(jobs), step):
+            chunk = slice(start, start + step)
+            job = {name: values[chunk, None] for name, values in columns.items()}
+            mask = active & ((category == -1) | (category == job['category']))
+            mask &= (tier_mask == 0) | ((tier_mask & job['tier_bit']) != 0)
+            mask &= (t == -1) | (t == job['t'])
+            mask &= ~payment | job['payment_verified']
+            mask &= (contract == -1) | (contract == job['contract_to_hire'])
+            for field, (low, high) in bounds.items():
+                mask &= (low <= job[field]) & (job[field] <= high)
+            rows, cols = np.nonzero(mask)
+            job_rows.append(rows + start)
+            alert_rows.append(cols)
+        return np.concatenate(job_rows), np.concatenate(alert_rows)
+
+    def match_batch(self, jobs):
+        """Return one set of matching alert ids per job, keyword expressions included."""
+        job_rows, alert_rows = self.match_matrix(jobs)
+        results = [set() for _ in jobs]
+        alert_ids = self.alert_ids
+        for job_index, row in zip(job_rows.tolist(), alert_rows.tolist()):
+            results[job_index].add(alert_ids[row])
+        if len(self.keywords):
+            with_keywords = self.keywords.alert_ids
+            for job, matched in zip(jobs, results):
+                keyword_alerts = matched & with_keywords
+                if keyword_alerts:
+                    matched -= keyword_alerts
+                    matched |= keyword_alerts & self.keywords.match(job_text(job))
+        return results
@@ -0,0 +1,794 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+
+from alert_filters import normalize_filters
+from matcher import AlertIndex, matches
+from synthetic import (CATEGORY_IDS, KEYWORD_VOCABULARY, FakeBotApiHandler, fixture_server, parse_with_bs4,
+                       random_filters, random_job, random_keywords)
+
+# Benchmarks run against local stand-ins unless pointed at a real database
+os.environ.setdefault('MONGODB_URI', 'mongomock://')
+os.environ.setdefault('MONGODB_DB', 'benchmark')
+
+
+def bench_alert_index(n_alerts=100_000, n_jobs=200, seed=42):
+    """Compare AlertIndex.match with a full scan over every alert."""
+    rng = random.Random(seed)
+    alerts = {str(i): normalize_filters(random_filters(rng)) for i in range(n_alerts)}
+    jobs = [random_job(rng, i) for i in range(n_jobs)]
+
+    start = time.perf_counter()
+    index = AlertIndex()
+    for alert_id, filters in alerts.items():
+        index.add(alert_id, filters)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    indexed = [index.match(job) for job in jobs]
+    indexed_time = time.perf_counter() - start
+
+    scan_jobs = jobs[:max(1, n_jobs // 20)]
+    start = time.perf_counter()
+    scanned = [{a for a, f in alerts.items() if matches(f, job)} for job in scan_jobs]
+    scan_time = time.perf_counter() - start
+    assert scanned == indexed[:len(scan_jobs)], "index disagrees with full scan"
+
+    print(f"alerts={n_alerts} build={build:.2f}s")
+    print(f"index: {n_jobs / indexed_time:,.0f} jobs/sec "
+          f"(avg {sum(map(len, indexed)) / n_jobs:,.0f} matches/job)")
+    print(f"scan:  {len(scan_jobs) / scan_time:,.1f} jobs/sec")
+
+
+class _FixtureFeedHandler(BaseHTTPRequestHandler):
+    """Local stand-in for the Upwork search page that supports ETag revalidation; set ``body`` to the page."""
+
+    protocol_version = 'HTTP/1.1'
+    body = b''
+    etag = '"fixture-v1"'
+
+    def do_GET(self):
+        time.sleep(0.02)
+        if self.headers.get('If-None-Match') == self.etag:
+            self.send_response(304)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', self.etag)
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def bench_feed(n_alerts=10_000, cycles=3, seed=42, fixture='fixtures/search_page.html'):
+    """Poll a local fixture feed for every distinct alert query and report per-cycle stats."""
+    from feed import FeedPoller, group_alerts_by_query
+
+    rng = random.Random(seed)
+    alerts = [{'_id': i, 'filters': normalize_filters(random_filters(rng))} for i in range(n_alerts)]
+    groups = group_alerts_by_query(alerts)
+    with open(fixture, 'rb') as f:
+        handler = type('Feed', (_FixtureFeedHandler,), {'body': f.read()})
+    server, url = fixture_server(handler)
+    poller = FeedPoller(base_url=url, concurrency=8)
+    try:
+        for cycle in range(cycles):
+            asyncio.run(poller.poll(groups))
+            stats = poller.last_cycle
+            print(f"cycle {cycle}: alerts={n_alerts} queries={stats['queries']} fetches={stats['fetches']} "
+                  f"not_modified={stats['not_modified']} errors={stats['errors']} "
+                  f"latency={stats['latency'] * 1000:.0f}ms")
+    finally:
+        poller.close()
+        server.shutdown()
+
+
+def _parsers(body):
+    from job_parser import iter_jobs_html
+
+    chunks = [body[i:i + 16384] for i in range(0, len(body), 16384)]
+    return {
+        'streaming': lambda: list(iter_jobs_html(chunks)),
+        'bs4': lambda: parse_with_bs4(body),
+    }
+
+
+def bench_parser(repeat=20, fixture='fixtures/search_page.html'):
+    """Compare the streaming tile parser with BeautifulSoup on jobs/sec and peak RSS.
+
+    Each parser's memory is measured in its own fresh interpreter as the
+    growth of peak RSS over one parse, so neither earlier benchmarks nor the
+    other parser's garbage count against it.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    with open(fixture) as f:
+        body = f.read()
+    parsers = _parsers(body)
+    streamed = parsers['streaming']()
+    assert streamed == parsers['bs4'](), "streaming parser disagrees with bs4"
+    # "Less than 5" tiles have to land in the wizard's 0-4 proposals range
+    assert min(job.proposals for job in streamed) == 0, "no tile parsed as having fewer than 5 proposals"
+    for name, parse in parsers.items():
+        start = time.perf_counter()
+        for _ in range(repeat):
+            jobs = parse()
+        elapsed = time.perf_counter() - start
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as pool:
+            growth = pool.submit(_parse_peak_rss, name, fixture).result()
+        print(f"{name:>9}: {len(jobs) * repeat / elapsed:,.0f} jobs/sec, peak RSS +{growth * 1024:,.0f} KiB")
+
+
+def _parse_peak_rss(name, fixture):
+    """Peak RSS growth in MiB while one parser parses the fixture once, imports already done."""
+    import importlib
+
+    # Import up front so module loading isn't counted as parsing
+    importlib.import_module('bs4')
+    with open(fixture) as f:
+        parse = _parsers(f.read())[name]
+    before = peak_rss_mb()
+    parse()
+    return peak_rss_mb() - before
+
+
+def bench_dispatcher(n_chats=500, jobs_per_chat=4, seed=42):
+    """Deliver digests for many chats through a fake Bot API and report throughput and latency.
+
+    tests/test_dispatcher.py checks that delivery is exactly once against the same fake API.
+    """
+    import mongomock
+    from telegram import Bot
+    from telegram.request import HTTPXRequest
+    from dispatcher import NotificationDispatcher
+
+    rng = random.Random(seed)
+    server, url = fixture_server(FakeBotApiHandler)
+    outbox = mongomock.MongoClient().db.outbox
+    # Start the 429 cadence at a fixed point, so a run always hits some
+    FakeBotApiHandler.requests_seen = 0
+    queued = [(chat_id, random_job(rng, f"{chat_id}-{n}")) for chat_id in range(n_chats) for n in range(jobs_per_chat)]
+
+    async def run():
+        request = HTTPXRequest(connection_pool_size=8)
+        async with Bot('123:fake', base_url=url.replace('/search', '/bot'), request=request) as bot:
+            dispatcher = NotificationDispatcher(bot, outbox=outbox, global_rate=1000, chat_rate=1, flush_interval=0.05)
+            await dispatcher.enqueue(queued)
+            start = time.perf_counter()
+            runner = asyncio.create_task(dispatcher.run())
+            while dispatcher.queue_depth:
+                await asyncio.sleep(0.01)
+            elapsed = time.perf_counter() - start
+            dispatcher.stop()
+            await runner
+            return dispatcher.metrics(), elapsed
+
+    try:
+        metrics, elapsed = asyncio.run(run())
+    finally:
+        server.shutdown()
+    print(f"jobs={metrics['sent']} messages={metrics['messages']} retried={metrics['retried']} "
+          f"outbox_left={outbox.count_documents({})} in {elapsed:.2f}s "
+          f"({metrics['messages'] / elapsed:,.0f} msg/sec), send p50={metrics['latency_p50'] * 1000:.0f}ms "
+          f"p99={metrics['latency_p99'] * 1000:.0f}ms")
+
+
+def synthetic_callback_updates(n_updates, n_chats, seed=42):
+    """Callback-query updates like the ones the alert wizard's buttons produce."""
+    rng = random.Random(seed)
+    choices = ['menu_new_alert', 'set_category', 'set_experience', 'set_job_type', 'experience_2',
+               f'category_{CATEGORY_IDS[0]}', 'jobtype_fixed', 'amount_100-499', 'menu_list_alerts']
+    for update_id in range(1, n_updates + 1):
+        chat_id = rng.randrange(1, n_chats + 1)
+        yield {
+            'update_id': update_id,
+            'callback_query': {
+                'id': str(update_id),
+                'from': {'id': chat_id, 'is_bot': False, 'first_name': 'user'},
+                'chat_instance': str(chat_id),
+                'data': rng.choice(choices),
+                'message': {'message_id': update_id, 'date': int(time.time()), 'text': 'menu',
+                            'chat': {'id': chat_id, 'type': 'private'}},
+            },
+        }
+
+
+def bench_webhook(n_updates=400, n_chats=100, workers=8):
+    """Replay a burst of callback queries through polling-style and webhook processing."""
+    import logging
+    from telegram import Update
+    from telegram.ext import Application, TypeHandler
+    from telegram.request import HTTPXRequest
+    from scraper import build_application
+    from webhook import UpdatePipeline
+
+    logging.disable(logging.INFO)
+    server, url = fixture_server(FakeBotApiHandler)
+
+    async def run(mode):
+        builder = (Application.builder().token('123:fake').base_url(url.replace('/search', '/bot'))
+                   .request(HTTPXRequest(connection_pool_size=workers)).updater(None))
+        application = build_application(builder)
+        submitted, latencies, done = {}, [], asyncio.Event()
+
+        async def record(update, context):
+            latencies.append(time.perf_counter() - submitted[update.update_id])
+            if len(latencies) == n_updates:
+                done.set()
+
+        application.add_handler(TypeHandler(Update, record), group=1)
+        async with application:
+            await application.start()
+            pipeline = UpdatePipeline(application, workers=workers, queue_size=n_updates)
+            await pipeline.start()
+            start = time.perf_counter()
+            for payload in synthetic_callback_updates(n_updates, n_chats):
+                update = Update.de_json(payload, application.bot)
+                submitted[update.update_id] = time.perf_counter()
+                if mode == 'polling':
+                    # What the long-poll updater does: one shared queue, processed in order
+                    await application.update_queue.put(update)
+                else:
+                    pipeline.submit(update)
+            await done.wait()
+            elapsed = time.perf_counter() - start
+            await pipeline.stop()
+            await application.stop()
+        latencies.sort()
+        return (f"{mode:>8}: {n_updates / elapsed:,.0f} updates/sec, "
+                f"p50={latencies[len(latencies) // 2] * 1000:.0f}ms "
+                f"p99={latencies[int(len(latencies) * 0.99)] * 1000:.0f}ms")
+
+    try:
+        for mode in ('polling', 'webhook'):
+            print(asyncio.run(run(mode)))
+    finally:
+        server.shutdown()
+        logging.disable(logging.NOTSET)
+
+
+def bench_keywords(n_alerts=50_000, n_jobs=200, seed=42):
+    """Compare the keyword automaton with evaluating every alert's expression per job."""
+    from keywords import KeywordIndex, evaluate, parse_keywords
+
+    rng = random.Random(seed)
+    expressions = {str(i): parse_keywords(random_keywords(rng)) for i in range(n_alerts)}
+    # Job posts mention a handful of skills amid ordinary prose
+    filler = [f"word{i}" for i in range(2000)]
+    texts = [' '.join(rng.sample(KEYWORD_VOCABULARY, 6) + rng.choices(filler, k=120)) for _ in range(n_jobs)]
+
+    start = time.perf_counter()
+    index = KeywordIndex()
+    for alert_id, expression in expressions.items():
+        index.add(alert_id, expression)
+    index.found_terms('')
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    indexed = [index.match(text) for text in texts]
+    indexed_time = time.perf_counter() - start
+
+    scan_texts = texts[:max(1, n_jobs // 20)]
+    start = time.perf_counter()
+    scanned = [{a for a, e in expressions.items() if evaluate(e, text)} for text in scan_texts]
+    scan_time = time.perf_counter() - start
+    assert scanned == indexed[:len(scan_texts)], "automaton disagrees with per-alert evaluation"
+
+    print(f"keyword alerts={n_alerts} build={build:.2f}s terms={len(index.term_ids)}")
+    print(f"automaton: {n_jobs / indexed_time:,.0f} jobs/sec "
+          f"(avg {sum(map(len, indexed)) / n_jobs:,.0f} matches/job)")
+    print(f"scan:      {len(scan_texts) / scan_time:,.1f} jobs/sec")
+
+
+def bench_batch(n_alerts=100_000, n_jobs=1000, seed=42):
+    """Compare the NumPy batch matcher with AlertIndex and check it against the scalar matcher."""
+    from batch_matcher import BatchMatcher
+
+    rng = random.Random(seed)
+    alerts = {}
+    for i in range(n_alerts):
+        filters = random_filters(rng)
+        if rng.random() < 0.2:
+            filters['keywords'] = random_keywords(rng)
+        alerts[str(i)] = normalize_filters(filters)
+    jobs = [random_job(rng, i)._replace(title=' '.join(rng.sample(KEYWORD_VOCABULARY, 5))) for i in range(n_jobs)]
+
+    batch, index = BatchMatcher(), AlertIndex()
+    for alert_id, filters in alerts.items():
+        batch.add(alert_id, filters)
+        index.add(alert_id, filters)
+    # Exercise row reuse before measuring
+    for alert_id in list(alerts)[::10]:
+        batch.remove(alert_id)
+        index.remove(alert_id)
+        del alerts[alert_id]
+
+    start = time.perf_counter()
+    batched = batch.match_batch(jobs)
+    batch_time = time.perf_counter() - start
+    start = time.perf_counter()
+    indexed = [index.match(job) for job in jobs]
+    index_time = time.perf_counter() - start
+    assert batched == indexed, "batch matcher disagrees with AlertIndex"
+    for job, matched in zip(jobs[:5], batched):
+        assert matched == {a for a, f in alerts.items() if matches(f, job)}, "batch matcher disagrees with matches()"
+
+    print(f"alerts={len(alerts)} jobs={n_jobs}")
+    print(f"batch: {n_jobs / batch_time:,.0f} jobs/sec")
+    print(f"index: {n_jobs / index_time:,.0f} jobs/sec")
+
+
+def bench_shards(n_alerts=50_000, n_jobs=1000, max_workers=None, seed=42):
+    """Throughput of the sharded matcher from 1 to N worker processes, resizing in place."""
+    from shard_workers import ShardedMatcher
+
+    max_workers = max_workers or os.cpu_count() or 1
+    rng = random.Random(seed)
+    alerts = [{'_id': str(i), 'user_id': rng.randrange(n_alerts // 3), 'filters': random_filters(rng)}
+              for i in range(n_alerts)]
+    jobs = [random_job(rng, i) for i in range(n_jobs)]
+    index = AlertIndex()
+    index.load(alerts)
+    expected = [index.match(job) for job in jobs[:50]]
+
+    sharded = ShardedMatcher(workers=1)
+    try:
+        sharded.add_many(alerts)
+        for workers in range(1, max_workers + 1):
+            sharded.resize(workers)
+            assert sharded.match_batch(jobs[:50]) == expected, "shards disagree with a single AlertIndex"
+            start = time.perf_counter()
+            sharded.match_batch(jobs)
+            elapsed = time.perf_counter() - start
+            print(f"workers={workers}: {n_jobs / elapsed:,.0f} jobs/sec")
+    finally:
+        sharded.close()
+
+
+# The pattern chain scraper.py registered before callbacks went through callback_router
+LEGACY_CALLBACK_PATTERNS = [
+    '^menu_', '^set_', '^experience_|alert_menu', '^category_|alert_menu', '^jobtype_|alert_menu',
+    '^amount_|alert_menu', '^client_hires_|alert_menu', '^delete_',
+]
+
+
+def bench_callbacks(n_updates=20_000, seed=42):
+    """Compare routing callback queries through the prefix-trie router with the old regex handler chain."""
+    from telegram import Update
+    from telegram.ext import CallbackQueryHandler
+    from scraper import CALLBACK_ROUTES, callback_router
+
+    async def noop(update, context):
+        pass
+
+    rng = random.Random(seed)
+    samples = ['menu_new_alert', 'set_category', 'set_experience', 'alert_menu', 'experience_2', 'jobtype_fixed',
+               f'category_{CATEGORY_IDS[0]}', 'amount_100-499', 'client_hires_1-9', 'delete_6650c0ffee0000000000abcd']
+    updates = []
+    for payload in synthetic_callback_updates(n_updates, 100, seed):
+        payload['callback_query']['data'] = rng.choice(samples)
+        updates.append(Update.de_json(payload, None))
+
+    legacy = [CallbackQueryHandler(noop, pattern=pattern) for pattern in LEGACY_CALLBACK_PATTERNS]
+    start = time.perf_counter()
+    for update in updates:
+        # What Application.process_update does: try each handler in order until one accepts
+        for handler in legacy:
+            if handler.check_update(update):
+                break
+    legacy_time = time.perf_counter() - start
+
+    routed = callback_router.handler()
+    start = time.perf_counter()
+    for update in updates:
+        if routed.check_update(update):
+            callback_router.resolve(update.callback_query.data)
+    router_time = time.perf_counter() - start
+
+    print(f"routes={len(CALLBACK_ROUTES)} legacy patterns={len(legacy)} updates={n_updates}")
+    print(f"regex chain: {n_updates / legacy_time:,.0f} callbacks/sec")
+    print(f"trie router: {n_updates / router_time:,.0f} callbacks/sec")
+
+
+# Approximate share of postings per category name in app.categories
+CATEGORY_SHARE = {
+    "Web, Mobile & Software Dev": 0.30,
+    "Design & Creative": 0.13,
+    "Sales & Marketing": 0.11,
+    "Writing": 0.09,
+    "Admin Support": 0.08,
+    "Data Science & Analytics": 0.07,
+    "Customer Service": 0.05,
+    "IT & Networking": 0.05,
+    "Engineering & Architecture": 0.04,
+    "Accounting & Consulting": 0.04,
+    "Translation": 0.03,
+    "Legal": 0.01,
+}
+PROPOSAL_LABELS = ['Less than 5', '5 to 10', '10 to 15', '15 to 20', '20 to 50', '50+']
+
+
+class SyntheticWorkload:
+    """Seeded generator of alerts and job postings with skewed, marketplace-like distributions.
+
+    Categories follow CATEGORY_SHARE over app.categories, experience tiers lean
+    intermediate, fixed budgets and hourly rates are log-normal, and job text
+    and alert keywords draw from the same Zipf-weighted vocabulary, so popular
+    terms are both common in jobs and commonly watched.
+    """
+
+    def __init__(self, seed=42):
+        from app import categories
+
+        self.rng = random.Random(seed)
+        self.category_ids = [categories[name] for name in CATEGORY_SHARE]
+        self.category_weights = list(CATEGORY_SHARE.values())
+        self.word_weights = [1 / rank for rank in range(1, len(KEYWORD_VOCABULARY) + 1)]
+        self.next_uid = 1_800_000_000_000_000_000
+
+    def category(self):
+        return self.rng.choices(self.category_ids, self.category_weights)[0]
+
+    def words(self, count):
+        return self.rng.choices(KEYWORD_VOCABULARY, self.word_weights, k=count)
+
+    def alert_filters(self):
+        """A filters dict like the scraper wizard saves, with weighted category and optional keywords."""
+        filters = random_filters(self.rng)
+        filters['category'] = self.category()
+        if self.rng.random() < 0.3:
+            filters['keywords'] = ', '.join(dict.fromkeys(self.words(self.rng.randint(1, 3))))
+        return filters
+
+    def alerts(self, n_alerts):
+        """(user_id, filters) pairs; most users keep one or two alerts, a few keep many."""
+        entries, user_id = [], 1000
+        while len(entries) < n_alerts:
+            user_id += 1
+            for _ in range(min(n_alerts - len(entries), int(self.rng.paretovariate(1.5)))):
+                entries.append((user_id, self.alert_filters()))
+        return entries
+
+    def job_item(self, category=None, t=None):
+        """One posting in the JSON search response format job_parser reads."""
+        self.next_uid += self.rng.randint(1, 5000)
+        t = self.rng.random() < 0.6 if t is None else t
+        item = {
+            'uid': str(self.next_uid),
+            'title': ' '.join(self.words(self.rng.randint(3, 7))).title(),
+            'description': ' '.join(self.words(self.rng.randint(30, 120))),
+            'category': category or self.category(),
+            'type': 'fixed' if t else 'hourly',
+            'tier': self.rng.choices(['Entry level', 'Intermediate', 'Expert'], [0.3, 0.5, 0.2])[0],
+            'proposals': self.rng.choices(PROPOSAL_LABELS, [0.3, 0.25, 0.15, 0.1, 0.15, 0.05])[0],
+            'clientHires': f"{int(self.rng.paretovariate(0.8)) - 1} hires",
+            'paymentVerified': self.rng.random() < 0.75,
+            'contractToHire': self.rng.random() < 0.15,
+            'postedOn': int(time.time()),
+        }
+        if t:
+            item['budget'] = round(self.rng.lognormvariate(5.7, 1.2), -1)
+        else:
+            low = round(self.rng.lognormvariate(3.0, 0.5))
+            item['hourlyRate'] = [low, low + self.rng.choice([5, 10, 20, 40])]
+        return item
+
+
+class _SyntheticFeedHandler(BaseHTTPRequestHandler):
+    """Local stand-in for the Upwork search API that posts fresh jobs between polls.
+
+    Each query keeps a page of its latest ``page_size`` jobs; every request adds
+    ``new_per_request`` new ones on top, so most of a page is already seen.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    workload = None
+    page_size = 50
+    new_per_request = 10
+    pages = {}
+    lock = threading.Lock()
+
+    def do_GET(self):
+        import json
+        from urllib.parse import parse_qs, urlparse
+
+        params = parse_qs(urlparse(self.path).query)
+        category = params.get('category2_uid', [None])[0]
+        t = int(params['t'][0]) if 't' in params else None
+        with self.lock:
+            page = self.pages.setdefault((category, t), [])
+            fresh = [self.workload.job_item(category, t) for _ in range(self.new_per_request)]
+            page[:0] = fresh
+            del page[self.page_size:]
+            body = json.dumps({'jobs': page}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _TimedIndex(AlertIndex):
+    """AlertIndex that records how long each match takes."""
+
+    def __init__(self):
+        super().__init__()
+        self.latencies = []
+
+    def match(self, job):
+        start = time.perf_counter()
+        result = super().match(job)
+        self.latencies.append(time.perf_counter() - start)
+        return result
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))] if values else 0
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process.
+
+    Linux's ru_maxrss carries the parent's high-water mark across fork and
+    exec, so VmHWM, which belongs to the current address space, is preferred.
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def bench_replay(n_alerts=2_000, cycles=3, seed=42):
+    """Run _replay() in a fresh interpreter, so its peak RSS doesn't include the benchmarks run before it."""
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(_replay, n_alerts, cycles, seed).result()
+
+
+def _replay(n_alerts, cycles, seed):
+    """Replay a synthetic workload through the full pipeline against local Upwork, Mongo and Bot API stand-ins.
+
+    Every distinct alert query is polled ``cycles`` times; each poll returns
+    fresh jobs mixed with ones seen before. Returns the metrics that
+    --save-baseline records and later runs are compared against. mongomock
+    scans a collection on every query, so keep n_alerts modest unless
+    MONGODB_URI points at a real server.
+    """
+    import logging
+    import shutil
+    import tempfile
+    from telegram import Bot
+    from telegram.request import HTTPXRequest
+    import db_manager
+    from alert_cache import AlertCache
+    from alert_filters import stored_filters
+    from dedup import SeenJobs
+    from dispatcher import NotificationDispatcher
+    from feed import FeedPoller, query_key
+    from job_store import JobStore
+    from pipeline import Pipeline
+
+    logging.disable(logging.INFO)
+    workload = SyntheticWorkload(seed)
+    db_manager.add_alerts_bulk(workload.alerts(n_alerts))
+    # Measure steady state: there is nothing stored yet to backfill these alerts with
+    db_manager.alerts_collection.update_many({}, {'$unset': {'backfill': ''}})
+    cache = AlertCache()
+    cache.load()
+    keys = sorted({query_key(stored_filters(alert)) for alert in cache.alerts.values()}, key=str)
+
+    handler = type('Feed', (_SyntheticFeedHandler,), {'workload': workload, 'pages': {}})
+    feed_server, feed_url = fixture_server(handler)
+    bot_server, bot_url = fixture_server(FakeBotApiHandler)
+
+    store_dir = tempfile.mkdtemp(prefix='jobstore-')
+
+    async def run():
+        request = HTTPXRequest(connection_pool_size=8)
+        async with Bot('123:fake', base_url=bot_url.replace('/search', '/bot'), request=request) as bot:
+            # Lift Telegram's per-chat limit so the run measures our side rather than the 1 msg/sec/chat cap
+            dispatcher = NotificationDispatcher(bot, outbox=db_manager.outbox_collection, global_rate=1000,
+                                                chat_rate=1000, flush_interval=0.05)
+            index = _TimedIndex()
+            pipeline = Pipeline(poller=FeedPoller(base_url=feed_url), seen=SeenJobs(db_manager.seen_jobs_collection),
+                                dispatcher=dispatcher, index=index, cache=cache, store=JobStore(store_dir))
+            pipeline.start()
+            parsed = 0
+            start = time.perf_counter()
+            for _ in range(cycles):
+                for key in keys:
+                    await pipeline.trigger(key)
+                while pipeline.in_flight:
+                    await asyncio.sleep(0.005)
+                parsed += len(keys) * handler.page_size
+            cycle_time = time.perf_counter() - start
+            while dispatcher.queue_depth:
+                await asyncio.sleep(0.01)
+            total_time = time.perf_counter() - start
+            dispatcher.stop()
+            for task in pipeline.tasks:
+                task.cancel()
+            await asyncio.gather(*pipeline.tasks, return_exceptions=True)
+            pipeline.close()
+            return parsed, len(index.latencies), cycle_time, total_time, index.latencies, dispatcher.stats
+
+    try:
+        parsed, matched, cycle_time, total_time, latencies, stats = asyncio.run(run())
+    finally:
+        feed_server.shutdown()
+        bot_server.shutdown()
+        shutil.rmtree(store_dir, ignore_errors=True)
+        logging.disable(logging.NOTSET)
+
+    result = {
+        'jobs_per_sec': parsed / cycle_time,
+        'new_jobs_per_sec': matched / cycle_time,
+        'match_p50_ms': percentile(latencies, 0.5) * 1000,
+        'match_p99_ms': percentile(latencies, 0.99) * 1000,
+        'notifications_per_sec': stats['sent'] / total_time,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+    print(f"alerts={n_alerts} queries={len(keys)} cycles={cycles} jobs={parsed} new={matched} "
+          f"notifications={stats['sent']} messages={stats['messages']} retried={stats['retried']}")
+    for name, value in result.items():
+        print(f"{name}: {value:,.2f}")
+    return result
+
+
+# Entry points whose cold-start import cost bench_startup tracks
+STARTUP_MODULES = ('cli', 'config', 'db_manager', 'app', 'scraper', 'pipeline')
+
+
+def import_times(module):
+    """Run ``python -X importtime -c 'import module'`` in a fresh interpreter; return {name: cumulative us}."""
+    import subprocess
+    import sys
+
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, name = line[len('import time:'):].split('|')
+            if name.strip() == 'site':
+                # Everything before this is interpreter startup, not the module's imports
+                times = {}
+            elif cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+    return times
+
+
+def bench_startup(repeat=5):
+    """Cold-start import time of each service entry point, the median of ``repeat`` fresh interpreters."""
+    result = {}
+    for module in STARTUP_MODULES:
+        runs = sorted((import_times(module) for _ in range(repeat)), key=lambda times: times[module])
+        median = runs[len(runs) // 2]
+        heaviest = sorted(((us, name) for name, us in median.items() if '.' not in name and name != module),
+                          reverse=True)[:3]
+        result[f'{module}_import_ms'] = median[module] / 1000
+        print(f"{module:>10}: {median[module] / 1000:6.1f}ms  heaviest: "
+              + (', '.join(f"{name} {us / 1000:.0f}ms" for us, name in heaviest) or '-')
+              + ("  (imports pymongo)" if 'pymongo' in median else ''))
+    return result
+
+
+# Recorded locally with --save-baseline and kept out of git: the numbers only mean something on the
+# machine that produced them. Runs only fail on regressions with --fail-on-regression, and only there
+BASELINE_FILE = 'bench_baseline.json'
+# Allowed slowdown against the baseline before a metric counts as a regression
+TOLERANCE = 0.15
+# Reported against the baseline but never failed on: millisecond import times swing by tens of percent
+# between back-to-back runs on one machine, well past TOLERANCE
+UNGATED = {'startup'}
+
+
+def machine():
+    """Where a baseline was recorded, saved alongside it."""
+    import platform
+
+    return {"platform": platform.platform(), "python": platform.python_version(),
+            "processor": platform.processor() or platform.machine(), "cpus": os.cpu_count()}
+
+
+def compare_to_baseline(name, result, baseline, gate=True):
+    """Print each metric next to its baseline; return the names of those that regressed.
+
+    With ``gate`` off differences are only reported, and nothing counts as a
+    regression.
+    """
+    regressions = []
+    for metric, value in result.items():
+        previous = baseline.get(metric)
+        if not previous:
+            continue
+        change = (value - previous) / previous
+        # Throughput should not drop; latency and memory should not grow
+        worse = -change if metric.endswith('_per_sec') else change
+        flag = (' REGRESSION' if gate else ' (worse)') if worse > TOLERANCE else ''
+        print(f"  {metric}: {value:,.2f} vs {previous:,.2f} ({change:+.1%}){flag}")
+        if flag and gate:
+            regressions.append(f"{name}.{metric}")
+    return regressions
+
+
+BENCHMARKS = {
+    'index': bench_alert_index,
+    'feed': bench_feed,
+    'parser': bench_parser,
+    'dispatcher': bench_dispatcher,
+    'webhook': bench_webhook,
+    'keywords': bench_keywords,
+    'batch': bench_batch,
+    'shards': bench_shards,
+    'replay': bench_replay,
+    'callbacks': bench_callbacks,
+    'startup': bench_startup,
+}
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+    import sys
+
+    parser = argparse.ArgumentParser(description="Run benchmarks; those that return metrics are compared with the baseline.")
+    parser.add_argument('names', nargs='*', metavar='name', help=f"any of: {', '.join(BENCHMARKS)}")
+    parser.add_argument('--save-baseline', action='store_true', help=f"record the results in {BASELINE_FILE}")
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--fail-on-regression', action='store_true',
+                        help=f"exit 1 if a metric is more than {TOLERANCE * 100:.0f}%% worse than a baseline from this machine "
+                             f"(except {', '.join(sorted(UNGATED))})")
+    args = parser.parse_args()
+    unknown = set(args.names) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmark: {', '.join(sorted(unknown))}")
+
+    baselines = {}
+    gate = False
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+        recorded_on = baselines.get('_machine')
+        gate = args.fail_on_regression and recorded_on == machine()
+        if args.fail_on_regression and not gate:
+            print(f"Note: {args.baseline} was recorded on {recorded_on}, not this machine; "
+                  "differences are reported but don't fail the run")
+    regressions = []
+    for name in args.names or BENCHMARKS:
+        print(f"== {name}")
+        result = BENCHMARKS[name]()
+        if not isinstance(result, dict):
+            continue
+        if args.save_baseline:
+            baselines[name] = result
+        elif name in baselines:
+            print(f"-- against {args.baseline}")
+            regressions += compare_to_baseline(name, result, baselines[name], gate and name not in UNGATED)
+    if args.save_baseline:
+        baselines['_machine'] = machine()
+        with open(args.baseline, 'w') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+    if regressions:
+        print(f"Regressed: {', '.join(regressions)}")
+        sys.exit(1)
@@ -1,8 +1,10 @@
 import json
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, WebAppInfo
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
-from db_manager import add_alert
+from db_manager import add_alert_async, ensure_indexes
 from config import Config
+from log_setup import setup_logging
+from metrics import instrument_handler
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Start command to open the Web App for alert configuration."""
@@ -18,19 +20,25 @@ async def handle_webapp_data(update: Update, context: ContextTypes.DEFAULT_TYPE)
         data = json.loads(update.message.web_app_data.data)  # Access data sent from web app
         user_id = update.effective_user.id
         # Save the alert data to the database
-        add_alert(user_id, data)
+        await add_alert_async(user_id, data)
         await update.message.reply_text("Your alert has been configured successfully!")
     except Exception as e:
         await update.message.reply_text(f"An error occurred: {str(e)}")
 
-def main():
-    """Main function to run the Telegram bot."""
-    application = Application.builder().token(Config.TELEGRAM_BOT_TOKEN).build()
+def build_application(builder=None):
+    """Build the bot application with its handlers registered."""
+    builder = builder or Application.builder().token(Config.TELEGRAM_BOT_TOKEN)
+    application = builder.build()
 
-    application.add_handler(CommandHandler("start", start))
-    application.add_handler(MessageHandler(filters.StatusUpdate.WEB_APP_DATA, handle_webapp_data))
+    application.add_handler(CommandHandler("start", instrument_handler(start)))
+    application.add_handler(MessageHandler(filters.StatusUpdate.WEB_APP_DATA, instrument_handler(handle_webapp_data)))
+    return application
 
-    application.run_polling()
+def main():
+    """Main function to run the Telegram bot."""
+    setup_logging()
+    ensure_indexes()
+    build_application().run_polling()
 
 if __name__ == '__main__':
     main()
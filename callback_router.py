@@ -0,0 +1,56 @@
+from telegram.ext import CallbackQueryHandler
+
+
+class _Node:
+    __slots__ = ('children', 'route')
+
+    def __init__(self):
+        self.children = {}
+        self.route = None
+
+
+class CallbackRouter:
+    """Dispatches callback data to handlers by longest registered prefix.
+
+    Routes live in a character trie, so resolving one callback costs a walk
+    over at most 64 characters (Telegram's callback_data limit) no matter how
+    many routes exist, instead of trying a regex per handler. Handlers are
+    called as ``handler(update, context, value)``, where ``value`` is the part
+    of the callback data after the matched prefix.
+    """
+
+    def __init__(self, routes=()):
+        self.root = _Node()
+        for prefix, handler in routes:
+            self.add(prefix, handler)
+
+    def add(self, prefix, handler):
+        node = self.root
+        for char in prefix:
+            node = node.children.setdefault(char, _Node())
+        node.route = (len(prefix), handler)
+
+    def resolve(self, data):
+        """Return (handler, value) for the longest route that prefixes ``data``, or (None, None)."""
+        node, route = self.root, self.root.route
+        for char in data:
+            node = node.children.get(char)
+            if node is None:
+                break
+            if node.route is not None:
+                route = node.route
+        if route is None:
+            return None, None
+        length, handler = route
+        return handler, data[length:]
+
+    async def dispatch(self, update, context):
+        query = update.callback_query
+        handler, value = self.resolve(query.data or '')
+        await query.answer()
+        if handler is not None:
+            await handler(update, context, value)
+
+    def handler(self):
+        """One CallbackQueryHandler that routes every callback query through this router."""
+        return CallbackQueryHandler(self.dispatch)
@@ -0,0 +1,148 @@
+"""Entry point for every service: python cli.py {bot,api,worker,admin} ...
+
+Each subcommand imports only the modules it runs, so the API never loads
+python-telegram-bot, admin commands load neither, and nothing connects to
+MongoDB until a command actually uses it.
+"""
+import argparse
+import json
+import sys
+
+from config import Config
+
+
+def serve_metrics(port, default):
+    # Processes without the Flask app serve their own metrics
+    port = default if port is None else port
+    if port:
+        import metrics
+
+        metrics.serve(port)
+
+
+def run_bot(args):
+    serve_metrics(args.metrics_port, Config.BOT_METRICS_PORT)
+    if args.webapp:
+        from bot import main
+    else:
+        from scraper import main
+    main()
+
+
+def run_api(args):
+    from app import main
+
+    main(host=args.host, port=args.port, debug=args.debug)
+
+
+def run_worker(args):
+    serve_metrics(args.metrics_port, Config.WORKER_METRICS_PORT)
+    from pipeline import main
+
+    main()
+
+
+def admin_ensure_indexes(args):
+    import db_manager
+
+    db_manager.ensure_indexes()
+    print("Indexes created")
+
+
+def admin_dedupe_alerts(args):
+    import db_manager
+
+    print(f"Removed {db_manager.remove_duplicate_alerts()} duplicate alerts")
+    db_manager.ensure_indexes()
+
+
+def admin_list_alerts(args):
+    import db_manager
+
+    for alert in db_manager.list_alerts(args.user_id):
+        print(json.dumps({"id": str(alert["_id"]), "filters": alert["filters"]}))
+
+
+def admin_delete_alerts(args):
+    import db_manager
+
+    print(f"Deleted {db_manager.delete_alerts(args.alert_ids)} alerts")
+
+
+def admin_stats(args):
+    import db_manager
+
+    print(json.dumps({
+        "alerts": db_manager.alerts_collection.estimated_document_count(),
+        "alerts_version": db_manager.get_alerts_version(),
+        "outbox": db_manager.outbox_collection.estimated_document_count(),
+        "seen_jobs": db_manager.seen_jobs_collection.estimated_document_count(),
+    }))
+
+
+def admin_compact_jobs(args):
+    from job_store import JobStore
+
+    store = JobStore()
+    print(f"Removed {store.compact()} segments, {len(store)} jobs kept")
+
+
+def admin_config(args):
+    # Secrets are only reported as set or unset
+    secrets = {"TELEGRAM_BOT_TOKEN", "WEBHOOK_SECRET", "MONGODB_URI"}
+    for name, value in Config.as_dict().items():
+        if name in secrets and value is not None:
+            value = "<set>"
+        print(f"{name}={value}")
+
+
+def user_id(value):
+    # Telegram chat IDs are stored as integers, IDs from the web API as given
+    return int(value) if value.lstrip("-").isdigit() else value
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Upwork job alert services")
+    parser.add_argument("--env-file", help="read settings from this file instead of .env")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    bot = commands.add_parser("bot", help="run the Telegram bot with long polling")
+    bot.add_argument("--webapp", action="store_true", help="run the Web App bot (bot.py) instead of the wizard")
+    bot.add_argument("--metrics-port", type=int, help="serve /metrics on this port (default BOT_METRICS_PORT, 0 to disable)")
+    bot.set_defaults(func=run_bot)
+
+    api = commands.add_parser("api", help="run the Flask API (and the webhook bot if WEBHOOK_URL is set)")
+    api.add_argument("--host", default="127.0.0.1")
+    api.add_argument("--port", type=int, default=5000)
+    api.add_argument("--debug", action="store_true")
+    api.set_defaults(func=run_api)
+
+    worker = commands.add_parser("worker", help="run the fetch/match/dispatch pipeline")
+    worker.add_argument("--metrics-port", type=int, help="serve /metrics on this port (default WORKER_METRICS_PORT, 0 to disable)")
+    worker.set_defaults(func=run_worker)
+
+    admin = commands.add_parser("admin", help="maintenance commands")
+    actions = admin.add_subparsers(dest="action", required=True)
+    actions.add_parser("ensure-indexes", help="create MongoDB indexes").set_defaults(func=admin_ensure_indexes)
+    actions.add_parser("dedupe-alerts", help="delete all but the oldest of a user's identical alerts, then create the "
+                       "unique index").set_defaults(func=admin_dedupe_alerts)
+    list_alerts = actions.add_parser("list-alerts", help="print a user's alerts as JSON lines")
+    list_alerts.add_argument("user_id", type=user_id)
+    list_alerts.set_defaults(func=admin_list_alerts)
+    delete_alerts = actions.add_parser("delete-alerts", help="delete alerts by ID")
+    delete_alerts.add_argument("alert_ids", nargs="+")
+    delete_alerts.set_defaults(func=admin_delete_alerts)
+    actions.add_parser("stats", help="print collection sizes").set_defaults(func=admin_stats)
+    actions.add_parser("compact-jobs", help="drop job store segments past retention").set_defaults(func=admin_compact_jobs)
+    actions.add_parser("config", help="print the effective settings").set_defaults(func=admin_config)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    Config.load(args.env_file)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
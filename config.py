@@ -1,9 +1,92 @@
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
+# Every setting as name: (type, default); int and float settings are converted from their environment strings
+SETTINGS = {
+    "MONGODB_URI": (str, None),
+    "MONGODB_DB": (str, None),
+    "TELEGRAM_BOT_TOKEN": (str, None),
+    "UPWORK_SEARCH_URL": (str, "https://www.upwork.com/nx/search/jobs/"),
+    "FEED_CONCURRENCY": (int, 8),
+    "SEEN_JOBS_TTL": (int, 3 * 24 * 3600),
+    "SEEN_JOBS_CAPACITY": (int, 1000000),
+    "SEEN_JOBS_ERROR_RATE": (float, 0.001),
+    # (user, job) pairs already notified; one job usually matches several users
+    "NOTIFIED_CAPACITY": (int, 5000000),
+    # Of those, how many recent ones are kept in memory to confirm Bloom filter hits without a query
+    "NOTIFIED_CACHE_SIZE": (int, 200000),
+    "TELEGRAM_GLOBAL_RATE": (float, 30),
+    "TELEGRAM_CHAT_RATE": (float, 1),
+    "MONGODB_MAX_POOL_SIZE": (int, 20),
+    "MONGODB_MIN_POOL_SIZE": (int, 0),
+    "MONGODB_MAX_IDLE_TIME_MS": (int, 60000),
+    "MONGODB_TIMEOUT_MS": (int, 5000),
+    "ALERT_CACHE_MAX_USERS": (int, 10000),
+    "ALERT_CACHE_POLL_INTERVAL": (float, 10),
+    "SESSION_BACKEND": (str, "memory"),
+    "SESSION_IDLE_TIMEOUT": (int, 1800),
+    "SESSION_MAX_SESSIONS": (int, 100000),
+    "WEBHOOK_URL": (str, None),
+    "WEBHOOK_SECRET": (str, None),
+    "WEBHOOK_WORKERS": (int, 8),
+    "WEBHOOK_QUEUE_SIZE": (int, 100),
+    # Above 1, the pipeline matches in this many shard processes instead of in process
+    "MATCH_WORKERS": (int, 1),
+    "POLL_INTERVAL": (float, 180),
+    "POLL_INTERVAL_MIN": (float, 30),
+    "POLL_INTERVAL_MAX": (float, 1800),
+    "PIPELINE_QUEUE_SIZE": (int, 32),
+    "LOG_LEVEL": (str, "INFO"),
+    # Ports the bot and worker processes serve /metrics on; 0 turns it off
+    "BOT_METRICS_PORT": (int, 9101),
+    "WORKER_METRICS_PORT": (int, 9102),
+    "API_PAGE_SIZE": (int, 100),
+    "API_MAX_PAGE_SIZE": (int, 1000),
+    "JOB_STORE_DIR": (str, "data/jobs"),
+    "JOB_STORE_RETENTION": (int, 72 * 3600),
+    "BACKFILL_HOURS": (float, 24),
+}
 
-class Config:
-    MONGODB_URI = os.getenv("MONGODB_URI")
-    MONGODB_DB = os.getenv("MONGODB_DB")
-    TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+
+class _Settings(type):
+    """Makes the first read of any setting trigger Config.load()."""
+
+    def __getattr__(cls, name):
+        # Only reached for a setting that hasn't been loaded yet
+        if name in SETTINGS:
+            cls.load()
+            return type.__getattribute__(cls, name)
+        raise AttributeError(f"type object {cls.__name__!r} has no attribute {name!r}")
+
+
+class Config(metaclass=_Settings):
+    """Typed settings from the environment (and a .env file), read once.
+
+    Settings load on first access, or explicitly with Config.load() (the CLI
+    does this at startup), so importing this module reads no files. They are
+    declared in SETTINGS rather than as annotated class attributes, which
+    Python 3.14 no longer exposes in the class namespace.
+    """
+
+    @classmethod
+    def load(cls, env_file=None):
+        """Read .env and the environment into the settings; later calls are no-ops unless env_file is given."""
+        if "_loaded" in cls.__dict__ and env_file is None:
+            return
+        from dotenv import load_dotenv
+
+        load_dotenv(env_file)
+        for name, (kind, default) in SETTINGS.items():
+            raw = os.getenv(name)
+            if raw is None:
+                value = default
+            else:
+                try:
+                    value = kind(raw)
+                except ValueError:
+                    raise ValueError(f"{name} must be {kind.__name__}, got {raw!r}") from None
+            setattr(cls, name, value)
+        cls._loaded = True
+
+    @classmethod
+    def as_dict(cls):
+        return {name: getattr(cls, name) for name in SETTINGS}
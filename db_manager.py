@@ -1,24 +1,261 @@
-from pymongo import MongoClient
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
 from config import Config
 from bson.objectid import ObjectId
+from alert_filters import normalize_filters, filters_hash
 
-# Initialize MongoDB client
-client = MongoClient(Config.MONGODB_URI)
-db = client[Config.MONGODB_DB]
-alerts_collection = db["alerts"]
+logger = logging.getLogger(__name__)
 
-def add_alert(user_id, filters):
-    """Add an alert with user preferences."""
-    alert = {
+ASCENDING = 1
+# Module attributes resolved by __getattr__ below, so importing this module opens no connection
+COLLECTIONS = {
+    "alerts_collection": "alerts",
+    "seen_jobs_collection": "seen_jobs",
+    "notified_collection": "notified",
+    "outbox_collection": "outbox",
+    "meta_collection": "meta",
+}
+
+_client = None
+_collections = {}
+_executor = None
+_lock = threading.Lock()
+# One alert per user and filters; legacy alerts have no filters_hash and are left out of it
+DUPLICATE_INDEX = "user_id_1_filters_hash_1_unique"
+
+def _create_client():
+    """Create the MongoDB client; a mongomock:// URI gives an in-memory client for tests."""
+    if Config.MONGODB_URI and Config.MONGODB_URI.startswith("mongomock://"):
+        import mongomock
+        return mongomock.MongoClient()
+    from pymongo import MongoClient
+    from metrics import mongo_command_listener
+    return MongoClient(
+        Config.MONGODB_URI,
+        maxPoolSize=Config.MONGODB_MAX_POOL_SIZE,
+        minPoolSize=Config.MONGODB_MIN_POOL_SIZE,
+        maxIdleTimeMS=Config.MONGODB_MAX_IDLE_TIME_MS,
+        serverSelectionTimeoutMS=Config.MONGODB_TIMEOUT_MS,
+        event_listeners=[mongo_command_listener()],
+    )
+
+def get_client():
+    """The shared MongoDB client, created on first use."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = _create_client()
+    return _client
+
+def get_db():
+    return get_client()[Config.MONGODB_DB]
+
+def _collection(name):
+    collection = _collections.get(name)
+    if collection is None:
+        collection = _collections[name] = get_db()[name]
+    return collection
+
+def __getattr__(name):
+    if name == "client":
+        return get_client()
+    if name == "db":
+        return get_db()
+    if name in COLLECTIONS:
+        return _collection(COLLECTIONS[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def ensure_indexes():
+    """Create the indexes the queries below rely on; safe to call on every startup, and never deletes data."""
+    alerts = _collection("alerts")
+    indexes = alerts.index_information()
+    # Serves list_alerts (prefix) and makes add_alert's duplicate check atomic
+    keys = [("user_id", ASCENDING), ("filters_hash", ASCENDING)]
+    if DUPLICATE_INDEX in indexes or not _duplicate_alert_ids():
+        # Replaces the non-unique index of the same keys
+        if "user_id_1_filters_hash_1" in indexes:
+            alerts.drop_index("user_id_1_filters_hash_1")
+        alerts.create_index(keys, name=DUPLICATE_INDEX, unique=True,
+                            partialFilterExpression={"filters_hash": {"$exists": True}})
+    else:
+        # Deleting user alerts is an explicit admin step, not something a service does on startup
+        logger.warning("Duplicate alerts prevent the unique alert index; run `cli.py admin dedupe-alerts`")
+        alerts.create_index(keys)
+    # Serves list_alerts_page: a user's alerts in ID order from a cursor
+    _collection("alerts").create_index([("user_id", ASCENDING), ("_id", ASCENDING)])
+    _collection("outbox").create_index("queued_at")
+
+def _duplicate_alert_ids():
+    """IDs of all but the oldest of each user's alerts with identical filters."""
+    duplicates = _collection("alerts").aggregate([
+        {"$match": {"filters_hash": {"$exists": True}}},
+        {"$sort": {"_id": ASCENDING}},
+        {"$group": {"_id": {"user_id": "$user_id", "filters_hash": "$filters_hash"}, "ids": {"$push": "$_id"}}},
+        {"$match": {"ids.1": {"$exists": True}}},
+    ])
+    return [alert_id for group in duplicates for alert_id in group["ids"][1:]]
+
+def remove_duplicate_alerts():
+    """Delete all but the oldest of each user's alerts with identical filters; returns how many went."""
+    extra = _duplicate_alert_ids()
+    if extra:
+        logger.warning("Removing %d duplicate alerts", len(extra))
+        _collection("alerts").delete_many({"_id": {"$in": extra}})
+        bump_alerts_version()
+    return len(extra)
+
+def bump_alerts_version():
+    """Record that alerts changed, for caches that poll instead of watching a change stream."""
+    _collection("meta").update_one({"_id": "alerts"}, {"$inc": {"version": 1}}, upsert=True)
+
+def get_alerts_version():
+    doc = _collection("meta").find_one({"_id": "alerts"})
+    return doc["version"] if doc else 0
+
+def _prepare_alert(user_id, filters):
+    normalized = normalize_filters(filters)
+    return {
         "user_id": user_id,
-        "filters": filters,
+        "filters": normalized,
+        "filters_hash": filters_hash(normalized),
+        # Cleared by the worker once it has sent the alert matches from recently stored jobs
+        "backfill": True,
+    }
+
+def add_alert(user_id, filters):
+    """Add an alert with user preferences.
+
+    Filters are normalized before saving; if the user already has an identical
+    alert, its ID is returned instead of inserting a duplicate. The unique
+    index from ensure_indexes() decides, so concurrent adds can't both insert.
+    """
+    from pymongo.errors import DuplicateKeyError
+
+    alert = _prepare_alert(user_id, filters)
+    while True:
+        try:
+            alert_id = str(_collection("alerts").insert_one(alert).inserted_id)
+        except DuplicateKeyError:
+            existing = _collection("alerts").find_one({"user_id": user_id, "filters_hash": alert["filters_hash"]},
+                                                      {"_id": 1})
+            if existing is not None:
+                return str(existing["_id"])
+            # The conflicting alert was deleted since the insert failed, so the next insert can succeed
+            continue
+        bump_alerts_version()
+        return alert_id
+
+def add_alerts(user_id, filters_list):
+    """Add several alerts for a user with one bulk insert; returns their IDs in order."""
+    return add_alerts_bulk([(user_id, filters) for filters in filters_list])
+
+def add_alerts_bulk(entries):
+    """Add (user_id, filters) pairs for any number of users with one lookup and one bulk insert.
+
+    Returns the alert IDs in order; pairs that duplicate an existing alert (or
+    each other) get the existing ID, as in add_alert.
+    """
+    from pymongo.errors import BulkWriteError
+
+    alerts = [_prepare_alert(user_id, filters) for user_id, filters in entries]
+    keys = [(alert["user_id"], alert["filters_hash"]) for alert in alerts]
+    existing = _existing_alert_ids(keys)
+    new_alerts = {}
+    for key, alert in zip(keys, alerts):
+        if key not in existing:
+            new_alerts.setdefault(key, alert)
+    if new_alerts:
+        try:
+            result = _collection("alerts").insert_many(list(new_alerts.values()), ordered=False)
+            existing.update(zip(new_alerts, map(str, result.inserted_ids)))
+        except BulkWriteError as e:
+            # Another writer added some of them since the lookup; the unique index kept them single
+            codes = {error.get("code") for error in e.details.get("writeErrors", [])}
+            if codes - {11000} or e.details.get("writeConcernErrors"):
+                raise
+            existing = _existing_alert_ids(keys)
+        bump_alerts_version()
+    return [existing[key] for key in keys]
+
+def _existing_alert_ids(keys):
+    """Map the (user_id, filters_hash) pairs that already have an alert to its ID, with one query."""
+    return {
+        (doc["user_id"], doc["filters_hash"]): str(doc["_id"])
+        for doc in _collection("alerts").find(
+            {"user_id": {"$in": list({user_id for user_id, _ in keys})},
+             "filters_hash": {"$in": list({digest for _, digest in keys})}},
+            {"user_id": 1, "filters_hash": 1},
+        )
     }
-    alerts_collection.insert_one(alert)
 
 def list_alerts(user_id):
-    """List all alerts for a user."""
-    return list(alerts_collection.find({"user_id": user_id}))
+    """List all alerts for a user, oldest first."""
+    return list(_collection("alerts").find({"user_id": user_id}).sort("_id", ASCENDING))
+
+def list_alerts_page(user_id, after=None, limit=None, fields=None):
+    """A user's alerts with IDs after ``after``, oldest first, at most ``limit``, projected to ``fields``."""
+    query = {"user_id": user_id}
+    if after:
+        query["_id"] = {"$gt": ObjectId(after)}
+    projection = dict.fromkeys(fields, 1) if fields is not None else None
+    cursor = _collection("alerts").find(query, projection).sort("_id", ASCENDING)
+    return list(cursor.limit(limit) if limit else cursor)
+
+def list_users_alerts(user_ids):
+    """List the alerts of several users in one query, oldest first."""
+    return list(_collection("alerts").find({"user_id": {"$in": list(user_ids)}}).sort("_id", ASCENDING))
+
+def get_alerts(alert_ids):
+    """Fetch several alerts by ID in one query."""
+    return list(_collection("alerts").find({"_id": {"$in": [ObjectId(alert_id) for alert_id in alert_ids]}}))
 
 def delete_alert(alert_id):
     """Delete an alert by ID."""
-    alerts_collection.delete_one({"_id": ObjectId(alert_id)})
+    _collection("alerts").delete_one({"_id": ObjectId(alert_id)})
+    bump_alerts_version()
+
+def delete_alerts(alert_ids):
+    """Delete several alerts by ID in one round trip; returns how many were removed."""
+    result = _collection("alerts").delete_many({"_id": {"$in": [ObjectId(alert_id) for alert_id in alert_ids]}})
+    bump_alerts_version()
+    return result.deleted_count
+
+def clear_backfill(alert_id):
+    """Mark an alert's backfill as done; not a filter change, so the alerts version is left alone."""
+    _collection("alerts").update_one({"_id": ObjectId(alert_id)}, {"$unset": {"backfill": ""}})
+
+async def run_async(func, *args, **kwargs):
+    """Run a blocking database call on the Mongo thread pool without blocking the event loop."""
+    import asyncio
+
+    global _executor
+    if _executor is None:
+        # Blocking driver calls made from async handlers run here, sized to the connection pool
+        _executor = ThreadPoolExecutor(max_workers=Config.MONGODB_MAX_POOL_SIZE, thread_name_prefix="mongo")
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, partial(func, *args, **kwargs))
+
+async def add_alert_async(user_id, filters):
+    return await run_async(add_alert, user_id, filters)
+
+async def add_alerts_async(user_id, filters_list):
+    return await run_async(add_alerts, user_id, filters_list)
+
+async def add_alerts_bulk_async(entries):
+    return await run_async(add_alerts_bulk, entries)
+
+async def list_alerts_async(user_id):
+    return await run_async(list_alerts, user_id)
+
+async def get_alerts_async(alert_ids):
+    return await run_async(get_alerts, alert_ids)
+
+async def delete_alert_async(alert_id):
+    return await run_async(delete_alert, alert_id)
+
+async def delete_alerts_async(alert_ids):
+    return await run_async(delete_alerts, alert_ids)
@@ -0,0 +1,164 @@
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from pymongo.errors import BulkWriteError
+
+from config import Config
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over string keys."""
+
+    def __init__(self, capacity, error_rate):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class SeenJobs:
+    """Remembers processed job IDs for ``ttl`` seconds with bounded memory.
+
+    IDs live in a ring of Bloom filters; the oldest one is dropped every
+    ``ttl / (generations - 1)`` seconds, so an ID is remembered for at least
+    ``ttl``. New IDs are written to Mongo in bulk, where a TTL index expires
+    them, and are read back on startup so a restart doesn't resend alerts.
+    """
+
+    def __init__(self, collection=None, ttl=None, capacity=None, error_rate=None, generations=4):
+        self.collection = collection
+        self.ttl = ttl or Config.SEEN_JOBS_TTL
+        capacity = capacity or Config.SEEN_JOBS_CAPACITY
+        error_rate = error_rate or Config.SEEN_JOBS_ERROR_RATE
+        self.generations = generations
+        self.rotate_every = self.ttl / (generations - 1)
+        # A lookup checks every generation, so split the false-positive budget between them
+        self._new_filter = lambda: BloomFilter(max(1, capacity // (generations - 1)), error_rate / generations)
+        self.filters = [self._new_filter()]
+        self.rotated_at = time.time()
+        if self.collection is not None:
+            self.collection.create_index("seen_at", expireAfterSeconds=int(self.ttl))
+            self.rehydrate()
+
+    def _rotate(self, now):
+        while now - self.rotated_at >= self.rotate_every:
+            self.filters.insert(0, self._new_filter())
+            del self.filters[self.generations:]
+            self.rotated_at += self.rotate_every
+
+    def rehydrate(self):
+        """Reload IDs seen within the TTL from Mongo, each into the generation its age puts it in.
+
+        Generation ``i`` holds what the ring would have rotated ``i`` times
+        since, so no filter gets more than its share of the capacity.
+        """
+        since = datetime.fromtimestamp(self.rotated_at, timezone.utc) - timedelta(seconds=self.ttl)
+        filters = [self.filters[0]] + [self._new_filter() for _ in range(self.generations - 1)]
+        for doc in self.collection.find({"seen_at": {"$gte": since}}, {"_id": 1, "seen_at": 1}):
+            # Mongo hands back naive UTC datetimes unless the client is tz_aware
+            seen_at = doc["seen_at"].replace(tzinfo=timezone.utc).timestamp()
+            age = max(0.0, self.rotated_at - seen_at)
+            filters[min(self.generations - 1, 1 + int(age // self.rotate_every))].add(doc["_id"])
+        self.filters = filters
+
+    def seen(self, job_ids):
+        """Return a list of booleans, one per ID, telling whether it was seen before."""
+        self._rotate(time.time())
+        filters = self.filters
+        return [any(job_id in f for f in filters) for job_id in job_ids]
+
+    def mark(self, job_ids):
+        """Record IDs as seen, locally and with one bulk write to Mongo.
+
+        Returns the IDs this call recorded first, leaving out any another
+        worker had already written to Mongo.
+        """
+        now = time.time()
+        self._rotate(now)
+        current = self.filters[0]
+        for job_id in job_ids:
+            current.add(job_id)
+        recorded = list(job_ids)
+        if self.collection is not None and job_ids:
+            # TTL indexes only expire BSON dates, so store a datetime rather than the epoch
+            seen_at = datetime.fromtimestamp(now, timezone.utc)
+            try:
+                self.collection.insert_many([{"_id": job_id, "seen_at": seen_at} for job_id in job_ids], ordered=False)
+            except BulkWriteError as e:
+                # Duplicate keys from IDs another worker recorded first are expected; anything else is not
+                errors = e.details.get("writeErrors", [])
+                if {error.get("code") for error in errors} - {11000} or e.details.get("writeConcernErrors"):
+                    raise
+                taken = {error["index"] for error in errors}
+                recorded = [job_id for position, job_id in enumerate(job_ids) if position not in taken]
+        return recorded
+
+    def filter_new(self, job_ids):
+        """Return the IDs (deduplicated, in order) that were not seen before, and mark them seen."""
+        job_ids = list(dict.fromkeys(job_ids))
+        new_ids = [job_id for job_id, seen in zip(job_ids, self.seen(job_ids)) if not seen]
+        self.mark(new_ids)
+        return new_ids
+
+
+class NotifiedJobs:
+    """Exact record of the (user, job) keys already notified, so a false positive never drops a notification.
+
+    A SeenJobs Bloom ring answers first: a key it hasn't seen is certainly
+    new. Its positives may be false, so they are confirmed against the last
+    ``cache_size`` keys kept in memory and then against the collection, where
+    each key is a unique _id that also settles a key two workers claim at
+    once. Without a collection, a positive that has left the in-memory keys
+    counts as new: a rare repeat rather than a lost notification.
+    """
+
+    def __init__(self, collection=None, ttl=None, capacity=None, cache_size=None):
+        self.collection = collection
+        self.filter = SeenJobs(collection, ttl=ttl, capacity=capacity or Config.NOTIFIED_CAPACITY)
+        self.cache_size = cache_size or Config.NOTIFIED_CACHE_SIZE
+        self.recent = OrderedDict()
+        # The match stage and backfills call in from different threads
+        self._lock = threading.Lock()
+
+    def _confirmed(self, keys):
+        """The keys among Bloom filter positives that really were notified."""
+        sent = set()
+        for key in keys:
+            if key in self.recent:
+                self.recent.move_to_end(key)
+                sent.add(key)
+        unknown = [key for key in keys if key not in sent]
+        if unknown and self.collection is not None:
+            sent.update(doc["_id"] for doc in self.collection.find({"_id": {"$in": unknown}}, {"_id": 1}))
+        return sent
+
+    def filter_new(self, keys):
+        """Return the keys (deduplicated, in order) not notified before, and record them as notified."""
+        keys = list(dict.fromkeys(keys))
+        with self._lock:
+            sent = self._confirmed([key for key, seen in zip(keys, self.filter.seen(keys)) if seen])
+            new = self.filter.mark([key for key in keys if key not in sent])
+            for key in new:
+                self.recent[key] = None
+            while len(self.recent) > self.cache_size:
+                self.recent.popitem(last=False)
+        return new
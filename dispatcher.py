@@ -0,0 +1,259 @@
+import asyncio
+import html
+import time
+from collections import deque
+
+from telegram import LinkPreviewOptions
+from telegram.constants import ParseMode
+from telegram.error import BadRequest, NetworkError, RetryAfter, TelegramError
+
+from config import Config
+from db_manager import run_async
+from job_parser import Job
+from metrics import queue_depth, telegram_sends
+
+MAX_MESSAGE_LENGTH = 4096
+
+
+class TokenBucket:
+    """Allows ``rate`` operations per second with bursts of up to ``capacity``."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def delay(self):
+        """Seconds until a token is available (0 if one is available now)."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        return 0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+def format_job(job):
+    """One digest entry for a matched job."""
+    if job.t == 0:
+        budget = f"Hourly up to ${job.amount:,.0f}" if job.amount else "Hourly"
+    else:
+        budget = f"Fixed ${job.amount:,.0f}" if job.amount else "Fixed price"
+    title = html.escape(job.title or "Untitled job")
+    return f'<a href="https://www.upwork.com/jobs/~{job.id}">{title}</a>\n{budget} · {job.proposals}+ proposals'
+
+
+def format_digest(jobs):
+    """Pack as many jobs as fit into one message; return (text, number of jobs used)."""
+    header = "New jobs matching your alerts:" if len(jobs) > 1 else "New job matching your alert:"
+    text = header
+    used = 0
+    for job in jobs:
+        entry = "\n\n" + format_job(job)
+        if used and len(text) + len(entry) > MAX_MESSAGE_LENGTH:
+            break
+        text += entry
+        used += 1
+    return text, used
+
+
+class NotificationDispatcher:
+    """Queue of outbound job notifications, sent as per-chat digests within Telegram's limits.
+
+    Matched jobs are persisted to the outbox collection when queued and removed
+    once delivered, so pending sends survive a restart. A global token bucket
+    and one bucket per chat keep us under the flood limits, and 429 responses
+    pause sending for ``retry_after`` seconds before the digest is retried.
+    Network errors back off per chat, doubling from ``backoff`` seconds, and
+    the chat's digest is dropped after ``max_retries`` failed attempts.
+    """
+
+    # How often (seconds) buckets of chats with nothing pending are dropped once they have refilled
+    BUCKET_PRUNE_INTERVAL = 60
+
+    def __init__(self, bot, outbox=None, global_rate=None, chat_rate=None, flush_interval=1.0, max_in_flight=8,
+                 backoff=1.0, max_backoff=60.0, max_retries=5):
+        self.bot = bot
+        self.outbox = outbox
+        global_rate = global_rate or Config.TELEGRAM_GLOBAL_RATE
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate or Config.TELEGRAM_CHAT_RATE
+        self.chat_buckets = {}
+        self.pruned_at = time.monotonic()
+        self.flush_interval = flush_interval
+        self.pending = {}
+        # Kept alongside pending so the metrics thread never iterates it while the loop changes it
+        self.queue_depth = 0
+        self.ready = deque()
+        self.paused_until = 0
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_retries = max_retries
+        self.failures = {}
+        self.retry_at = {}
+        self.latencies = deque(maxlen=1000)
+        self.stats = {'queued': 0, 'sent': 0, 'messages': 0, 'retried': 0, 'failed': 0}
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+        self._wakeup = asyncio.Event()
+        self._running = False
+        queue_depth.labels('dispatch_pending').set_function(lambda: self.queue_depth)
+
+    async def restore(self):
+        """Reload undelivered notifications from the outbox after a restart."""
+        if self.outbox is None:
+            return
+        docs = await run_async(lambda: list(self.outbox.find().sort("queued_at", 1)))
+        # Anything enqueued while the outbox was being read is already pending
+        known = {outbox_id for items in self.pending.values() for _, outbox_id in items}
+        for doc in docs:
+            if doc["_id"] not in known:
+                self._add(doc["chat_id"], Job(**doc["job"]), doc["_id"])
+        self._wakeup.set()
+
+    def _add(self, chat_id, job, outbox_id):
+        if chat_id not in self.pending:
+            self.pending[chat_id] = []
+            self.ready.append(chat_id)
+        self.pending[chat_id].append((job, outbox_id))
+        self.queue_depth += 1
+        self.stats['queued'] += 1
+
+    async def enqueue(self, notifications):
+        """Queue (chat_id, job) pairs for delivery, persisting them in one bulk insert."""
+        notifications = list(notifications)
+        if not notifications:
+            return
+        ids = [None] * len(notifications)
+        if self.outbox is not None:
+            now = time.time()
+            result = await run_async(self.outbox.insert_many, [
+                {"chat_id": chat_id, "job": job._asdict(), "queued_at": now} for chat_id, job in notifications
+            ])
+            ids = result.inserted_ids
+        for (chat_id, job), outbox_id in zip(notifications, ids):
+            self._add(chat_id, job, outbox_id)
+        self._wakeup.set()
+
+    def _chat_bucket(self, chat_id):
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self.chat_buckets[chat_id] = TokenBucket(self.chat_rate, 1)
+        return bucket
+
+    def _prune_buckets(self):
+        """Forget the buckets of idle chats; a full bucket is what _chat_bucket() would create anyway."""
+        now = time.monotonic()
+        if now - self.pruned_at < self.BUCKET_PRUNE_INTERVAL:
+            return
+        self.pruned_at = now
+        for chat_id, bucket in list(self.chat_buckets.items()):
+            if chat_id not in self.pending and not bucket.delay() and bucket.tokens >= bucket.capacity:
+                del self.chat_buckets[chat_id]
+
+    def _retry_later(self, chat_id):
+        """Requeue a chat after a network error with exponential backoff; False once its retries are used up."""
+        failures = self.failures.get(chat_id, 0) + 1
+        if failures > self.max_retries:
+            return False
+        self.failures[chat_id] = failures
+        self.retry_at[chat_id] = time.monotonic() + min(self.max_backoff, self.backoff * 2 ** (failures - 1))
+        self.ready.append(chat_id)
+        return True
+
+    async def _send(self, chat_id):
+        items = self.pending[chat_id]
+        text, used = format_digest([job for job, _ in items])
+        try:
+            async with self._in_flight:
+                started = time.monotonic()
+                await self.bot.send_message(chat_id, text, parse_mode=ParseMode.HTML,
+                                            link_preview_options=LinkPreviewOptions(is_disabled=True))
+        except RetryAfter as e:
+            retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, 'total_seconds') else e.retry_after
+            self.paused_until = time.monotonic() + retry_after
+            self.stats['retried'] += 1
+            telegram_sends.labels('retry_after').inc()
+            self.ready.appendleft(chat_id)
+            return
+        except TelegramError as e:
+            # PTB derives BadRequest (chat not found, unparsable text) from NetworkError, but it won't pass on a retry
+            if isinstance(e, NetworkError) and not isinstance(e, BadRequest) and self._retry_later(chat_id):
+                self.stats['retried'] += 1
+                telegram_sends.labels('network_error').inc()
+                return
+            # The chat is gone, blocked us, rejected the message or kept failing; drop this digest rather
+            # than retry it forever, and leave the jobs that didn't fit in it for the next one
+            self.stats['failed'] += used
+            telegram_sends.labels('failed').inc()
+        else:
+            self.latencies.append(time.monotonic() - started)
+            self.stats['sent'] += used
+            self.stats['messages'] += 1
+            telegram_sends.labels('sent').inc()
+        self.failures.pop(chat_id, None)
+        self.retry_at.pop(chat_id, None)
+        if self.outbox is not None:
+            await run_async(self.outbox.delete_many, {"_id": {"$in": [outbox_id for _, outbox_id in items[:used]]}})
+        # enqueue() may have appended to this chat's list while the send was in flight
+        remaining = self.pending[chat_id][used:]
+        self.queue_depth -= used
+        if remaining:
+            self.pending[chat_id] = remaining
+            self.ready.append(chat_id)
+        else:
+            del self.pending[chat_id]
+
+    async def flush(self):
+        """Send one digest to every chat with pending jobs, respecting the rate limits."""
+        sends = []
+        for _ in range(len(self.ready)):
+            wait = self.paused_until - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            if not self.ready:
+                break
+            chat_id = self.ready.popleft()
+            bucket = self._chat_bucket(chat_id)
+            if bucket.delay() or self.retry_at.get(chat_id, 0) > time.monotonic():
+                # This chat is still cooling down or backing off; let others go first
+                self.ready.append(chat_id)
+                continue
+            wait = self.global_bucket.delay()
+            if wait:
+                await asyncio.sleep(wait)
+                self.global_bucket.delay()
+            self.global_bucket.take()
+            bucket.take()
+            # A chat is out of the ready queue while its send is in flight, so its digests stay ordered
+            sends.append(asyncio.create_task(self._send(chat_id)))
+        if sends:
+            await asyncio.gather(*sends)
+
+    async def run(self):
+        """Deliver notifications until stop() is called."""
+        self._running = True
+        while self._running:
+            self._prune_buckets()
+            if not self.ready:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    continue
+                # Give matches from the same cycle a moment to land in one digest
+                await asyncio.sleep(self.flush_interval)
+            await self.flush()
+            if self.ready:
+                await asyncio.sleep(min(0.05, self.flush_interval))
+
+    def stop(self):
+        self._running = False
+        self._wakeup.set()
+
+    def metrics(self):
+        """Queue depth, delivery counters and send latency percentiles (seconds)."""
+        latencies = sorted(self.latencies)
+        percentile = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] if latencies else 0
+        return dict(self.stats, queue_depth=self.queue_depth, latency_p50=percentile(0.5), latency_p99=percentile(0.99))
@@ -0,0 +1,131 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import Config
+from metrics import feed_poll_latency, feed_queries
+
+
+def query_key(filters):
+    """The part of an alert's canonical filters that changes the search page we fetch."""
+    return filters.get('category'), filters.get('t')
+
+
+def group_alerts_by_query(alerts):
+    """Map each distinct (category, job type) query to the ids of the alerts that need it."""
+    groups = {}
+    for alert in alerts:
+        key = query_key(alert.get('filters') or {})
+        groups.setdefault(key, []).append(str(alert['_id']))
+    return groups
+
+
+def query_params(key):
+    """Search URL parameters for a query key."""
+    category, job_type = key
+    params = {'sort': 'recency'}
+    if category is not None:
+        params['category2_uid'] = category
+    if job_type is not None:
+        params['t'] = job_type
+    return params
+
+
+class FeedPoller:
+    """Fetches each distinct search query once per cycle over a pooled keep-alive session.
+
+    Requests run concurrently in a bounded thread pool, send If-None-Match /
+    If-Modified-Since from the previous response, and back off per query on
+    errors, 429s and 5xx responses.
+    """
+
+    def __init__(self, base_url=None, concurrency=None, timeout=15, min_backoff=30, max_backoff=900):
+        self.base_url = base_url or Config.UPWORK_SEARCH_URL
+        self.concurrency = concurrency or Config.FEED_CONCURRENCY
+        self.timeout = timeout
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='feed')
+        self.validators = {}
+        self.backoff = {}
+        self.retry_at = {}
+        # Stats of the latest poll() only; concurrent callers overwrite it, while the metrics add them all up
+        self.last_cycle = {}
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.session.close()
+
+    def _fetch(self, key):
+        headers = {}
+        etag, last_modified = self.validators.get(key, (None, None))
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        response = self.session.get(self.base_url, params=query_params(key), headers=headers, timeout=self.timeout)
+        if response.status_code == 304:
+            return response.status_code, None, None
+        if response.status_code == 200:
+            self.validators[key] = (response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            return response.status_code, response.text, None
+        return response.status_code, None, response.headers.get('Retry-After')
+
+    def _fail(self, key, retry_after=None):
+        delay = min(self.max_backoff, self.backoff.get(key, self.min_backoff / 2) * 2)
+        if retry_after and str(retry_after).isdigit():
+            delay = max(delay, int(retry_after))
+        self.backoff[key] = delay
+        self.retry_at[key] = time.monotonic() + delay
+
+    async def _poll_one(self, key, semaphore, results, stats):
+        async with semaphore:
+            loop = asyncio.get_running_loop()
+            try:
+                status, body, retry_after = await loop.run_in_executor(self.executor, self._fetch, key)
+            except requests.RequestException:
+                stats['errors'] += 1
+                feed_queries.labels('error').inc()
+                self._fail(key)
+                return
+        stats['fetches'] += 1
+        if status == 200:
+            results[key] = body
+            feed_queries.labels('changed').inc()
+        elif status == 304:
+            stats['not_modified'] += 1
+            feed_queries.labels('not_modified').inc()
+        else:
+            stats['errors'] += 1
+            feed_queries.labels('error').inc()
+            self._fail(key, retry_after)
+            return
+        self.backoff.pop(key, None)
+        self.retry_at.pop(key, None)
+
+    async def poll(self, keys):
+        """Run one cycle over the given query keys and return {key: page body} for changed pages."""
+        start = time.monotonic()
+        stats = {'queries': 0, 'fetches': 0, 'not_modified': 0, 'errors': 0, 'skipped': 0}
+        results = {}
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks = []
+        for key in set(keys):
+            stats['queries'] += 1
+            if self.retry_at.get(key, 0) > start:
+                stats['skipped'] += 1
+                feed_queries.labels('skipped').inc()
+                continue
+            tasks.append(self._poll_one(key, semaphore, results, stats))
+        await asyncio.gather(*tasks)
+        stats['latency'] = time.monotonic() - start
+        feed_poll_latency.observe(stats['latency'])
+        self.last_cycle = stats
+        return results
@@ -0,0 +1,231 @@
+import calendar
+import mmap
+import os
+import threading
+import time
+from bisect import bisect_left
+
+import msgpack
+
+from config import Config
+from job_parser import Job
+
+SEGMENT_SECONDS = 3600
+# A record is [stored_at, *Job fields]; field names are not repeated per record
+_FIELDS = len(Job._fields)
+
+
+def _segment_name(hour):
+    return time.strftime('jobs-%Y%m%d%H', time.gmtime(hour))
+
+
+class _Segment:
+    """One hour of appended records plus its in-memory index (IDs, store times, byte offsets)."""
+
+    def __init__(self, path, hour):
+        self.path = path
+        self.hour = hour
+        self.ids = []
+        self.times = []
+        self.offsets = []
+        self.size = 0
+
+    @property
+    def index_path(self):
+        return self.path[:-len('.msgpack')] + '.idx'
+
+    def load(self):
+        """Read the sidecar index if it covers the whole file, else rebuild it with a scan."""
+        size = os.path.getsize(self.path)
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'rb') as f:
+                indexed_size, self.ids, self.times, self.offsets = msgpack.unpackb(f.read())
+            if indexed_size == size:
+                self.size = size
+                return
+        self.ids, self.times, self.offsets = [], [], []
+        offset = 0
+        for record, end in self._records(0, with_offsets=True):
+            self._index(record[1], record[0], offset)
+            offset = end
+        # A torn write from a crash leaves a partial record; the next append starts after the last good one
+        self.size = offset
+        if offset != size:
+            with open(self.path, 'r+b') as f:
+                f.truncate(offset)
+
+    def write_index(self):
+        with open(self.index_path, 'wb') as f:
+            f.write(msgpack.packb([self.size, self.ids, self.times, self.offsets]))
+
+    def _index(self, job_id, stored_at, offset):
+        self.ids.append(job_id)
+        self.times.append(stored_at)
+        self.offsets.append(offset)
+
+    def _records(self, start, with_offsets=False):
+        if start >= os.path.getsize(self.path):
+            return
+        with open(self.path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            mapped.seek(start)
+            unpacker = msgpack.Unpacker(mapped, raw=False, use_list=False)
+            try:
+                for record in unpacker:
+                    yield (record, start + unpacker.tell()) if with_offsets else record
+            except (msgpack.OutOfData, ValueError):
+                return
+
+    def read(self, since=None, until=None):
+        """Yield (store time, Job) for jobs stored within [since, until), seeking straight to the first one."""
+        position = bisect_left(self.times, since) if since is not None else 0
+        if position == len(self.offsets):
+            return
+        end = self.size
+        if until is not None:
+            stop = bisect_left(self.times, until)
+            if stop == position:
+                return
+            end = self.offsets[stop] if stop < len(self.offsets) else self.size
+        for record, offset in self._records(self.offsets[position], with_offsets=True):
+            yield record[0], Job(*record[1:_FIELDS + 1])
+            if offset >= end:
+                break
+
+
+class JobStore:
+    """Append-only on-disk store of fetched jobs, one msgpack segment per hour.
+
+    Records are compact arrays rather than maps and are appended as jobs
+    arrive; reads memory-map a segment and seek to the first record in range
+    using the per-segment index of job IDs, store times and offsets. Sealed
+    segments get a sidecar index file so reopening the store doesn't rescan
+    them. compact() drops segments older than the retention window.
+    """
+
+    def __init__(self, directory=None, retention=None):
+        self.directory = directory or Config.JOB_STORE_DIR
+        self.retention = retention or Config.JOB_STORE_RETENTION
+        self.segments = {}
+        self.by_id = {}
+        self._active = None
+        self._file = None
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        for name in sorted(os.listdir(self.directory)):
+            if name.startswith('jobs-') and name.endswith('.msgpack'):
+                hour = calendar.timegm(time.strptime(name[5:15], '%Y%m%d%H'))
+                segment = _Segment(os.path.join(self.directory, name), hour)
+                segment.load()
+                self._add_segment(segment)
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def _add_segment(self, segment):
+        self.segments[segment.hour] = segment
+        for job_id, offset in zip(segment.ids, segment.offsets):
+            self.by_id[job_id] = (segment.hour, offset)
+
+    def _segment_for(self, now):
+        hour = int(now) - int(now) % SEGMENT_SECONDS
+        if self._active is not None and self._active.hour == hour:
+            return self._active
+        if self._active is not None:
+            self._file.close()
+            self._active.write_index()
+        segment = self.segments.get(hour)
+        if segment is None:
+            segment = _Segment(os.path.join(self.directory, _segment_name(hour) + '.msgpack'), hour)
+            self.segments[hour] = segment
+        self._active = segment
+        self._file = open(segment.path, 'ab')
+        return segment
+
+    def append(self, jobs, now=None):
+        """Store jobs not already in the store; returns how many were written."""
+        with self._lock:
+            # Taken under the lock so concurrent appends can't store times out of order
+            now = now or time.time()
+            segment = self._segment_for(now)
+            chunks = []
+            offset = segment.size
+            for job in jobs:
+                if job.id in self.by_id:
+                    continue
+                chunk = msgpack.packb([now, *job])
+                segment._index(job.id, now, offset)
+                self.by_id[job.id] = (segment.hour, offset)
+                offset += len(chunk)
+                chunks.append(chunk)
+            if chunks:
+                self._file.write(b''.join(chunks))
+                self._file.flush()
+                segment.size = offset
+            return len(chunks)
+
+    def get(self, job_id):
+        """Return one stored Job by ID, or None."""
+        with self._lock:
+            hour, offset = self.by_id.get(job_id, (None, None))
+            segment = self.segments.get(hour)
+        if segment is None:
+            return None
+        record = next(segment._records(offset), None)
+        return Job(*record[1:_FIELDS + 1]) if record else None
+
+    def jobs_between(self, since=None, until=None, with_times=False):
+        """Yield stored Jobs with store times in [since, until), oldest first; as (store time, Job) if with_times."""
+        with self._lock:
+            segments = [self.segments[hour] for hour in sorted(self.segments)
+                        if (since is None or hour + SEGMENT_SECONDS > since) and (until is None or hour < until)]
+        for segment in segments:
+            for stored_at, job in segment.read(since, until):
+                yield (stored_at, job) if with_times else job
+
+    def recent(self, seconds, now=None, with_times=False):
+        return self.jobs_between((now or time.time()) - seconds, with_times=with_times)
+
+    def compact(self, now=None):
+        """Delete segments that ended before the retention window; returns how many were removed."""
+        cutoff = (now or time.time()) - self.retention
+        removed = 0
+        with self._lock:
+            for hour in sorted(self.segments):
+                if hour + SEGMENT_SECONDS > cutoff:
+                    break
+                segment = self.segments.pop(hour)
+                if segment is self._active:
+                    self._file.close()
+                    self._active = self._file = None
+                for job_id in segment.ids:
+                    if self.by_id.get(job_id, (None,))[0] == hour:
+                        del self.by_id[job_id]
+                for path in (segment.path, segment.index_path):
+                    if os.path.exists(path):
+                        os.remove(path)
+                removed += 1
+        return removed
+
+    def close(self):
+        with self._lock:
+            if self._active is not None:
+                self._file.close()
+                self._active.write_index()
+                self._active = self._file = None
+
+
+def backfill(store, filters, seconds=None, batch_size=1000):
+    """Return (store time, Job) for stored jobs from the last ``seconds`` (BACKFILL_HOURS) that match one alert's canonical filters."""
+    from batch_matcher import BatchMatcher
+
+    matcher = BatchMatcher(capacity=1)
+    matcher.add('alert', filters)
+    matched, batch = [], []
+    for entry in store.recent(seconds or Config.BACKFILL_HOURS * 3600, with_times=True):
+        batch.append(entry)
+        if len(batch) == batch_size:
+            matched += [entry for entry, hits in zip(batch, matcher.match_batch([job for _, job in batch])) if hits]
+            batch = []
+    if batch:
+        matched += [entry for entry, hits in zip(batch, matcher.match_batch([job for _, job in batch])) if hits]
+    return matched
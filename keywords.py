@@ -0,0 +1,212 @@
+import re
+from collections import deque
+
+TOKEN = re.compile(r"[a-z0-9][a-z0-9+#]*")
+TERM = re.compile(r'([+-]?)(?:"([^"]*)"|([^\s,"]+))')
+
+
+def tokenize(text):
+    """Lowercase word tokens; keywords and job text go through the same normalization."""
+    return TOKEN.findall((text or '').lower())
+
+
+def parse_keywords(text):
+    """Parse a keyword expression into its canonical form, or None if it has no terms.
+
+    Terms are words or "quoted phrases" separated by spaces or commas. A job
+    must contain at least one plain term, every ``+term`` and no ``-term``:
+    ``python, "machine learning" +remote -wordpress``.
+    """
+    expression = {'any': set(), 'all': set(), 'none': set()}
+    for sign, phrase, word in TERM.findall(text or ''):
+        term = ' '.join(tokenize(phrase or word))
+        if term:
+            expression[{'+': 'all', '-': 'none'}.get(sign, 'any')].add(term)
+    # Keep the three lists disjoint: a required term needn't also be optional, and exclusion wins
+    expression['all'] -= expression['none']
+    expression['any'] -= expression['all'] | expression['none']
+    if not any(expression.values()):
+        return None
+    return {kind: sorted(terms) for kind, terms in expression.items()}
+
+
+def job_text(job):
+    return f"{job.title} {job.description}"
+
+
+def evaluate(expression, text):
+    """Check one keyword expression against a job's text (reference implementation)."""
+    padded = f" {' '.join(tokenize(text))} "
+    found = lambda term: f" {term} " in padded
+    if expression['any'] and not any(found(term) for term in expression['any']):
+        return False
+    return all(found(term) for term in expression['all']) and not any(found(term) for term in expression['none'])
+
+
+class _Node:
+    __slots__ = ('children', 'fail', 'terms')
+
+    def __init__(self):
+        self.children = {}
+        self.fail = None
+        self.terms = ()
+
+
+class _Automaton:
+    """Aho-Corasick trie over token sequences; failure links are rebuilt on the first scan after an insert."""
+
+    def __init__(self):
+        self.root = _Node()
+        self.size = 0
+        self._dirty = False
+
+    def insert(self, term, term_id):
+        node = self.root
+        for token in term.split():
+            node = node.children.setdefault(token, _Node())
+        node.terms = node.terms + (term_id,)
+        self.size += 1
+        self._dirty = True
+
+    def _build_failure_links(self):
+        self.root.fail = self.root
+        queue = deque()
+        for child in self.root.children.values():
+            child.fail = self.root
+            queue.append(child)
+        while queue:
+            node = queue.popleft()
+            for token, child in node.children.items():
+                fail = node.fail
+                while fail is not self.root and token not in fail.children:
+                    fail = fail.fail
+                child.fail = fail.children.get(token, self.root)
+                # Inherit the terms that end at the fallback state so suffix phrases are reported too
+                child.terms = tuple(dict.fromkeys(child.terms + child.fail.terms))
+                queue.append(child)
+        self._dirty = False
+
+    def scan(self, tokens, found):
+        """Add the ID of every term occurring in tokens to found."""
+        if self._dirty:
+            self._build_failure_links()
+        root = self.root
+        node = root
+        for token in tokens:
+            while node is not root and token not in node.children:
+                node = node.fail
+            node = node.children.get(token, root)
+            if node.terms:
+                found.update(node.terms)
+
+
+class KeywordIndex:
+    """Aho-Corasick automaton over the tokens of every alert's keyword terms.
+
+    A job's text is tokenized and scanned once; each term found is then
+    mapped back to the alerts using it. Terms shared by many alerts are stored
+    once and dropped when their last alert goes.
+
+    New terms go into a small pending automaton, so adding an alert only
+    rebuilds the failure links of the terms added since the last merge. Once
+    pending or dead terms pass REBUILD_SLACK and a quarter of all terms, the
+    next scan rebuilds one automaton from the live terms.
+    """
+
+    REBUILD_SLACK = 64
+
+    def __init__(self):
+        self.term_ids = {}
+        self.term_alerts = []
+        self.expressions = {}
+        self.negative_only = set()
+        self._main = _Automaton()
+        self._pending = _Automaton()
+        self._dead = 0
+
+    def __len__(self):
+        return len(self.expressions)
+
+    @property
+    def alert_ids(self):
+        return self.expressions.keys()
+
+    def _term_id(self, term):
+        term_id = self.term_ids.get(term)
+        if term_id is None:
+            term_id = self.term_ids[term] = len(self.term_alerts)
+            self.term_alerts.append({})
+            self._pending.insert(term, term_id)
+        elif not self.term_alerts[term_id]:
+            self._dead -= 1
+        return term_id
+
+    def add(self, alert_id, expression):
+        """Index an alert's canonical keyword expression (see parse_keywords)."""
+        self.remove(alert_id)
+        if not expression:
+            return
+        self.expressions[alert_id] = expression
+        for kind in ('any', 'all', 'none'):
+            for term in expression[kind]:
+                self.term_alerts[self._term_id(term)][alert_id] = kind
+        if not expression['any'] and not expression['all']:
+            self.negative_only.add(alert_id)
+
+    def remove(self, alert_id):
+        expression = self.expressions.pop(alert_id, None)
+        if expression is None:
+            return
+        for kind in ('any', 'all', 'none'):
+            for term in expression[kind]:
+                alerts = self.term_alerts[self.term_ids[term]]
+                if alerts.pop(alert_id, None) is not None and not alerts:
+                    self._dead += 1
+        self.negative_only.discard(alert_id)
+
+    def _rebuild(self):
+        """Rebuild a single automaton from the terms still in use, renumbering them."""
+        live = [(term, self.term_alerts[term_id]) for term, term_id in self.term_ids.items() if self.term_alerts[term_id]]
+        self.term_ids = {term: term_id for term_id, (term, _) in enumerate(live)}
+        self.term_alerts = [alerts for _, alerts in live]
+        self._main = _Automaton()
+        for term, term_id in self.term_ids.items():
+            self._main.insert(term, term_id)
+        self._pending = _Automaton()
+        self._dead = 0
+
+    def found_terms(self, text):
+        """IDs of every indexed term that occurs in text."""
+        slack = max(self.REBUILD_SLACK, len(self.term_ids) // 4)
+        if self._pending.size > slack or self._dead > slack:
+            self._rebuild()
+        tokens = tokenize(text)
+        found = set()
+        self._main.scan(tokens, found)
+        if self._pending.size:
+            self._pending.scan(tokens, found)
+        if self._dead:
+            # Terms whose last alert went stay in the trie until the next rebuild
+            found = {term_id for term_id in found if self.term_alerts[term_id]}
+        return found
+
+    def match(self, text):
+        """Return the ids of every indexed alert whose keyword expression text satisfies."""
+        any_hits = set()
+        all_hits = {}
+        excluded = set()
+        for term_id in self.found_terms(text):
+            for alert_id, kind in self.term_alerts[term_id].items():
+                if kind == 'any':
+                    any_hits.add(alert_id)
+                elif kind == 'all':
+                    all_hits[alert_id] = all_hits.get(alert_id, 0) + 1
+                else:
+                    excluded.add(alert_id)
+        expressions = self.expressions
+        matched = {alert_id for alert_id in any_hits if len(expressions[alert_id]['all']) == all_hits.get(alert_id, 0)}
+        # Alerts with only +terms never appear in any_hits
+        matched.update(alert_id for alert_id, count in all_hits.items()
+                       if not expressions[alert_id]['any'] and count == len(expressions[alert_id]['all']))
+        matched |= self.negative_only
+        return matched - excluded
@@ -0,0 +1,65 @@
+import atexit
+import copy
+import json
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+from config import Config
+
+# Attributes every LogRecord has; anything else came in through ``extra=`` and is emitted as a field
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the level, logger, message and any ``extra`` fields."""
+
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRS)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """QueueHandler that leaves formatting to the listener.
+
+    The stock prepare() formats the message and traceback on the logging
+    thread and drops exc_info; this one passes the record through as is.
+    """
+
+    def prepare(self, record):
+        # A copy, so handlers that run later in the caller's thread see the record unchanged
+        return copy.copy(record)
+
+
+_listener = None
+
+
+def setup_logging(level=None):
+    """Send log records through a queue to a background thread, so callers never block on I/O.
+
+    Records below ``level`` (LOG_LEVEL) are dropped before any formatting
+    happens; formatting and writing happen on the listener thread.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    records = queue.SimpleQueue()
+    output = logging.StreamHandler()
+    output.setFormatter(JsonFormatter())
+    _listener = QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    root = logging.getLogger()
+    root.handlers = [_DeferredQueueHandler(records)]
+    root.setLevel(level or Config.LOG_LEVEL)
+    # httpx logs every Bot API request at INFO
+    logging.getLogger("httpx").setLevel(logging.WARNING)
@@ -0,0 +1,228 @@
+from alert_filters import RANGE_FIELDS, TIERS, stored_filters
+from keywords import KeywordIndex, evaluate, job_text
+
+INF = float("inf")
+
+
+def compile_filters(filters):
+    """Turn canonical filters (see alert_filters.normalize_filters) into index constraints."""
+    mask = filters.get('tier_mask') or 0
+    spec = {
+        'category': filters.get('category'),
+        'tier': frozenset(tier for tier in TIERS if mask & (1 << tier)) or None,
+        't': filters.get('t'),
+        'payment_verified': True if filters.get('payment_verified') else None,
+        'contract_to_hire': filters.get('contract_to_hire'),
+    }
+    for field in RANGE_FIELDS:
+        bounds = filters.get(field)
+        if bounds is not None:
+            bounds = (bounds[0], INF if bounds[1] is None else bounds[1])
+        spec[field] = bounds
+    return spec
+
+
+def matches(filters, job):
+    """Check a single job against one alert's canonical filters (reference scalar matcher)."""
+    spec = compile_filters(filters)
+    if spec['category'] is not None and spec['category'] != job.category:
+        return False
+    if spec['tier'] is not None and job.tier not in spec['tier']:
+        return False
+    if spec['t'] is not None and spec['t'] != job.t:
+        return False
+    for field in RANGE_FIELDS:
+        bounds = spec[field]
+        if bounds is not None and not bounds[0] <= getattr(job, field) <= bounds[1]:
+            return False
+    if spec['payment_verified'] and not job.payment_verified:
+        return False
+    if spec['contract_to_hire'] is not None and spec['contract_to_hire'] != job.contract_to_hire:
+        return False
+    if filters.get('keywords') and not evaluate(filters['keywords'], job_text(job)):
+        return False
+    return True
+
+
+class _ValueIndex:
+    """Alert ids bucketed by an exact value, plus the alerts that accept any value."""
+
+    def __init__(self):
+        self.buckets = {}
+        self.any = set()
+
+    def add(self, alert_id, values):
+        if values is None:
+            self.any.add(alert_id)
+            return
+        for value in values:
+            self.buckets.setdefault(value, set()).add(alert_id)
+
+    def remove(self, alert_id, values):
+        if values is None:
+            self.any.discard(alert_id)
+            return
+        for value in values:
+            bucket = self.buckets.get(value)
+            if bucket is not None:
+                bucket.discard(alert_id)
+                if not bucket:
+                    del self.buckets[value]
+
+    def lookup(self, value):
+        return [self.buckets.get(value, ()), self.any]
+
+
+class _IntervalNode:
+    """Node of a centered interval tree: the intervals containing ``center``, sorted both ways, and subtrees."""
+
+    __slots__ = ('center', 'by_low', 'by_high', 'left', 'right')
+
+    def __init__(self, intervals):
+        # The median low bound lies inside its own interval, so every node keeps at least one
+        self.center = sorted(low for low, _ in intervals)[len(intervals) // 2]
+        here = [bounds for bounds in intervals if bounds[0] <= self.center <= bounds[1]]
+        self.by_low = sorted(here)
+        self.by_high = sorted(here, key=lambda bounds: bounds[1], reverse=True)
+        left = [bounds for bounds in intervals if bounds[1] < self.center]
+        right = [bounds for bounds in intervals if bounds[0] > self.center]
+        self.left = _IntervalNode(left) if left else None
+        self.right = _IntervalNode(right) if right else None
+
+
+class _RangeIndex:
+    """Alert ids grouped by distinct (low, high) interval, with a centered interval tree over the intervals.
+
+    The tree is rebuilt on the next lookup after an interval is added or
+    drops its last alert; alerts joining or leaving an existing interval
+    only change its bucket.
+    """
+
+    def __init__(self):
+        self.buckets = {}
+        self.any = set()
+        self._tree = None
+
+    def add(self, alert_id, bounds):
+        if bounds is None:
+            self.any.add(alert_id)
+            return
+        bucket = self.buckets.get(bounds)
+        if bucket is None:
+            bucket = self.buckets[bounds] = set()
+            self._tree = None
+        bucket.add(alert_id)
+
+    def remove(self, alert_id, bounds):
+        if bounds is None:
+            self.any.discard(alert_id)
+            return
+        bucket = self.buckets.get(bounds)
+        if bucket is None:
+            return
+        bucket.discard(alert_id)
+        if not bucket:
+            del self.buckets[bounds]
+            self._tree = None
+
+    def lookup(self, value):
+        """Return the buckets of every interval containing value (a stabbing query, O(log n + matches))."""
+        sets = [self.any]
+        if self._tree is None and self.buckets:
+            self._tree = _IntervalNode(list(self.buckets))
+        node = self._tree
+        while node is not None:
+            if value < node.center:
+                for bounds in node.by_low:
+                    if bounds[0] > value:
+                        break
+                    sets.append(self.buckets[bounds])
+                node = node.left
+            elif value > node.center:
+                for bounds in node.by_high:
+                    if bounds[1] < value:
+                        break
+                    sets.append(self.buckets[bounds])
+                node = node.right
+            else:
+                sets.extend(self.buckets[bounds] for bounds in node.by_low)
+                break
+        return sets
+
+
+class AlertIndex:
+    """Inverted index over alert filters so a job is only checked against candidate alerts."""
+
+    VALUE_FIELDS = ('category', 'tier', 't', 'payment_verified', 'contract_to_hire')
+
+    def __init__(self):
+        self.specs = {}
+        self.indexes = {field: _ValueIndex() for field in self.VALUE_FIELDS}
+        self.indexes.update({field: _RangeIndex() for field in RANGE_FIELDS})
+        self.keywords = KeywordIndex()
+
+    def __len__(self):
+        return len(self.specs)
+
+    def __contains__(self, alert_id):
+        return alert_id in self.specs
+
+    @staticmethod
+    def _values(field, spec):
+        value = spec[field]
+        if value is None or field == 'tier' or field in RANGE_FIELDS:
+            return value
+        return (value,)
+
+    def add(self, alert_id, filters):
+        """Index an alert's canonical filters, replacing any previous version with the same id."""
+        if alert_id in self.specs:
+            self.remove(alert_id)
+        spec = compile_filters(filters)
+        self.specs[alert_id] = spec
+        for field, index in self.indexes.items():
+            index.add(alert_id, self._values(field, spec))
+        if filters.get('keywords'):
+            self.keywords.add(alert_id, filters['keywords'])
+
+    def remove(self, alert_id):
+        """Drop an alert from the index; unknown ids are ignored."""
+        spec = self.specs.pop(alert_id, None)
+        if spec is None:
+            return
+        for field, index in self.indexes.items():
+            index.remove(alert_id, self._values(field, spec))
+        self.keywords.remove(alert_id)
+
+    def load(self, alerts):
+        """Index stored alert documents as returned by db_manager."""
+        for alert in alerts:
+            filters = stored_filters(alert)
+            if filters is not None:
+                self.add(str(alert['_id']), filters)
+
+    def match(self, job):
+        """Return the ids of every alert whose filters accept the job (a job_parser.Job)."""
+        groups = []
+        for field, index in self.indexes.items():
+            value = getattr(job, field)
+            if field == 'payment_verified':
+                # Alerts that require verification only accept verified jobs
+                sets = [index.any, index.buckets.get(True, ())] if value else [index.any]
+            else:
+                sets = index.lookup(value)
+            groups.append((sum(len(s) for s in sets), sets))
+        groups.sort(key=lambda group: group[0])
+
+        candidates = set().union(*groups[0][1])
+        for _, sets in groups[1:]:
+            if not candidates:
+                break
+            candidates = set().union(*(candidates & s for s in sets if s))
+        if candidates and len(self.keywords):
+            # Alerts with keywords also need their expression satisfied by the job's text
+            with_keywords = candidates & self.keywords.alert_ids
+            if with_keywords:
+                candidates -= with_keywords
+                candidates |= with_keywords & self.keywords.match(job_text(job))
+        return candidates
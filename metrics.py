@@ -0,0 +1,235 @@
+import functools
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _label_text(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{str(value)}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.children = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def labels(self, *values):
+        """Child metric for one combination of label values (cached, so hot paths can keep it)."""
+        child = self.children.get(values)
+        if child is None:
+            with self._lock:
+                child = self.children.setdefault(values, self._child())
+        return child
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in list(self.children.items()):
+            lines.extend(child.render(self.name, _label_text(self.label_names, values)))
+        return lines
+
+
+class _CounterChild:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def render(self, name, labels):
+        return [f"{name}_total{labels} {self.value}"]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+    _child = _CounterChild
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+
+class _GaugeChild:
+    __slots__ = ('value', 'callback')
+
+    def __init__(self):
+        self.value = 0
+        self.callback = None
+
+    def set(self, value):
+        self.value = value
+
+    def set_function(self, callback):
+        """Read the value from callback at scrape time instead of tracking it."""
+        self.callback = callback
+
+    def render(self, name, labels):
+        value = self.callback() if self.callback is not None else self.value
+        return [f"{name}{labels} {value}"]
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+    _child = _GaugeChild
+
+    def set(self, value):
+        self.labels().set(value)
+
+
+class _HistogramChild:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        # Increments can race across threads; an occasional lost sample is fine for monitoring
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def time(self):
+        return _Timer(self)
+
+    def render(self, name, labels):
+        lines = []
+        cumulative = 0
+        inner = labels[1:-1] + ',' if labels else ''
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{inner}le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum{labels} {self.sum}")
+        lines.append(f"{name}_count{labels} {self.count}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ('histogram', 'started')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(name, help, labels)
+
+    def _child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+CONTENT_TYPE = 'text/plain; version=0.0.4'
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = registry.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port, host='0.0.0.0'):
+    """Expose this process's registry at http://host:port/metrics from a daemon thread.
+
+    For processes without the Flask app (the polling bot, the pipeline
+    worker), whose metrics would otherwise never be scraped.
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    return server
+
+handler_latency = Histogram('bot_handler_seconds', 'Telegram update handler latency', labels=('handler',))
+mongo_latency = Histogram('mongo_command_seconds', 'MongoDB command latency', labels=('command', 'outcome'))
+stage_latency = Histogram('pipeline_stage_seconds', 'Time a poll cycle spends in each pipeline stage', labels=('stage',))
+queue_wait = Histogram('pipeline_queue_wait_seconds', 'Time a poll cycle waits in the queue before each stage', labels=('stage',))
+queue_depth = Gauge('queue_depth', 'Items waiting in internal queues', labels=('queue',))
+feed_queries = Counter('feed_queries', 'Search queries polled, by outcome', labels=('outcome',))
+feed_poll_latency = Histogram('feed_poll_seconds', 'Time one FeedPoller.poll call takes over all its queries')
+telegram_sends = Counter('telegram_sends', 'Outbound Telegram notification attempts', labels=('outcome',))
+
+
+def instrument_handler(callback):
+    """Wrap a python-telegram-bot callback so its latency is recorded under its name."""
+    child = handler_latency.labels(callback.__name__)
+
+    @functools.wraps(callback)
+    async def wrapper(*args):
+        started = time.perf_counter()
+        try:
+            return await callback(*args)
+        finally:
+            child.observe(time.perf_counter() - started)
+
+    return wrapper
+
+
+def mongo_command_listener():
+    """A pymongo CommandListener that records the duration of every MongoDB command the driver sends."""
+    from pymongo import monitoring
+
+    class MongoCommandListener(monitoring.CommandListener):
+        def started(self, event):
+            pass
+
+        def succeeded(self, event):
+            mongo_latency.labels(event.command_name, 'ok').observe(event.duration_micros / 1e6)
+
+        def failed(self, event):
+            mongo_latency.labels(event.command_name, 'error').observe(event.duration_micros / 1e6)
+
+    return MongoCommandListener()
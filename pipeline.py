@@ -0,0 +1,349 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from bson.objectid import ObjectId
+
+from alert_cache import alert_cache
+from alert_filters import stored_filters
+from config import Config
+from dedup import NotifiedJobs, SeenJobs
+from dispatcher import NotificationDispatcher
+from feed import FeedPoller, query_key
+from job_parser import parse_jobs
+from job_store import JobStore, backfill
+from log_setup import setup_logging
+from matcher import AlertIndex
+from metrics import queue_depth, queue_wait, stage_latency
+from shard_workers import ShardedMatcher
+import db_manager
+
+logger = logging.getLogger(__name__)
+
+# Starting poll interval (seconds) per category; busy categories post new jobs every few minutes
+CATEGORY_INTERVALS = {
+    "531770282580668418": 60,   # Web, Mobile & Software Dev
+    "531770282580668421": 120,  # Design & Creative
+    "531770282580668422": 120,  # Sales & Marketing
+    "531770282580668423": 120,  # Writing
+    "531770282584862723": 600,  # Legal
+    "531770282584862722": 600,  # Engineering & Architecture
+}
+
+
+class Cycle:
+    """One poll of one query as it moves through the pipeline, with per-stage timings.
+
+    A stage's time runs from when its worker takes the cycle off the queue;
+    the time spent waiting in queues is added up under ``queued``.
+    """
+
+    __slots__ = ('key', 'started', 'stage_started', 'timings', 'body', 'jobs', 'notifications')
+
+    def __init__(self, key):
+        self.key = key
+        self.started = self.stage_started = time.monotonic()
+        self.timings = {}
+        self.body = None
+        self.jobs = []
+        self.notifications = []
+
+    def dequeued(self, stage):
+        now = time.monotonic()
+        waited = now - self.stage_started
+        self.timings['queued'] = self.timings.get('queued', 0) + waited
+        queue_wait.labels(stage).observe(waited)
+        self.stage_started = now
+
+    def mark(self, stage):
+        now = time.monotonic()
+        elapsed = self.timings[stage] = now - self.stage_started
+        stage_latency.labels(stage).observe(elapsed)
+        self.stage_started = now
+
+
+def created_at(alert):
+    """Creation time of an alert from its ObjectId (whole seconds), or None if its ID isn't one."""
+    alert_id = alert['_id']
+    if not isinstance(alert_id, ObjectId):
+        if not ObjectId.is_valid(str(alert_id)):
+            return None
+        alert_id = ObjectId(str(alert_id))
+    return alert_id.generation_time.timestamp()
+
+
+class Pipeline:
+    """fetch -> parse -> dedup -> match -> dispatch, as async stages joined by bounded queues.
+
+    APScheduler triggers one job per distinct alert query. A query is skipped
+    while a cycle for it is still in flight, and a full stage queue makes the
+    stage before it wait, so a slow stage slows intake instead of piling up
+    work. Each query's interval adapts: it shortens while polls keep finding
+    new jobs and lengthens while they don't, within the configured bounds.
+    """
+
+    STAGES = ('fetch', 'parse', 'dedup', 'match', 'dispatch')
+
+    def __init__(self, poller=None, seen=None, dispatcher=None, index=None, cache=None, queue_size=None, store=None,
+                 notified=None):
+        self.poller = poller if poller is not None else FeedPoller()
+        self.seen = seen if seen is not None else SeenJobs(db_manager.seen_jobs_collection)
+        self.notified = notified if notified is not None else NotifiedJobs(db_manager.notified_collection)
+        self.dispatcher = dispatcher
+        self.cache = cache if cache is not None else alert_cache
+        if index is None:
+            index = ShardedMatcher(owner=self._alert_owner) if Config.MATCH_WORKERS > 1 else AlertIndex()
+        self.index = index
+        self.store = store if store is not None else JobStore()
+        # One thread, so appends reach the store in the order cycles were deduplicated
+        self.store_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='job-store')
+        self.backfills = asyncio.Queue()
+        queue_size = queue_size or Config.PIPELINE_QUEUE_SIZE
+        self.queues = {stage: asyncio.Queue(queue_size) for stage in self.STAGES}
+        for stage, queue in self.queues.items():
+            queue_depth.labels(f'pipeline_{stage}').set_function(queue.qsize)
+        self.scheduler = AsyncIOScheduler()
+        self.intervals = {}
+        self.in_flight = set()
+        self.last_cycles = {}
+        self.skipped = 0
+        self.tasks = []
+
+    def _alert_owner(self, alert_id):
+        # Shard key for ShardedMatcher, which the cache calls after storing the alert
+        return (self.cache.alerts.get(alert_id) or {}).get('user_id', alert_id)
+
+    def _job_id(self, key):
+        return f"poll:{key[0]}:{key[1]}"
+
+    def base_interval(self, key):
+        return CATEGORY_INTERVALS.get(key[0], Config.POLL_INTERVAL)
+
+    def sync_queries(self):
+        """Schedule a poll job for every query some alert needs and drop the ones no alert needs."""
+        filters = (stored_filters(alert) for alert in list(self.cache.alerts.values()))
+        keys = {query_key(alert_filters) for alert_filters in filters if alert_filters is not None}
+        for key in keys - set(self.intervals):
+            interval = self.intervals[key] = self.base_interval(key)
+            self.scheduler.add_job(self.trigger, 'interval', seconds=interval, args=[key], id=self._job_id(key),
+                                   max_instances=1, coalesce=True, next_run_time=datetime.now(timezone.utc))
+        for key in set(self.intervals) - keys:
+            del self.intervals[key]
+            self.scheduler.remove_job(self._job_id(key))
+
+    async def trigger(self, key):
+        """Scheduler entry point: start a cycle for a query unless one is already running."""
+        if key in self.in_flight:
+            self.skipped += 1
+            return
+        self.in_flight.add(key)
+        await self.queues['fetch'].put(Cycle(key))
+
+    def _adapt(self, cycle):
+        key = cycle.key
+        if key not in self.intervals:
+            return
+        current = self.intervals[key]
+        if cycle.jobs:
+            interval = max(Config.POLL_INTERVAL_MIN, current * 0.75)
+        else:
+            interval = min(Config.POLL_INTERVAL_MAX, current * 1.25)
+        if abs(interval - current) >= 1:
+            self.intervals[key] = interval
+            self.scheduler.reschedule_job(self._job_id(key), trigger='interval', seconds=interval)
+
+    def _finish(self, cycle):
+        cycle.timings['total'] = time.monotonic() - cycle.started
+        self.last_cycles[cycle.key] = cycle.timings
+        self.in_flight.discard(cycle.key)
+        self._adapt(cycle)
+        logger.info("Cycle %s: %d new jobs, %d notifications, %s", cycle.key, len(cycle.jobs),
+                    len(cycle.notifications), {stage: round(t, 4) for stage, t in cycle.timings.items()})
+
+    async def _fetch(self, cycle):
+        results = await self.poller.poll([cycle.key])
+        cycle.body = results.get(cycle.key)
+        return cycle.body is not None
+
+    async def _parse(self, cycle):
+        loop = asyncio.get_running_loop()
+        cycle.jobs = await loop.run_in_executor(None, parse_jobs, cycle.body, cycle.key[0])
+        if not cycle.jobs:
+            # A search page always lists jobs; none at all means changed markup or a block page, not a quiet feed
+            logger.warning("Query %s returned %d bytes but no jobs parsed from it", cycle.key, len(cycle.body))
+        cycle.body = None
+        return bool(cycle.jobs)
+
+    async def _dedup(self, cycle):
+        # The same job fetched from a category page and the all-categories page is matched twice,
+        # since only the former knows its category; _unsent() keeps a user from getting it twice
+        keys = [f"{job.id}:{job.category}" for job in cycle.jobs]
+        new_keys = set(await db_manager.run_async(self.seen.filter_new, keys))
+        cycle.jobs = [job for job, key in zip(cycle.jobs, keys) if key in new_keys]
+        if cycle.jobs:
+            # Written in the background: waiting for the write here would add a thread hop to every cycle
+            self.store_writer.submit(self._store_jobs, cycle.jobs)
+        return bool(cycle.jobs)
+
+    def _store_jobs(self, jobs):
+        try:
+            self.store.append(jobs)
+        except Exception:
+            logger.exception("Could not write %d jobs to the job store", len(jobs))
+
+    async def _match_jobs(self, jobs):
+        """Matching alert IDs per job, from the in-process index or, off the loop, from the shard workers."""
+        if isinstance(self.index, ShardedMatcher):
+            return await asyncio.get_running_loop().run_in_executor(None, self.index.match_batch, jobs)
+        return [self.index.match(job) for job in jobs]
+
+    async def _unsent(self, notifications):
+        """Drop (user_id, job) pairs that user was already notified of, from any cycle or backfill."""
+        notifications = {f"{user_id}:{job.id}": (user_id, job) for user_id, job in notifications}
+        new_keys = await db_manager.run_async(self.notified.filter_new, list(notifications))
+        return [notifications[key] for key in new_keys]
+
+    async def _match(self, cycle):
+        candidates = []
+        for job, alert_ids in zip(cycle.jobs, await self._match_jobs(cycle.jobs)):
+            for alert_id in alert_ids:
+                alert = self.cache.get(alert_id)
+                if alert is not None:
+                    candidates.append((alert['user_id'], job))
+        cycle.notifications = await self._unsent(candidates)
+        return bool(cycle.notifications)
+
+    async def _dispatch(self, cycle):
+        if self.dispatcher is not None:
+            await self.dispatcher.enqueue(cycle.notifications)
+        return False
+
+    def add(self, alert_id, filters):
+        # AlertCache subscriber callback, scheduled on the loop after the index has the alert
+        self.backfills.put_nowait(alert_id)
+
+    def remove(self, alert_id):
+        pass
+
+    async def _backfill(self):
+        """Send newly created alerts the matching jobs from the last BACKFILL_HOURS of the job store."""
+        loop = asyncio.get_running_loop()
+        while True:
+            alert_id = await self.backfills.get()
+            alert = self.cache.get(alert_id)
+            if alert is None or not alert.get('backfill'):
+                continue
+            filters = stored_filters(alert)
+            if filters is None:
+                continue
+            try:
+                stored = await loop.run_in_executor(None, backfill, self.store, filters)
+                user_id = alert['user_id']
+                matches = await self._match_jobs([job for _, job in stored])
+                jobs = [job for (stored_at, job), alert_ids in zip(stored, matches)
+                        if not any(self._delivered_by(other, alert_id, user_id, stored_at) for other in alert_ids)]
+                jobs = [job for _, job in await self._unsent((user_id, job) for job in jobs)]
+                if jobs and self.dispatcher is not None:
+                    await self.dispatcher.enqueue((user_id, job) for job in jobs)
+                await db_manager.run_async(db_manager.clear_backfill, alert_id)
+                logger.info("Backfilled alert %s with %d stored jobs", alert_id, len(jobs))
+            except Exception:
+                logger.exception("Backfill failed for alert %s", alert_id)
+
+    def _delivered_by(self, other_id, alert_id, user_id, stored_at):
+        """Whether another alert of the user already got a job stored at ``stored_at`` from the live pipeline.
+
+        Only alerts that existed when the job was stored (a whole second
+        earlier, as ObjectIds round down) and aren't waiting for their own
+        backfill qualify; two alerts created together must not skip each
+        other's jobs.
+        """
+        if other_id == alert_id:
+            return False
+        other = self.cache.get(other_id)
+        if other is None or other['user_id'] != user_id or other.get('backfill'):
+            return False
+        created = created_at(other)
+        return created is not None and created + 1 <= stored_at
+
+    async def _deliver(self):
+        await self.dispatcher.restore()
+        await self.dispatcher.run()
+
+    async def _stage(self, stage, handler, next_stage):
+        queue = self.queues[stage]
+        while True:
+            cycle = await queue.get()
+            cycle.dequeued(stage)
+            try:
+                proceed = await handler(cycle)
+                cycle.mark(stage)
+                if proceed and next_stage:
+                    await self.queues[next_stage].put(cycle)
+                else:
+                    self._finish(cycle)
+            except Exception:
+                logger.exception("Stage %s failed for query %s", stage, cycle.key)
+                self._finish(cycle)
+            finally:
+                queue.task_done()
+
+    def start(self):
+        """Start the stage workers and the dispatcher; cycles then begin with trigger()."""
+        loop = asyncio.get_running_loop()
+        # match() runs on the loop, so an in-process index must only change there; the shard
+        # matcher locks for itself and takes changes straight from the cache's thread
+        self.cache.subscribe(self.index, loop=None if isinstance(self.index, ShardedMatcher) else loop)
+        self.cache.subscribe(self, loop=loop)
+        self.tasks.append(asyncio.create_task(self._backfill()))
+        handlers = [self._fetch, self._parse, self._dedup, self._match, self._dispatch]
+        for position, (stage, handler) in enumerate(zip(self.STAGES, handlers)):
+            next_stage = self.STAGES[position + 1] if position + 1 < len(self.STAGES) else None
+            workers = Config.FEED_CONCURRENCY if stage == 'fetch' else 1
+            self.tasks += [asyncio.create_task(self._stage(stage, handler, next_stage)) for _ in range(workers)]
+        if self.dispatcher is not None:
+            self.tasks.append(asyncio.create_task(self._deliver()))
+
+    async def run(self):
+        """Start the stages, the dispatcher and the scheduler, and run until cancelled."""
+        self.start()
+        self.scheduler.start()
+        self.sync_queries()
+        self.scheduler.add_job(self.sync_queries, 'interval', seconds=60, id='sync_queries')
+        self.scheduler.add_job(self.store.compact, 'interval', hours=1, id='compact_job_store')
+        try:
+            await asyncio.gather(*self.tasks)
+        finally:
+            self.scheduler.shutdown(wait=False)
+            self.close()
+
+    def close(self):
+        """Finish pending job store writes, then close the store and the poller."""
+        self.store_writer.shutdown(wait=True)
+        self.store.close()
+        self.poller.close()
+        if isinstance(self.index, ShardedMatcher):
+            self.index.close()
+
+
+def main():
+    """Run the polling pipeline as its own process."""
+    from telegram import Bot
+
+    setup_logging()
+    db_manager.ensure_indexes()
+    alert_cache.start()
+
+    async def run():
+        async with Bot(Config.TELEGRAM_BOT_TOKEN) as bot:
+            dispatcher = NotificationDispatcher(bot, outbox=db_manager.outbox_collection)
+            await Pipeline(dispatcher=dispatcher).run()
+
+    asyncio.run(run())
+
+
+if __name__ == '__main__':
+    main()
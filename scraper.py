@@ -2,15 +2,23 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
     Application,
     CommandHandler,
-    CallbackQueryHandler,
     ContextTypes,
+    MessageHandler,
+    filters,
 )
-from db_manager import add_alert, list_alerts, delete_alert
-from config import TELEGRAM_TOKEN
+from db_manager import add_alert_async, delete_alert_async, ensure_indexes, run_async
+from alert_cache import alert_cache
+from callback_router import CallbackRouter
+from session_store import create_session_store
+from keywords import parse_keywords
+from config import Config
+from log_setup import setup_logging
+from metrics import instrument_handler
 import logging
 
-logging.basicConfig(level=logging.INFO)
-user_alerts = {}
+logger = logging.getLogger(__name__)
+# Created by build_application(): the mongo backend connects and builds its index, which importing must not do
+session_store = None
 
 # Categories mapping
 categories = {
@@ -28,320 +36,247 @@ categories = {
     "531770282580668423": "Writing",
 }
 
+def _markup(rows, back=True):
+    """Build an inline keyboard from (label, callback_data) rows, optionally with a Back button"""
+    keyboard = [[InlineKeyboardButton(label, callback_data=data)] for label, data in rows]
+    if back:
+        keyboard.append([InlineKeyboardButton("Back to Menu", callback_data='alert_menu')])
+    return InlineKeyboardMarkup(keyboard)
+
+# Static keyboards are built once at import and shared by every user
+MAIN_MENU_MARKUP = _markup([
+    ("Create New Alert", 'menu_new_alert'),
+    ("List Alerts", 'menu_list_alerts'),
+    ("Delete Alert", 'menu_delete_alert'),
+], back=False)
+ALERT_MENU_MARKUP = _markup([
+    ("Experience Level", 'set_experience'),
+    ("Category", 'set_category'),
+    ("Job Type", 'set_job_type'),
+    ("Hourly Rate / Fixed Price", 'set_amount'),
+    ("Client History", 'set_client_history'),
+    ("Contract-to-Hire", 'set_contract_to_hire'),
+    ("Payment Verification", 'set_payment_verified'),
+    ("Proposals Range", 'set_proposals'),
+    ("Search Keywords", 'set_keywords'),
+    ("Confirm & Save", 'confirm_alert'),
+    ("Cancel Alert Setup", 'cancel_alert'),
+], back=False)
+EXPERIENCE_MARKUP = _markup([("Entry Level", 'experience_1'), ("Intermediate", 'experience_2'), ("Expert", 'experience_3')])
+CATEGORY_MARKUP = _markup([(name, f'category_{key}') for key, name in categories.items()])
+JOB_TYPE_MARKUP = _markup([("Hourly", 'jobtype_hourly'), ("Fixed Price", 'jobtype_fixed')])
+FIXED_AMOUNT_MARKUP = _markup([
+    ("Less than $100", 'amount_0-99'),
+    ("$100 to $500", 'amount_100-499'),
+    ("$500 - $1K", 'amount_500-999'),
+    ("$1K - $5K", 'amount_1000-4999'),
+    ("$5K+", 'amount_5000-'),
+])
+CLIENT_HISTORY_MARKUP = _markup([("No hires", 'client_hires_0'), ("1 to 9 hires", 'client_hires_1-9'), ("10+ hires", 'client_hires_10+')])
+CONTRACT_TO_HIRE_MARKUP = _markup([("Yes", 'contract_to_hire_1'), ("No", 'contract_to_hire_0')])
+PAYMENT_VERIFIED_MARKUP = _markup([("Yes", 'payment_verified_1'), ("No", 'payment_verified_0')])
+PROPOSALS_MARKUP = _markup([("0-4", 'proposals_0-4'), ("5-9", 'proposals_5-9'), ("10+", 'proposals_10+')])
+CONFIRM_MARKUP = _markup([("Confirm", 'save_alert')])
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Start command handler"""
-    print(f"User {update.message.chat_id} started the bot")
+    logger.info("User %s started the bot", update.message.chat_id)
     await show_main_menu(update)
 
-async def show_main_menu(update: Update) -> None:
+async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE = None) -> None:
     """Display the main menu"""
-    print("Displaying main menu")
-    keyboard = [
-        [InlineKeyboardButton("Create New Alert", callback_data='menu_new_alert')],
-        [InlineKeyboardButton("List Alerts", callback_data='menu_list_alerts')],
-        [InlineKeyboardButton("Delete Alert", callback_data='menu_delete_alert')]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await update.message.reply_text("Main Menu:", reply_markup=reply_markup)
-
-async def handle_main_menu_selection(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    logger.debug("Displaying main menu")
+    await update.message.reply_text("Main Menu:", reply_markup=MAIN_MENU_MARKUP)
+
+async def handle_main_menu_selection(update: Update, context: ContextTypes.DEFAULT_TYPE, selection: str) -> None:
     """Handle selections from the main menu"""
     query = update.callback_query
-    await query.answer()
-    print(f"Main menu selection by user {query.message.chat_id}: {query.data}")
-
-    if query.data == 'menu_new_alert':
-        await setup_new_alert(query)
-    elif query.data == 'menu_list_alerts':
-        await list_user_alerts(query)
-    elif query.data == 'menu_delete_alert':
-        await delete_alert_selection(query)
+    logger.debug("Main menu selection by user %s: %s", query.message.chat_id, selection)
+    action = MAIN_MENU_ACTIONS.get(selection)
+    if action is not None:
+        await action(query)
 
 async def setup_new_alert(query) -> None:
     """Initialize a new alert setup"""
     user_id = query.message.chat_id
-    print(f"User {user_id} is setting up a new alert")
-    user_alerts[user_id] = {'data': {}}
+    logger.info("User %s is setting up a new alert", user_id)
+    await session_store.start(user_id)
     await show_alert_menu(query)
 
 async def show_alert_menu(query) -> None:
     """Show the alert setup menu"""
     user_id = query.message.chat_id
-    print(f"Showing alert setup menu to user {user_id}")
-    keyboard = [
-        [InlineKeyboardButton("Experience Level", callback_data='set_experience')],
-        [InlineKeyboardButton("Category", callback_data='set_category')],
-        [InlineKeyboardButton("Job Type", callback_data='set_job_type')],
-        [InlineKeyboardButton("Hourly Rate / Fixed Price", callback_data='set_amount')],
-        [InlineKeyboardButton("Client History", callback_data='set_client_history')],
-        [InlineKeyboardButton("Contract-to-Hire", callback_data='set_contract_to_hire')],
-        [InlineKeyboardButton("Payment Verification", callback_data='set_payment_verified')],
-        [InlineKeyboardButton("Proposals Range", callback_data='set_proposals')],
-        [InlineKeyboardButton("Search Keywords", callback_data='set_keywords')],
-        [InlineKeyboardButton("Confirm & Save", callback_data='confirm_alert')],
-        [InlineKeyboardButton("Cancel Alert Setup", callback_data='cancel_alert')]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await query.message.edit_text("Choose an option to configure your alert:", reply_markup=reply_markup)
-
-async def handle_alert_menu_selection(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    logger.debug("Showing alert setup menu to user %s", user_id)
+    await query.message.edit_text("Choose an option to configure your alert:", reply_markup=ALERT_MENU_MARKUP)
+
+async def handle_back_to_alert_menu(update: Update, context: ContextTypes.DEFAULT_TYPE, value: str) -> None:
+    """Return to the alert setup menu from any wizard step"""
+    await show_alert_menu(update.callback_query)
+
+async def handle_alert_menu_selection(update: Update, context: ContextTypes.DEFAULT_TYPE, selection: str) -> None:
     """Handle selections from the alert setup menu"""
     query = update.callback_query
-    await query.answer()
-    user_id = query.message.chat_id
-    selection = query.data
-    print(f"User {user_id} selected alert menu option: {selection}")
-
-    # Handle each selection
-    if selection == 'set_experience':
-        await ask_experience_level(query)
-    elif selection == 'set_category':
-        await ask_category(query)
-    elif selection == 'set_job_type':
-        await ask_job_type(query)
-    elif selection == 'set_amount':
-        await ask_amount(query)
-    elif selection == 'set_client_history':
-        await ask_client_history(query)
-    elif selection == 'set_contract_to_hire':
-        await ask_contract_to_hire(query)
-    elif selection == 'set_payment_verified':
-        await ask_payment_verification(query)
-    elif selection == 'set_proposals':
-        await ask_proposals_range(query)
-    elif selection == 'set_keywords':
-        await ask_keywords(query)
-    elif selection == 'confirm_alert':
-        await confirm_alert(query)
-    elif selection == 'cancel_alert':
-        user_alerts.pop(user_id, None)
-        await query.message.edit_text("Alert setup has been canceled.")
-    elif selection == 'back_to_main_menu':
-        await show_main_menu(update)
+    logger.info("User %s selected alert menu option: %s", query.message.chat_id, selection)
+    action = ALERT_MENU_ACTIONS.get(selection)
+    if action is not None:
+        await action(query)
+
+async def handle_confirm_alert(update: Update, context: ContextTypes.DEFAULT_TYPE, value: str) -> None:
+    """Handle the Confirm & Save button"""
+    await confirm_alert(update.callback_query)
+
+async def handle_cancel_alert(update: Update, context: ContextTypes.DEFAULT_TYPE, value: str) -> None:
+    """Handle the Cancel Alert Setup button"""
+    query = update.callback_query
+    await session_store.clear(query.message.chat_id)
+    await query.message.edit_text("Alert setup has been canceled.")
 
 # Function to ask for experience level
 async def ask_experience_level(query) -> None:
-    print(f"Asking user {query.message.chat_id} for experience level")
-    keyboard = [
-        [InlineKeyboardButton("Entry Level", callback_data='experience_1')],
-        [InlineKeyboardButton("Intermediate", callback_data='experience_2')],
-        [InlineKeyboardButton("Expert", callback_data='experience_3')],
-        [InlineKeyboardButton("Back to Menu", callback_data='alert_menu')]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await query.message.edit_text("Select experience level (choose multiple):", reply_markup=reply_markup)
-
-async def handle_experience_selection(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    logger.debug("Asking user %s for experience level", query.message.chat_id)
+    await query.message.edit_text("Select experience level (choose multiple):", reply_markup=EXPERIENCE_MARKUP)
+
+async def handle_experience_selection(update: Update, context: ContextTypes.DEFAULT_TYPE, experience_level: str) -> None:
     """Handle selection of experience levels"""
-    query = update.callback_query
-    await query.answer()
-    user_id = query.message.chat_id
-    if query.data == 'alert_menu':
-        await show_alert_menu(query)
-    else:
-        experience_level = query.data.split('_')[1]
-        user_alerts[user_id]['data'].setdefault('contractor_tier', []).append(experience_level)
-        print(f"User {user_id} added experience level {experience_level}")
+    user_id = update.callback_query.message.chat_id
+    await session_store.add_to_set(user_id, 'contractor_tier', experience_level)
+    logger.info("User %s added experience level %s", user_id, experience_level)
 
 async def ask_category(query) -> None:
     """Ask user to select a category"""
-    print(f"Asking user {query.message.chat_id} for category")
-    keyboard = [[InlineKeyboardButton(name, callback_data=f'category_{key}')] for key, name in categories.items()]
-    keyboard.append([InlineKeyboardButton("Back to Menu", callback_data='alert_menu')])
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await query.message.edit_text("Select a category:", reply_markup=reply_markup)
+    logger.debug("Asking user %s for category", query.message.chat_id)
+    await query.message.edit_text("Select a category:", reply_markup=CATEGORY_MARKUP)
 
-async def handle_category_selection(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def handle_category_selection(update: Update, context: ContextTypes.DEFAULT_TYPE, category_id: str) -> None:
     """Handle category selection"""
-    query = update.callback_query
-    await query.answer()
-    user_id = query.message.chat_id
-    if query.data == 'alert_menu':
-        await show_alert_menu(query)
-    else:
-        category_id = query.data.split('_')[1]
-        user_alerts[user_id]['data']['category'] = category_id
-        print(f"User {user_id} selected category {category_id}")
+    user_id = update.callback_query.message.chat_id
+    await session_store.set_field(user_id, 'category', category_id)
+    logger.info("User %s selected category %s", user_id, category_id)
 
 async def ask_job_type(query) -> None:
     """Ask user to select job type"""
-    print(f"Asking user {query.message.chat_id} for job type")
-    keyboard = [
-        [InlineKeyboardButton("Hourly", callback_data='jobtype_hourly')],
-        [InlineKeyboardButton("Fixed Price", callback_data='jobtype_fixed')],
-        [InlineKeyboardButton("Back to Menu", callback_data='alert_menu')]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await query.message.edit_text("Select job type:", reply_markup=reply_markup)
-
-async def handle_job_type_selection(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    logger.debug("Asking user %s for job type", query.message.chat_id)
+    await query.message.edit_text("Select job type:", reply_markup=JOB_TYPE_MARKUP)
+
+async def handle_job_type_selection(update: Update, context: ContextTypes.DEFAULT_TYPE, job_type: str) -> None:
     """Handle job type selection"""
     query = update.callback_query
-    await query.answer()
     user_id = query.message.chat_id
-    if query.data == 'alert_menu':
-        await show_alert_menu(query)
-    else:
-        job_type = query.data.split('_')[1]
-        user_alerts[user_id]['data']['t'] = 0 if job_type == 'hourly' else 1
-        print(f"User {user_id} selected job type: {job_type}")
-        await ask_amount(query)
+    await session_store.set_field(user_id, 't', 0 if job_type == 'hourly' else 1)
+    logger.info("User %s selected job type: %s", user_id, job_type)
+    await ask_amount(query)
 
 async def ask_amount(query) -> None:
     """Ask for hourly rate or fixed-price amount"""
     user_id = query.message.chat_id
-    if user_alerts[user_id]['data'].get('t') == 0:  # Hourly
+    alert_data = await session_store.get(user_id)
+    if alert_data.get('t') == 0:  # Hourly
         await query.message.edit_text("Enter hourly rate range in format 'min-max' (e.g., 10-20):")
     else:  # Fixed price
-        keyboard = [
-            [InlineKeyboardButton("Less than $100", callback_data='amount_0-99')],
-            [InlineKeyboardButton("$100 to $500", callback_data='amount_100-499')],
-            [InlineKeyboardButton("$500 - $1K", callback_data='amount_500-999')],
-            [InlineKeyboardButton("$1K - $5K", callback_data='amount_1000-4999')],
-            [InlineKeyboardButton("$5K+", callback_data='amount_5000-')],
-            [InlineKeyboardButton("Back to Menu", callback_data='alert_menu')]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.message.edit_text("Select fixed-price range:", reply_markup=reply_markup)
+        await query.message.edit_text("Select fixed-price range:", reply_markup=FIXED_AMOUNT_MARKUP)
 
-async def handle_amount_selection(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def handle_amount_selection(update: Update, context: ContextTypes.DEFAULT_TYPE, amount_range: str) -> None:
     """Handle amount selection"""
-    query = update.callback_query
-    await query.answer()
-    user_id = query.message.chat_id
-    if query.data == 'alert_menu':
-        await show_alert_menu(query)
-    else:
-        amount_range = query.data.split('_')[1]
-        user_alerts[user_id]['data']['amount'] = amount_range
-        print(f"User {user_id} selected amount range {amount_range}")
+    user_id = update.callback_query.message.chat_id
+    await session_store.set_field(user_id, 'amount', amount_range)
+    logger.info("User %s selected amount range %s", user_id, amount_range)
 
 async def ask_client_history(query) -> None:
     """Ask user for client history"""
-    print(f"Asking user {query.message.chat_id} for client history")
-    keyboard = [
-        [InlineKeyboardButton("No hires", callback_data='client_hires_0')],
-        [InlineKeyboardButton("1 to 9 hires", callback_data='client_hires_1-9')],
-        [InlineKeyboardButton("10+ hires", callback_data='client_hires_10+')],
-        [InlineKeyboardButton("Back to Menu", callback_data='alert_menu')]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await query.message.edit_text("Select client history:", reply_markup=reply_markup)
-
-async def handle_client_history_selection(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    logger.debug("Asking user %s for client history", query.message.chat_id)
+    await query.message.edit_text("Select client history:", reply_markup=CLIENT_HISTORY_MARKUP)
+
+async def handle_client_history_selection(update: Update, context: ContextTypes.DEFAULT_TYPE, client_hires: str) -> None:
     """Handle client history selection"""
-    query = update.callback_query
-    await query.answer()
-    user_id = query.message.chat_id
-    if query.data == 'alert_menu':
-        await show_alert_menu(query)
-    else:
-        client_hires = query.data.split('_')[1]
-        user_alerts[user_id]['data']['client_hires'] = client_hires
-        print(f"User {user_id} selected client hires {client_hires}")
+    user_id = update.callback_query.message.chat_id
+    await session_store.set_field(user_id, 'client_hires', client_hires)
+    logger.info("User %s selected client hires %s", user_id, client_hires)
 
 async def ask_contract_to_hire(query) -> None:
     """Ask user if the job is contract-to-hire"""
-    print(f"Asking user {query.message.chat_id} if contract-to-hire")
-    keyboard = [
-        [InlineKeyboardButton("Yes", callback_data='contract_to_hire_1')],
-        [InlineKeyboardButton("No", callback_data='contract_to_hire_0')],
-        [InlineKeyboardButton("Back to Menu", callback_data='alert_menu')]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await query.message.edit_text("Is this a contract-to-hire role?", reply_markup=reply_markup)
-
-async def handle_contract_to_hire(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    logger.debug("Asking user %s if contract-to-hire", query.message.chat_id)
+    await query.message.edit_text("Is this a contract-to-hire role?", reply_markup=CONTRACT_TO_HIRE_MARKUP)
+
+async def handle_contract_to_hire(update: Update, context: ContextTypes.DEFAULT_TYPE, contract_to_hire: str) -> None:
     """Handle contract-to-hire selection"""
-    query = update.callback_query
-    await query.answer()
-    user_id = query.message.chat_id
-    if query.data == 'alert_menu':
-        await show_alert_menu(query)
-    else:
-        contract_to_hire = query.data.split('_')[1]
-        user_alerts[user_id]['data']['contract_to_hire'] = contract_to_hire
-        print(f"User {user_id} selected contract-to-hire: {contract_to_hire}")
+    user_id = update.callback_query.message.chat_id
+    await session_store.set_field(user_id, 'contract_to_hire', contract_to_hire)
+    logger.info("User %s selected contract-to-hire: %s", user_id, contract_to_hire)
 
 async def ask_payment_verification(query) -> None:
     """Ask user if payment verification is required"""
-    print(f"Asking user {query.message.chat_id} for payment verification requirement")
-    keyboard = [
-        [InlineKeyboardButton("Yes", callback_data='payment_verified_1')],
-        [InlineKeyboardButton("No", callback_data='payment_verified_0')],
-        [InlineKeyboardButton("Back to Menu", callback_data='alert_menu')]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await query.message.edit_text("Require payment verification?", reply_markup=reply_markup)
-
-async def handle_payment_verification(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    logger.debug("Asking user %s for payment verification requirement", query.message.chat_id)
+    await query.message.edit_text("Require payment verification?", reply_markup=PAYMENT_VERIFIED_MARKUP)
+
+async def handle_payment_verification(update: Update, context: ContextTypes.DEFAULT_TYPE, payment_verified: str) -> None:
     """Handle payment verification selection"""
-    query = update.callback_query
-    await query.answer()
-    user_id = query.message.chat_id
-    if query.data == 'alert_menu':
-        await show_alert_menu(query)
-    else:
-        payment_verified = query.data.split('_')[1]
-        user_alerts[user_id]['data']['payment_verified'] = payment_verified
-        print(f"User {user_id} selected payment verification: {payment_verified}")
+    user_id = update.callback_query.message.chat_id
+    await session_store.set_field(user_id, 'payment_verified', payment_verified)
+    logger.info("User %s selected payment verification: %s", user_id, payment_verified)
 
 async def ask_proposals_range(query) -> None:
     """Ask user for proposals range"""
-    print(f"Asking user {query.message.chat_id} for proposal range")
-    keyboard = [
-        [InlineKeyboardButton("0-4", callback_data='proposals_0-4')],
-        [InlineKeyboardButton("5-9", callback_data='proposals_5-9')],
-        [InlineKeyboardButton("10+", callback_data='proposals_10+')],
-        [InlineKeyboardButton("Back to Menu", callback_data='alert_menu')]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await query.message.edit_text("Select proposal range:", reply_markup=reply_markup)
-
-async def handle_proposals_range_selection(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    logger.debug("Asking user %s for proposal range", query.message.chat_id)
+    await query.message.edit_text("Select proposal range:", reply_markup=PROPOSALS_MARKUP)
+
+async def handle_proposals_range_selection(update: Update, context: ContextTypes.DEFAULT_TYPE, proposals: str) -> None:
     """Handle proposals range selection"""
-    query = update.callback_query
-    await query.answer()
-    user_id = query.message.chat_id
-    if query.data == 'alert_menu':
-        await show_alert_menu(query)
-    else:
-        proposals = query.data.split('_')[1]
-        user_alerts[user_id]['data']['proposals'] = proposals
-        print(f"User {user_id} selected proposals range: {proposals}")
+    user_id = update.callback_query.message.chat_id
+    await session_store.set_field(user_id, 'proposals', proposals)
+    logger.info("User %s selected proposals range: %s", user_id, proposals)
 
 async def ask_keywords(query) -> None:
     """Ask user for search keywords"""
-    print(f"Asking user {query.message.chat_id} for search keywords")
-    await query.message.edit_text("Enter search keywords (optional):")
+    user_id = query.message.chat_id
+    logger.debug("Asking user %s for search keywords", user_id)
+    await session_store.set_field(user_id, 'awaiting', 'keywords')
+    await query.message.edit_text(
+        "Enter search keywords (optional). Separate terms with commas or spaces, "
+        'quote phrases ("machine learning"), prefix + to require a term and - to exclude one:'
+    )
+
+async def handle_keywords_input(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Handle typed search keywords"""
+    user_id = update.message.chat_id
+    alert_data = await session_store.get(user_id)
+    if alert_data.get('awaiting') != 'keywords':
+        return
+    text = update.message.text
+    if parse_keywords(text) is None:
+        await update.message.reply_text("No keywords found, please try again:")
+        return
+    await session_store.set_field(user_id, 'keywords', text)
+    await session_store.unset_field(user_id, 'awaiting')
+    logger.info("User %s set keywords: %s", user_id, text)
+    await update.message.reply_text("Choose an option to configure your alert:", reply_markup=ALERT_MENU_MARKUP)
 
 async def confirm_alert(query) -> None:
     """Confirm alert settings before saving"""
     user_id = query.message.chat_id
-    alert_data = user_alerts.get(user_id, {}).get('data', {})
+    alert_data = await session_store.get(user_id)
     summary = f"Your alert settings:\n{alert_data}"
-    keyboard = [
-        [InlineKeyboardButton("Confirm", callback_data='save_alert')],
-        [InlineKeyboardButton("Back to Menu", callback_data='alert_menu')]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await query.message.edit_text(summary, reply_markup=reply_markup)
-
-async def handle_save_alert(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    await query.message.edit_text(summary, reply_markup=CONFIRM_MARKUP)
+
+async def handle_save_alert(update: Update, context: ContextTypes.DEFAULT_TYPE, value: str) -> None:
     """Save the alert"""
     query = update.callback_query
     user_id = query.message.chat_id
-    alert_data = user_alerts.get(user_id, {}).get('data', {})
-    add_alert(user_id, alert_data)
-    user_alerts.pop(user_id, None)
+    alert_data = await session_store.get(user_id)
+    try:
+        await add_alert_async(user_id, alert_data)
+    except ValueError as e:
+        await query.message.edit_text(f"Invalid alert settings: {e}")
+        return
+    await run_async(alert_cache.refresh_user, user_id)
+    await session_store.clear(user_id)
     await query.message.edit_text("Alert saved successfully!")
 
 async def list_user_alerts(query) -> None:
     """List all alerts for the user"""
     user_id = query.message.chat_id
-    alerts = list_alerts(user_id)
+    alerts = alert_cache.list_user_alerts(user_id)
     if alerts:
-        alert_messages = "\n".join([f"ID: {alert['id']}, Filters: {alert['filters']}" for alert in alerts])
+        alert_messages = "\n".join([f"ID: {alert['_id']}, Filters: {alert['filters']}" for alert in alerts])
         await query.message.edit_text(f"Your alerts:\n{alert_messages}")
     else:
         await query.message.edit_text("You have no saved alerts.")
@@ -349,39 +284,78 @@ async def list_user_alerts(query) -> None:
 async def delete_alert_selection(query) -> None:
     """Delete an alert"""
     user_id = query.message.chat_id
-    alerts = list_alerts(user_id)
+    alerts = alert_cache.list_user_alerts(user_id)
     if alerts:
-        keyboard = [[InlineKeyboardButton(f"Delete ID {alert['id']}", callback_data=f'delete_{alert["id"]}')] for alert in alerts]
+        keyboard = [[InlineKeyboardButton(f"Delete ID {alert['_id']}", callback_data=f'delete_{alert["_id"]}')] for alert in alerts]
         keyboard.append([InlineKeyboardButton("Back to Menu", callback_data='alert_menu')])
         reply_markup = InlineKeyboardMarkup(keyboard)
         await query.message.edit_text("Select an alert to delete:", reply_markup=reply_markup)
     else:
         await query.message.edit_text("You have no alerts to delete.")
 
-async def handle_delete_alert(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def handle_delete_alert(update: Update, context: ContextTypes.DEFAULT_TYPE, alert_id: str) -> None:
     """Handle alert deletion"""
     query = update.callback_query
-    await query.answer()
-    alert_id = query.data.split('_')[1]
-    delete_alert(alert_id)
+    await delete_alert_async(alert_id)
+    await run_async(alert_cache.refresh_user, query.message.chat_id)
     await query.message.edit_text(f"Alert ID {alert_id} has been deleted.")
 
+MAIN_MENU_ACTIONS = {
+    'new_alert': setup_new_alert,
+    'list_alerts': list_user_alerts,
+    'delete_alert': delete_alert_selection,
+}
+ALERT_MENU_ACTIONS = {
+    'experience': ask_experience_level,
+    'category': ask_category,
+    'job_type': ask_job_type,
+    'amount': ask_amount,
+    'client_history': ask_client_history,
+    'contract_to_hire': ask_contract_to_hire,
+    'payment_verified': ask_payment_verification,
+    'proposals': ask_proposals_range,
+    'keywords': ask_keywords,
+}
+# Callback data prefix -> handler; the router passes handlers the rest of the data
+CALLBACK_ROUTES = [
+    ('menu_', handle_main_menu_selection),
+    ('set_', handle_alert_menu_selection),
+    ('alert_menu', handle_back_to_alert_menu),
+    ('confirm_alert', handle_confirm_alert),
+    ('cancel_alert', handle_cancel_alert),
+    ('experience_', handle_experience_selection),
+    ('category_', handle_category_selection),
+    ('jobtype_', handle_job_type_selection),
+    ('amount_', handle_amount_selection),
+    ('client_hires_', handle_client_history_selection),
+    ('contract_to_hire_', handle_contract_to_hire),
+    ('payment_verified_', handle_payment_verification),
+    ('proposals_', handle_proposals_range_selection),
+    ('save_alert', handle_save_alert),
+    ('delete_', handle_delete_alert),
+]
+callback_router = CallbackRouter((prefix, instrument_handler(handler)) for prefix, handler in CALLBACK_ROUTES)
+
+def build_application(builder=None):
+    """Build the bot application with all handlers registered"""
+    global session_store
+    if session_store is None:
+        session_store = create_session_store()
+    builder = builder or Application.builder().token(Config.TELEGRAM_BOT_TOKEN)
+    application = builder.build()
+
+    application.add_handler(CommandHandler("start", instrument_handler(start)))
+    application.add_handler(CommandHandler("menu", instrument_handler(show_main_menu)))
+    application.add_handler(callback_router.handler())
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, instrument_handler(handle_keywords_input)))
+    return application
+
 def main():
     """Main function to run the bot"""
-    application = Application.builder().token(TELEGRAM_TOKEN).build()
-    
-    application.add_handler(CommandHandler("start", start))
-    application.add_handler(CommandHandler("menu", show_main_menu))
-    application.add_handler(CallbackQueryHandler(handle_main_menu_selection, pattern='^menu_'))
-    application.add_handler(CallbackQueryHandler(handle_alert_menu_selection, pattern='^set_'))
-    application.add_handler(CallbackQueryHandler(handle_experience_selection, pattern='^experience_|alert_menu'))
-    application.add_handler(CallbackQueryHandler(handle_category_selection, pattern='^category_|alert_menu'))
-    application.add_handler(CallbackQueryHandler(handle_job_type_selection, pattern='^jobtype_|alert_menu'))
-    application.add_handler(CallbackQueryHandler(handle_amount_selection, pattern='^amount_|alert_menu'))
-    application.add_handler(CallbackQueryHandler(handle_client_history_selection, pattern='^client_hires_|alert_menu'))
-    application.add_handler(CallbackQueryHandler(handle_delete_alert, pattern='^delete_'))
-    
-    application.run_polling()
+    setup_logging()
+    ensure_indexes()
+    alert_cache.start()
+    build_application().run_polling()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,142 @@
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from config import Config
+
+
+class _Session:
+    __slots__ = ('data', 'touched_at')
+
+    def __init__(self, data, touched_at):
+        self.data = data
+        self.touched_at = touched_at
+
+
+class MemorySessionStore:
+    """Per-user wizard state held in this process, evicted after ``idle_timeout`` seconds.
+
+    Sessions are kept in last-touched order, so expired ones are always at the
+    front and eviction never scans the whole store. ``max_sessions`` caps
+    memory even under a burst of abandoned wizards.
+    """
+
+    def __init__(self, idle_timeout=None, max_sessions=None):
+        self.idle_timeout = idle_timeout or Config.SESSION_IDLE_TIMEOUT
+        self.max_sessions = max_sessions or Config.SESSION_MAX_SESSIONS
+        self.sessions = OrderedDict()
+
+    def _evict(self, now):
+        while self.sessions:
+            user_id, session = next(iter(self.sessions.items()))
+            if now - session.touched_at < self.idle_timeout and len(self.sessions) <= self.max_sessions:
+                break
+            del self.sessions[user_id]
+
+    def _touch(self, user_id, create=True):
+        now = time.monotonic()
+        self._evict(now)
+        session = self.sessions.get(user_id)
+        if session is None:
+            if not create:
+                return None
+            session = self.sessions[user_id] = _Session({}, now)
+        else:
+            session.touched_at = now
+            self.sessions.move_to_end(user_id)
+        return session
+
+    async def start(self, user_id):
+        """Begin a fresh alert for the user, discarding any half-built one."""
+        self.sessions.pop(user_id, None)
+        self._touch(user_id)
+
+    async def get(self, user_id):
+        """Return a copy of the user's alert data so far ({} if none)."""
+        session = self._touch(user_id, create=False)
+        return dict(session.data) if session else {}
+
+    async def set_field(self, user_id, field, value):
+        self._touch(user_id).data[field] = value
+
+    async def add_to_set(self, user_id, field, value):
+        """Add a value to a list field unless it is already there."""
+        values = self._touch(user_id).data.setdefault(field, [])
+        if value not in values:
+            values.append(value)
+
+    async def unset_field(self, user_id, field):
+        self._touch(user_id).data.pop(field, None)
+
+    async def clear(self, user_id):
+        self.sessions.pop(user_id, None)
+
+    def __len__(self):
+        self._evict(time.monotonic())
+        return len(self.sessions)
+
+
+class MongoSessionStore:
+    """Per-user wizard state in a Mongo collection, shared by every bot worker.
+
+    Each field change is a single atomic update on the user's document, and a
+    TTL index on ``touched_at`` removes sessions idle for ``idle_timeout``.
+    """
+
+    def __init__(self, collection=None, idle_timeout=None):
+        import db_manager
+
+        self._run = db_manager.run_async
+        self.collection = collection if collection is not None else db_manager.db["sessions"]
+        self.idle_timeout = idle_timeout or Config.SESSION_IDLE_TIMEOUT
+        self.collection.create_index("touched_at", expireAfterSeconds=int(self.idle_timeout))
+
+    async def _update(self, user_id, update):
+        """Apply a field update to a live session, starting a new one if it is missing or idle too long."""
+        from pymongo.errors import DuplicateKeyError
+
+        now = datetime.now(timezone.utc)
+        since = now - timedelta(seconds=self.idle_timeout)
+        update.setdefault("$set", {})["touched_at"] = now
+        result = await self._run(self.collection.update_one, {"_id": user_id, "touched_at": {"$gte": since}}, update)
+        if result.matched_count:
+            return
+        # get() already hides an expired session the TTL monitor hasn't removed yet; don't build on its data
+        try:
+            await self._run(self.collection.update_one, {"_id": user_id, "touched_at": {"$not": {"$gte": since}}},
+                            {"$set": {"data": {}, "touched_at": now}}, upsert=True)
+        except DuplicateKeyError:
+            pass  # Another worker refreshed the session in between, so it is live again
+        await self._run(self.collection.update_one, {"_id": user_id}, update)
+
+    async def start(self, user_id):
+        await self._run(self.collection.replace_one, {"_id": user_id},
+                        {"data": {}, "touched_at": datetime.now(timezone.utc)}, upsert=True)
+
+    async def get(self, user_id):
+        # The TTL monitor only runs about once a minute, so check the age here as well
+        since = datetime.now(timezone.utc) - timedelta(seconds=self.idle_timeout)
+        doc = await self._run(self.collection.find_one, {"_id": user_id, "touched_at": {"$gte": since}}, {"data": 1})
+        return doc.get("data", {}) if doc else {}
+
+    async def set_field(self, user_id, field, value):
+        await self._update(user_id, {"$set": {f"data.{field}": value}})
+
+    async def add_to_set(self, user_id, field, value):
+        await self._update(user_id, {"$addToSet": {f"data.{field}": value}})
+
+    async def unset_field(self, user_id, field):
+        await self._update(user_id, {"$unset": {f"data.{field}": ""}})
+
+    async def clear(self, user_id):
+        await self._run(self.collection.delete_one, {"_id": user_id})
+
+
+def create_session_store(backend=None):
+    """Build the session store selected by Config.SESSION_BACKEND ('memory' or 'mongo')."""
+    backend = backend or Config.SESSION_BACKEND
+    if backend == "mongo":
+        return MongoSessionStore()
+    if backend == "memory":
+        return MemorySessionStore()
+    raise ValueError(f"Unknown session backend: {backend!r}")
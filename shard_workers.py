@@ -0,0 +1,196 @@
+import logging
+import multiprocessing
+import queue
+import threading
+import zlib
+
+from alert_filters import stored_filters
+from config import Config
+from matcher import AlertIndex
+
+logger = logging.getLogger(__name__)
+
+
+def jump_hash(key, buckets):
+    """Jump consistent hash: resizing from n to n+1 buckets moves only ~1/(n+1) of the keys."""
+    key = zlib.crc32(str(key).encode()) | (zlib.adler32(str(key).encode()) << 32)
+    bucket, candidate = -1, 0
+    while candidate < buckets:
+        bucket = candidate
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        candidate = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
+
+
+def _worker(shard, inbox, outbox):
+    """Shard process: keeps an AlertIndex for its alerts and matches the job batches it is sent."""
+    index = AlertIndex()
+    while True:
+        message = inbox.get()
+        command = message[0]
+        if command == 'add':
+            for alert_id, filters in message[1]:
+                index.add(alert_id, filters)
+        elif command == 'remove':
+            for alert_id in message[1]:
+                index.remove(alert_id)
+        elif command == 'match':
+            _, batch_id, jobs = message
+            outbox.put((batch_id, shard, [index.match(job) for job in jobs]))
+        elif command == 'stop':
+            break
+
+
+class ShardedMatcher:
+    """Matches jobs across N worker processes, each holding the alerts of a slice of users.
+
+    Alerts are assigned to shards by a consistent hash of the user ID, so one
+    user's alerts always live together. match_batch() sends every shard the
+    same job batch and merges the per-job results; a shard that dies meanwhile
+    is restarted with its alerts and asked again. resize() rebalances between
+    batches, moving only the alerts whose shard changes.
+
+    add(alert_id, filters) and remove(alert_id) follow AlertIndex, so the
+    matcher can subscribe to an AlertCache; ``owner`` maps an alert ID to the
+    user ID it is sharded by there. Every method takes the same lock, so
+    changes may come from another thread than the one matching; they wait for
+    a batch in flight to finish.
+    """
+
+    # How long match_batch() waits for results before checking that the shards are alive
+    LIVENESS_INTERVAL = 1.0
+
+    def __init__(self, workers=None, owner=None):
+        self.context = multiprocessing.get_context('spawn')
+        self.results = self.context.Queue()
+        self.inboxes = []
+        self.processes = []
+        self.alerts = {}
+        self.owner = owner
+        self.batch_id = 0
+        self._lock = threading.Lock()
+        self._start_workers(workers or Config.MATCH_WORKERS)
+
+    @property
+    def workers(self):
+        return len(self.processes)
+
+    def _spawn(self, shard):
+        inbox = self.context.Queue()
+        process = self.context.Process(target=_worker, args=(shard, inbox, self.results),
+                                       name=f"match-shard-{shard}", daemon=True)
+        process.start()
+        return inbox, process
+
+    def _start_workers(self, count):
+        for shard in range(len(self.processes), count):
+            inbox, process = self._spawn(shard)
+            self.inboxes.append(inbox)
+            self.processes.append(process)
+
+    def _restart(self, shard):
+        """Replace a dead shard process and reload its alerts."""
+        logger.warning("Match shard %d exited with code %s; restarting it", shard, self.processes[shard].exitcode)
+        self.inboxes[shard], self.processes[shard] = self._spawn(shard)
+        batch = [(alert_id, filters) for alert_id, (_, filters, owner) in list(self.alerts.items()) if owner == shard]
+        if batch:
+            self._send(shard, ('add', batch))
+
+    def _send(self, shard, message):
+        self.inboxes[shard].put(message)
+
+    def _add_entries(self, entries):
+        batches = {}
+        for alert_id, user_id, filters in entries:
+            self._remove(alert_id)
+            shard = jump_hash(user_id, self.workers)
+            self.alerts[alert_id] = (user_id, filters, shard)
+            batches.setdefault(shard, []).append((alert_id, filters))
+        for shard, batch in batches.items():
+            self._send(shard, ('add', batch))
+
+    def add_many(self, alerts):
+        """Add alert documents (as returned by db_manager) to their shards in one message per shard."""
+        entries = []
+        for alert in alerts:
+            filters = stored_filters(alert)
+            if filters is not None:
+                entries.append((str(alert['_id']), alert['user_id'], filters))
+        with self._lock:
+            self._add_entries(entries)
+
+    def add(self, alert_id, filters):
+        user_id = self.owner(alert_id) if self.owner is not None else alert_id
+        with self._lock:
+            self._add_entries([(alert_id, user_id, filters)])
+
+    def remove(self, alert_id):
+        with self._lock:
+            self._remove(alert_id)
+
+    def _remove(self, alert_id):
+        entry = self.alerts.pop(alert_id, None)
+        if entry is not None:
+            self._send(entry[2], ('remove', [alert_id]))
+
+    def match_batch(self, jobs):
+        """Return one set of matching alert ids per job, merged across all shards."""
+        with self._lock:
+            self.batch_id += 1
+            message = ('match', self.batch_id, jobs)
+            for shard in range(self.workers):
+                self._send(shard, message)
+            merged = [set() for _ in jobs]
+            pending = set(range(self.workers))
+            while pending:
+                try:
+                    batch_id, shard, results = self.results.get(timeout=self.LIVENESS_INTERVAL)
+                except queue.Empty:
+                    for shard in pending:
+                        if not self.processes[shard].is_alive():
+                            self._restart(shard)
+                            self._send(shard, message)
+                    continue
+                if batch_id != self.batch_id or shard not in pending:
+                    continue
+                for matched, shard_matches in zip(merged, results):
+                    matched |= shard_matches
+                pending.discard(shard)
+            return merged
+
+    def match(self, job):
+        return self.match_batch([job])[0]
+
+    def resize(self, workers):
+        """Change the number of shard processes, moving only the alerts whose shard changes."""
+        with self._lock:
+            self._resize(workers)
+
+    def _resize(self, workers):
+        if workers == self.workers:
+            return
+        self._start_workers(workers)
+        moves, removals = {}, {}
+        for alert_id, (user_id, filters, shard) in self.alerts.items():
+            new_shard = jump_hash(user_id, workers)
+            if new_shard != shard:
+                removals.setdefault(shard, []).append(alert_id)
+                moves.setdefault(new_shard, []).append((alert_id, filters))
+                self.alerts[alert_id] = (user_id, filters, new_shard)
+        # Queues are FIFO per shard, so the next match_batch sees the rebalanced state
+        for shard, alert_ids in removals.items():
+            self._send(shard, ('remove', alert_ids))
+        for shard, batch in moves.items():
+            self._send(shard, ('add', batch))
+        while self.workers > workers:
+            self._send(self.workers - 1, ('stop',))
+            self.processes.pop().join()
+            self.inboxes.pop()
+
+    def close(self):
+        with self._lock:
+            for shard in range(self.workers):
+                self._send(shard, ('stop',))
+            for process in self.processes:
+                process.join()
+            self.processes, self.inboxes = [], []
@@ -0,0 +1,142 @@
+"""Synthetic alerts, jobs and local HTTP stand-ins shared by benchmark.py and the tests."""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from job_parser import Job
+
+CATEGORY_IDS = [
+    "531770282584862721", "531770282580668416", "531770282580668417", "531770282580668420",
+    "531770282580668421", "531770282584862722", "531770282580668419", "531770282584862723",
+    "531770282580668422", "531770282584862720", "531770282580668418", "531770282580668423",
+]
+FIXED_AMOUNTS = ['0-99', '100-499', '500-999', '1000-4999', '5000-']
+CLIENT_HIRES = ['0', '1-9', '10+']
+PROPOSALS = ['0-4', '5-9', '10+']
+# Words both job text and alert keywords are drawn from
+KEYWORD_VOCABULARY = (
+    "python django flask react vue angular node typescript javascript php laravel wordpress shopify "
+    "scraper scraping automation api backend frontend mobile flutter swift kotlin aws devops docker "
+    "kubernetes data analysis excel dashboard tableau sql postgres mongodb machine learning ai chatbot "
+    "design logo figma seo copywriting translation video editing marketing"
+).split()
+
+
+def random_filters(rng):
+    """Build a filters dict shaped like the ones the scraper wizard saves."""
+    filters = {'category': rng.choice(CATEGORY_IDS)}
+    if rng.random() < 0.7:
+        filters['contractor_tier'] = rng.sample(['1', '2', '3'], rng.randint(1, 3))
+    if rng.random() < 0.8:
+        filters['t'] = rng.randint(0, 1)
+        if filters['t'] == 1:
+            filters['amount'] = rng.choice(FIXED_AMOUNTS)
+        else:
+            low = rng.choice([5, 10, 15, 20, 30, 50])
+            filters['amount'] = f"{low}-{low + rng.choice([10, 20, 50])}"
+    if rng.random() < 0.5:
+        filters['client_hires'] = rng.choice(CLIENT_HIRES)
+    if rng.random() < 0.5:
+        filters['proposals'] = rng.choice(PROPOSALS)
+    if rng.random() < 0.5:
+        filters['payment_verified'] = rng.choice(['0', '1'])
+    if rng.random() < 0.3:
+        filters['contract_to_hire'] = rng.choice(['0', '1'])
+    return filters
+
+
+def random_job(rng, job_id):
+    """Build a Job with random values for the fields the matcher reads."""
+    t = rng.randint(0, 1)
+    return Job(
+        id=str(job_id),
+        title='',
+        description='',
+        category=rng.choice(CATEGORY_IDS),
+        tier=rng.randint(1, 3),
+        t=t,
+        amount=rng.randint(5, 100) if t == 0 else rng.choice([50, 250, 750, 2500, 10000]),
+        client_hires=rng.choice([0, 3, 25]),
+        proposals=rng.randint(0, 30),
+        payment_verified=rng.random() < 0.7,
+        contract_to_hire=rng.random() < 0.2,
+        posted_at=time.time(),
+    )
+
+
+def random_keywords(rng):
+    """A keyword expression mixing words, a phrase, required and excluded terms."""
+    terms = rng.sample(KEYWORD_VOCABULARY, rng.randint(1, 3))
+    if rng.random() < 0.3:
+        terms.append('"' + ' '.join(rng.sample(KEYWORD_VOCABULARY, 2)) + '"')
+    if rng.random() < 0.2:
+        terms.append('+' + rng.choice(KEYWORD_VOCABULARY))
+    if rng.random() < 0.3:
+        terms.append('-' + rng.choice(KEYWORD_VOCABULARY))
+    return ', '.join(terms)
+
+
+def fixture_server(handler):
+    """Start a threaded HTTP server on a free local port and return (server, base url)."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/search"
+
+
+class FakeBotApiHandler(BaseHTTPRequestHandler):
+    """Local stand-in for the Telegram Bot API that answers every ``rate_limit_every``th request with a 429.
+
+    Accepted sendMessage calls are recorded in ``messages`` as (chat_id, text).
+    """
+
+    protocol_version = 'HTTP/1.1'
+    rate_limit_every = 300
+    requests_seen = 0
+    messages = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        method = self.path.rsplit('/', 1)[-1]
+        type(self).requests_seen += 1
+        if method == 'getMe':
+            payload = {'ok': True, 'result': {'id': 1, 'is_bot': True, 'first_name': 'fake', 'username': 'fake_bot'}}
+        elif method in ('answerCallbackQuery', 'setWebhook', 'deleteWebhook'):
+            payload = {'ok': True, 'result': True}
+        elif method == 'sendMessage' and type(self).requests_seen % self.rate_limit_every == 0:
+            payload = {'ok': False, 'error_code': 429, 'description': 'Too Many Requests: retry after 1',
+                       'parameters': {'retry_after': 1}}
+        else:
+            time.sleep(0.01)
+            if method == 'sendMessage':
+                fields = parse_qs(body.decode())
+                type(self).messages.append((fields['chat_id'][0], fields['text'][0]))
+            payload = {'ok': True, 'result': {'message_id': self.requests_seen, 'date': int(time.time()),
+                                              'chat': {'id': 1, 'type': 'private'}, 'text': 'ok'}}
+        body = json.dumps(payload).encode()
+        self.send_response(429 if not payload['ok'] else 200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def parse_with_bs4(body, category=None):
+    """The naive approach: build the whole DOM with BeautifulSoup, then walk the tiles."""
+    from bs4 import BeautifulSoup
+    from job_parser import FIELDS, build_job
+
+    soup = BeautifulSoup(body, 'html.parser')
+    jobs = []
+    for tile in soup.find_all('article', attrs={'data-job-uid': True}):
+        raw = {'id': tile['data-job-uid'], 'posted': tile.get('data-posted'), 'category': tile.get('data-category')}
+        for element in tile.find_all(attrs={'data-test': True}):
+            field = FIELDS.get(element['data-test'])
+            if field and field not in raw:
+                raw[field] = element.get_text(' ')
+        jobs.append(build_job(raw, category))
+    return jobs
@@ -0,0 +1,43 @@
+import pytest
+
+pytest.importorskip('flask')
+mongomock = pytest.importorskip('mongomock')
+
+import app as api
+import db_manager
+from alert_cache import alert_cache
+from config import Config
+
+FILTERS = [{'category': '531770282580668418'}, {'category': '531770282580668421'}, {'t': 'fixed'}]
+
+
+@pytest.fixture(params=[True, False], ids=['cached', 'read-through'])
+def client(request, monkeypatch):
+    # Always an in-memory database, whatever MONGODB_URI the environment points at
+    monkeypatch.setattr(db_manager, '_client', mongomock.MongoClient())
+    monkeypatch.setattr(db_manager, '_collections', {})
+    monkeypatch.setattr(Config, 'MONGODB_DB', 'test')
+    db_manager.add_alerts('u1', FILTERS)
+    monkeypatch.setattr(alert_cache, 'loaded', False)
+    if request.param:
+        alert_cache.load()
+    yield api.app.test_client()
+    alert_cache.alerts.clear()
+    alert_cache.by_user.clear()
+    alert_cache.views.clear()
+    alert_cache.loaded = False
+
+
+def test_pages_follow_the_cursor(client):
+    first = client.get('/alerts/u1?limit=2').get_json()
+    second = client.get(f"/alerts/u1?limit=2&cursor={first['next_cursor']}").get_json()
+    assert len(first['alerts']) == 2
+    assert len(second['alerts']) == 1
+    assert second['next_cursor'] is None
+
+
+@pytest.mark.parametrize('cursor', ['zzz', '123', 'ffffffffffffffffffffffffff'])
+def test_invalid_cursor_is_rejected(client, cursor):
+    response = client.get(f'/alerts/u1?cursor={cursor}')
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid cursor"}
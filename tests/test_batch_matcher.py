@@ -0,0 +1,87 @@
+import random
+
+import pytest
+
+pytest.importorskip('numpy')
+
+from alert_filters import normalize_filters
+from batch_matcher import BatchMatcher
+from matcher import matches
+from synthetic import KEYWORD_VOCABULARY, random_filters, random_job, random_keywords
+
+
+def random_corpus(rng, n_alerts):
+    """Alerts as the wizard saves them, plus keyword alerts and alerts with no filters at all."""
+    alerts = {}
+    for i in range(n_alerts):
+        roll = rng.random()
+        if roll < 0.05:
+            filters = {}
+        elif roll < 0.1:
+            filters = {'keywords': random_keywords(rng)}
+        else:
+            filters = random_filters(rng)
+            if rng.random() < 0.3:
+                filters['keywords'] = random_keywords(rng)
+        alerts[str(i)] = normalize_filters(filters)
+    return alerts
+
+
+def random_jobs(rng, n_jobs):
+    return [random_job(rng, i)._replace(title=' '.join(rng.sample(KEYWORD_VOCABULARY, 4)),
+                                        description=' '.join(rng.sample(KEYWORD_VOCABULARY, 8)))
+            for i in range(n_jobs)]
+
+
+def scalar(alerts, jobs):
+    return [{alert_id for alert_id, filters in alerts.items() if matches(filters, job)} for job in jobs]
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_match_batch_agrees_with_scalar_matcher(seed):
+    rng = random.Random(seed)
+    alerts = random_corpus(rng, 2000)
+    jobs = random_jobs(rng, 300)
+    batch = BatchMatcher()
+    for alert_id, filters in alerts.items():
+        batch.add(alert_id, filters)
+
+    expected = scalar(alerts, jobs)
+    assert any(expected), "corpus produced no matches at all"
+    assert batch.match_batch(jobs) == expected
+
+
+def test_open_ended_ranges_and_empty_filters():
+    rng = random.Random(0)
+    alerts = {
+        'any': normalize_filters({}),
+        'big_budget': normalize_filters({'t': '1', 'amount': '5000-'}),
+        'busy_client': normalize_filters({'client_hires': '10+'}),
+        'python': normalize_filters({'keywords': 'python'}),
+    }
+    jobs = random_jobs(rng, 200)
+    jobs += [jobs[0]._replace(t=1, amount=10 ** 9, client_hires=10 ** 6, title='python')]
+    batch = BatchMatcher()
+    for alert_id, filters in alerts.items():
+        batch.add(alert_id, filters)
+
+    matched = batch.match_batch(jobs)
+    assert matched == scalar(alerts, jobs)
+    assert matched[-1] == set(alerts)
+
+
+def test_removed_rows_are_reused_without_stale_matches():
+    rng = random.Random(4)
+    alerts = random_corpus(rng, 1000)
+    jobs = random_jobs(rng, 100)
+    batch = BatchMatcher()
+    for alert_id, filters in alerts.items():
+        batch.add(alert_id, filters)
+    for alert_id in list(alerts)[::3]:
+        batch.remove(alert_id)
+        del alerts[alert_id]
+    for alert_id, filters in random_corpus(rng, 300).items():
+        alerts[f"new-{alert_id}"] = filters
+        batch.add(f"new-{alert_id}", filters)
+
+    assert batch.match_batch(jobs) == scalar(alerts, jobs)
@@ -0,0 +1,53 @@
+import pytest
+
+mongomock = pytest.importorskip('mongomock')
+
+import db_manager
+from config import Config
+
+
+@pytest.fixture
+def alerts(monkeypatch):
+    # Always an in-memory database, whatever MONGODB_URI the environment points at
+    monkeypatch.setattr(db_manager, '_client', mongomock.MongoClient())
+    monkeypatch.setattr(db_manager, '_collections', {})
+    monkeypatch.setattr(Config, 'MONGODB_DB', 'test')
+    return db_manager._collection('alerts')
+
+
+def test_ensure_indexes_leaves_duplicate_alerts_to_the_admin_command(alerts):
+    alerts.create_index([('user_id', 1), ('filters_hash', 1)])
+    alerts.insert_many([db_manager._prepare_alert('u1', {'t': 'fixed'}) for _ in range(3)])
+    db_manager.ensure_indexes()
+    assert alerts.count_documents({}) == 3
+    assert db_manager.DUPLICATE_INDEX not in alerts.index_information()
+
+    assert db_manager.remove_duplicate_alerts() == 2
+    db_manager.ensure_indexes()
+    indexes = alerts.index_information()
+    assert db_manager.DUPLICATE_INDEX in indexes
+    assert 'user_id_1_filters_hash_1' not in indexes
+    assert alerts.count_documents({}) == 1
+
+
+def test_add_alert_returns_the_existing_duplicate(alerts):
+    db_manager.ensure_indexes()
+    alert_id = db_manager.add_alert('u1', {'t': 'fixed'})
+    assert db_manager.add_alert('u1', {'t': 'fixed'}) == alert_id
+    assert alerts.count_documents({}) == 1
+
+
+def test_add_alert_inserts_again_when_the_duplicate_is_deleted_meanwhile(alerts, monkeypatch):
+    db_manager.ensure_indexes()
+    alert_id = db_manager.add_alert('u1', {'t': 'fixed'})
+    find_one = alerts.find_one
+
+    def deleted_first(*args, **kwargs):
+        monkeypatch.setattr(alerts, 'find_one', find_one)
+        db_manager.delete_alert(alert_id)
+        return find_one(*args, **kwargs)
+
+    monkeypatch.setattr(alerts, 'find_one', deleted_first)
+    new_id = db_manager.add_alert('u1', {'t': 'fixed'})
+    assert new_id != alert_id
+    assert [str(alert['_id']) for alert in alerts.find()] == [new_id]
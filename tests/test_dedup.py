@@ -0,0 +1,45 @@
+import pytest
+
+mongomock = pytest.importorskip('mongomock')
+
+from dedup import NotifiedJobs, SeenJobs
+
+
+def keys(prefix, count):
+    return [f"{prefix}:{n}" for n in range(count)]
+
+
+def test_bloom_false_positives_do_not_suppress_notifications():
+    # A one-key Bloom filter is saturated at once, so every later lookup is a positive
+    notified = NotifiedJobs(ttl=3600, capacity=1, cache_size=1000)
+    assert notified.filter_new(keys('a', 50)) == keys('a', 50)
+    assert all(notified.filter.seen(keys('b', 50)))
+
+    assert notified.filter_new(keys('b', 50) + keys('a', 50)) == keys('b', 50)
+    assert notified.filter_new(keys('a', 50) + keys('b', 50)) == []
+
+
+def test_collection_confirms_keys_evicted_from_memory_and_survives_restart():
+    collection = mongomock.MongoClient().db.notified
+    notified = NotifiedJobs(collection, ttl=3600, capacity=1, cache_size=10)
+    assert notified.filter_new(keys('a', 50)) == keys('a', 50)
+    assert len(notified.recent) == 10
+
+    assert notified.filter_new(keys('a', 50) + ['b:0']) == ['b:0']
+    restarted = NotifiedJobs(collection, ttl=3600, capacity=1000, cache_size=10)
+    assert restarted.filter_new(keys('a', 50) + ['b:0', 'b:1']) == ['b:1']
+
+
+def test_key_claimed_by_another_worker_is_not_sent_again():
+    collection = mongomock.MongoClient().db.notified
+    ours = NotifiedJobs(collection, ttl=3600, capacity=1000)
+    theirs = NotifiedJobs(collection, ttl=3600, capacity=1000)
+    assert theirs.filter_new(['u1:job1']) == ['u1:job1']
+    # Our filter hasn't seen it, so only the insert's duplicate key error can tell
+    assert ours.filter_new(['u1:job1', 'u1:job2']) == ['u1:job2']
+
+
+def test_mark_reports_only_ids_recorded_first():
+    collection = mongomock.MongoClient().db.seen
+    SeenJobs(collection, ttl=3600, capacity=1000).mark(['a', 'b'])
+    assert SeenJobs(collection, ttl=3600, capacity=1000).mark(['b', 'c', 'a']) == ['c']
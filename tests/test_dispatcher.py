@@ -0,0 +1,120 @@
+import asyncio
+import random
+import re
+from collections import Counter
+
+import pytest
+
+pytest.importorskip('telegram')
+mongomock = pytest.importorskip('mongomock')
+
+from telegram import Bot
+from telegram.error import BadRequest
+from telegram.request import HTTPXRequest
+
+from dispatcher import NotificationDispatcher
+from synthetic import FakeBotApiHandler, fixture_server, random_job
+
+
+@pytest.fixture
+def bot_api():
+    # Often enough that even a small run is rate limited at least once
+    handler = type('BotApi', (FakeBotApiHandler,), {'rate_limit_every': 20, 'requests_seen': 0, 'messages': []})
+    server, url = fixture_server(handler)
+    yield handler, url.replace('/search', '/bot')
+    server.shutdown()
+    server.server_close()
+
+
+async def deliver(dispatcher):
+    runner = asyncio.create_task(dispatcher.run())
+    while dispatcher.queue_depth:
+        await asyncio.sleep(0.01)
+    dispatcher.stop()
+    await runner
+
+
+def test_every_job_reaches_its_chat_once(bot_api):
+    handler, url = bot_api
+    rng = random.Random(1)
+    outbox = mongomock.MongoClient().db.outbox
+    queued = [(chat_id, random_job(rng, f"{chat_id}-{n}")) for chat_id in range(60) for n in range(3)]
+
+    async def run():
+        async with Bot('123:fake', base_url=url, request=HTTPXRequest(connection_pool_size=8)) as bot:
+            dispatcher = NotificationDispatcher(bot, outbox=outbox, global_rate=1000, chat_rate=1, flush_interval=0.05)
+            await dispatcher.enqueue(queued)
+            await asyncio.wait_for(deliver(dispatcher), 30)
+            return dispatcher.stats
+
+    stats = asyncio.run(run())
+
+    delivered = Counter((int(chat_id), job_id) for chat_id, text in handler.messages
+                        for job_id in re.findall(r'/jobs/~([^"]+)"', text))
+    assert delivered == Counter((chat_id, job.id) for chat_id, job in queued)
+    # One digest per chat
+    assert len(handler.messages) == 60
+    assert stats['retried'] > 0
+    assert outbox.count_documents({}) == 0
+
+
+class _RejectFirstBot:
+    """Bot whose first send fails with BadRequest and whose later sends succeed."""
+
+    def __init__(self):
+        self.texts = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.texts.append(text)
+        if len(self.texts) == 1:
+            raise BadRequest("Can't parse entities")
+
+
+def test_rejected_digest_drops_only_its_own_jobs():
+    rng = random.Random(2)
+    outbox = mongomock.MongoClient().db.outbox
+    # Long titles, so the jobs need more than one message
+    jobs = [random_job(rng, n)._replace(title='x' * 200) for n in range(40)]
+    bot = _RejectFirstBot()
+
+    async def run():
+        dispatcher = NotificationDispatcher(bot, outbox=outbox, global_rate=1000, chat_rate=1000, flush_interval=0.01)
+        await dispatcher.enqueue((7, job) for job in jobs)
+        await asyncio.wait_for(deliver(dispatcher), 10)
+        return dispatcher.stats
+
+    stats = asyncio.run(run())
+
+    rejected = set(re.findall(r'/jobs/~([^"]+)"', bot.texts[0]))
+    delivered = [job_id for text in bot.texts[1:] for job_id in re.findall(r'/jobs/~([^"]+)"', text)]
+    assert 0 < len(rejected) < len(jobs)
+    assert sorted(delivered) == sorted(job.id for job in jobs if job.id not in rejected)
+    assert stats['failed'] == len(rejected)
+    assert stats['sent'] == len(jobs) - len(rejected)
+    assert outbox.count_documents({}) == 0
+
+
+class _RecordingBot:
+    async def send_message(self, chat_id, text, **kwargs):
+        pass
+
+
+def test_idle_chat_buckets_are_dropped():
+    rng = random.Random(3)
+
+    async def run():
+        dispatcher = NotificationDispatcher(_RecordingBot(), global_rate=1000, chat_rate=100, flush_interval=0.01)
+        await dispatcher.enqueue((chat_id, random_job(rng, chat_id)) for chat_id in range(20))
+        runner = asyncio.create_task(dispatcher.run())
+        while dispatcher.queue_depth:
+            await asyncio.sleep(0.01)
+        assert len(dispatcher.chat_buckets) == 20
+        dispatcher.BUCKET_PRUNE_INTERVAL = 0.05
+        await asyncio.sleep(0.2)
+        dispatcher.stop()
+        await runner
+        return dispatcher
+
+    dispatcher = asyncio.run(run())
+    assert dispatcher.chat_buckets == {}
+    assert dispatcher.stats['sent'] == 20
@@ -0,0 +1,150 @@
+import asyncio
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+pytest.importorskip('requests')
+
+from feed import FeedPoller, group_alerts_by_query
+from job_parser import parse_jobs
+from metrics import feed_poll_latency, feed_queries
+from synthetic import fixture_server
+
+FIXTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'fixtures', 'search_page.html')
+
+
+class _SearchHandler(BaseHTTPRequestHandler):
+    """Search page stand-in: category 1 fails with a 503, category 2 answers too slowly, the rest serve the fixture."""
+
+    protocol_version = 'HTTP/1.1'
+    etag = '"fixture-v1"'
+    body = b''
+    requests = []
+    lock = threading.Lock()
+
+    def do_GET(self):
+        params = {name: values[0] for name, values in parse_qs(urlparse(self.path).query).items()}
+        with self.lock:
+            self.requests.append((params, self.headers.get('If-None-Match')))
+        category = params.get('category2_uid')
+        if category == '1':
+            self._respond(503, b'', {'Retry-After': '120'})
+        elif category == '2':
+            time.sleep(1)
+            self._respond(200, self.body, {})
+        elif self.headers.get('If-None-Match') == self.etag:
+            self._respond(304, b'', {})
+        else:
+            self._respond(200, self.body, {'ETag': self.etag})
+
+    def _respond(self, status, body, headers):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def search():
+    with open(FIXTURE, 'rb') as f:
+        handler = type('Search', (_SearchHandler,), {'body': f.read(), 'requests': []})
+    server, url = fixture_server(handler)
+    yield handler, url
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def poller(search):
+    _, url = search
+    poller = FeedPoller(base_url=url, concurrency=4, timeout=0.3)
+    yield poller
+    poller.close()
+
+
+def test_groups_alerts_by_query():
+    alerts = [
+        {'_id': 'a', 'filters': {'category': '10', 't': 1, 'amount': [0, 99]}},
+        {'_id': 'b', 'filters': {'category': '10', 't': 1}},
+        {'_id': 'c', 'filters': {'category': '10', 't': 0}},
+        {'_id': 'd', 'filters': {}},
+    ]
+    assert group_alerts_by_query(alerts) == {('10', 1): ['a', 'b'], ('10', 0): ['c'], (None, None): ['d']}
+
+
+def test_fetches_each_query_once(search, poller):
+    handler, _ = search
+    keys = [('10', 1), ('10', 1), ('11', 0), (None, None)]
+
+    results = asyncio.run(poller.poll(keys))
+
+    assert set(results) == {('10', 1), ('11', 0), (None, None)}
+    assert parse_jobs(results[('10', 1)]), "fixture page parsed to no jobs"
+    sent = {(params.get('category2_uid'), params.get('t')) for params, _ in handler.requests}
+    assert len(handler.requests) == 3
+    assert sent == {('10', '1'), ('11', '0'), (None, None)}
+    assert all(params['sort'] == 'recency' for params, _ in handler.requests)
+    assert poller.last_cycle['queries'] == 3
+    assert poller.last_cycle['fetches'] == 3
+
+
+def test_unchanged_page_is_revalidated_with_etag(search, poller):
+    handler, _ = search
+    key = ('10', 1)
+
+    first = asyncio.run(poller.poll([key]))
+    second = asyncio.run(poller.poll([key]))
+
+    assert key in first
+    assert second == {}
+    assert poller.last_cycle['not_modified'] == 1
+    assert [etag for _, etag in handler.requests] == [None, handler.etag]
+
+
+def test_error_backs_off_and_honours_retry_after(search, poller):
+    handler, _ = search
+    key = ('1', None)
+
+    assert asyncio.run(poller.poll([key])) == {}
+    assert poller.last_cycle['errors'] == 1
+    assert poller.backoff[key] >= 120
+
+    asyncio.run(poller.poll([key]))
+    assert poller.last_cycle['skipped'] == 1
+    assert len(handler.requests) == 1
+
+
+def test_timeout_counts_as_error_without_blocking_other_queries(search, poller):
+    slow, fast = ('2', None), ('10', 1)
+
+    results = asyncio.run(poller.poll([slow, fast]))
+
+    assert list(results) == [fast]
+    assert poller.last_cycle['errors'] == 1
+    assert slow in poller.retry_at
+
+
+def test_concurrent_polls_all_reach_the_metrics(search, poller):
+    # The pipeline polls each query in its own poll() call, so last_cycle only holds whichever finished last
+    outcomes = ('changed', 'not_modified', 'error', 'skipped')
+    before = {outcome: feed_queries.labels(outcome).value for outcome in outcomes}
+    polls_before = feed_poll_latency.labels().count
+
+    async def run():
+        await poller.poll([('10', 1)])
+        await asyncio.gather(*(poller.poll([key]) for key in [('10', 1), ('11', 0), ('1', None), ('12', 0)]))
+        await poller.poll([('1', None)])
+
+    asyncio.run(run())
+    counted = {outcome: feed_queries.labels(outcome).value - before[outcome] for outcome in outcomes}
+    assert counted == {'changed': 3, 'not_modified': 1, 'error': 1, 'skipped': 1}
+    assert feed_poll_latency.labels().count - polls_before == 6
@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+pytest.importorskip('bs4')
+
+from job_parser import Job, iter_jobs_html, parse_jobs
+from synthetic import parse_with_bs4
+
+FIXTURE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'fixtures', 'search_page.html')
+
+
+@pytest.fixture(scope='module')
+def page():
+    with open(FIXTURE) as f:
+        return f.read()
+
+
+def assert_same_jobs(actual, expected):
+    assert len(actual) == len(expected)
+    for got, want in zip(actual, expected):
+        for field in Job._fields:
+            assert getattr(got, field) == getattr(want, field), f"job {want.id}: {field} differs"
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 512, 16384])
+def test_streaming_parser_matches_bs4_field_by_field(page, chunk_size):
+    chunks = [page[i:i + chunk_size] for i in range(0, len(page), chunk_size)]
+    assert_same_jobs(list(iter_jobs_html(chunks, '531770282580668418')),
+                     parse_with_bs4(page, '531770282580668418'))
+
+
+def test_fixture_covers_the_field_variants(page):
+    jobs = parse_jobs(page)
+    assert len({job.id for job in jobs}) == len(jobs) > 0
+    assert {job.t for job in jobs} == {0, 1}
+    assert {job.tier for job in jobs} == {1, 2, 3}
+    assert {job.payment_verified for job in jobs} == {True, False}
+    assert any(job.contract_to_hire for job in jobs)
+    # "Less than 5" lands in the wizard's 0-4 proposals range
+    assert min(job.proposals for job in jobs) == 0
+
+
+def test_tile_fields():
+    tile = '''
+    <article data-job-uid="42" data-posted="1718000000" data-category="7">
+      <h2><a data-test="job-title">Build a  <b>Flask</b> API</a></h2>
+      <li data-test="job-type"><strong>Hourly: $25.00 - $45.00</strong></li>
+      <li data-test="experience-level">Expert</li>
+      <div data-test="job-description"><p>Tom &amp; Jerry<br>second line</p></div>
+      <li data-test="payment-verification">Payment verified</li>
+      <li data-test="proposals">Proposals: <strong>Less than 5</strong></li>
+      <li data-test="client-hires">1,204 hires</li>
+      <span data-test="contract-to-hire">Contract-to-hire</span>
+    </article>'''
+    [job] = parse_jobs(tile, '99')
+    assert job == Job(id='42', title='Build a Flask API', description='Tom & Jerry second line', category='7',
+                      tier=3, t=0, amount=45.0, client_hires=1204, proposals=0, payment_verified=True,
+                      contract_to_hire=True, posted_at=1718000000.0)
+    assert parse_with_bs4(tile, '99') == [job]
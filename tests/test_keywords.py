@@ -0,0 +1,84 @@
+import random
+
+from keywords import KeywordIndex, evaluate, parse_keywords
+from synthetic import KEYWORD_VOCABULARY, random_keywords
+
+
+def expected(expressions, text):
+    return {alert_id for alert_id, expression in expressions.items() if evaluate(expression, text)}
+
+
+def test_parse_keywords_splits_signed_terms_and_phrases():
+    assert parse_keywords('Python, "Machine  Learning" +remote -WordPress -remote') == {
+        'any': ['machine learning', 'python'], 'all': [], 'none': ['remote', 'wordpress']}
+    assert parse_keywords(' , "" -') is None
+
+
+def test_phrases_and_suffix_phrases():
+    index = KeywordIndex()
+    expressions = {
+        'phrase': parse_keywords('"machine learning engineer"'),
+        'suffix': parse_keywords('"learning engineer"'),
+        'word': parse_keywords('engineer'),
+        'split': parse_keywords('"machine engineer"'),
+    }
+    for alert_id, expression in expressions.items():
+        index.add(alert_id, expression)
+    for text in ['Senior machine learning engineer', 'learning engineer', 'machine, engineer!', 'machine learning']:
+        assert index.match(text) == expected(expressions, text), text
+    assert index.match('Senior machine learning engineer') == {'phrase', 'suffix', 'word'}
+
+
+def test_required_and_excluded_terms():
+    index = KeywordIndex()
+    expressions = {
+        'required': parse_keywords('+python +django'),
+        'mixed': parse_keywords('flask, django +python -wordpress'),
+        'excluded': parse_keywords('-wordpress'),
+    }
+    for alert_id, expression in expressions.items():
+        index.add(alert_id, expression)
+    for text in ['python django', 'python flask wordpress', 'django only', 'nothing here', 'wordpress']:
+        assert index.match(text) == expected(expressions, text), text
+
+
+def test_adds_and_removes_after_a_scan():
+    rng = random.Random(7)
+    index = KeywordIndex()
+    expressions = {}
+    texts = [' '.join(rng.sample(KEYWORD_VOCABULARY, 6)) for _ in range(50)]
+    for round_ in range(20):
+        for i in range(rng.randint(1, 30)):
+            alert_id = f"{round_}-{i}"
+            expressions[alert_id] = parse_keywords(random_keywords(rng) + f' "{" ".join(rng.sample(KEYWORD_VOCABULARY, 2))}"')
+            index.add(alert_id, expressions[alert_id])
+        for alert_id in rng.sample(sorted(expressions), len(expressions) // 3):
+            index.remove(alert_id)
+            del expressions[alert_id]
+        for text in texts:
+            assert index.match(text) == expected(expressions, text)
+
+
+def test_unused_terms_are_not_reported_before_the_rebuild():
+    index = KeywordIndex()
+    for i in range(10):
+        index.add(str(i), parse_keywords(f'term{i} +shared'))
+    index.found_terms('')
+    for i in range(5):
+        index.remove(str(i))
+    assert 'term1' in index.term_ids
+    assert index.found_terms('term1 shared') == {index.term_ids['shared']}
+    index.add('again', parse_keywords('term1'))
+    assert index.match('term1 shared') == {'again'}
+
+
+def test_unused_terms_are_dropped():
+    index = KeywordIndex()
+    for i in range(500):
+        index.add(str(i), parse_keywords(f'term{i} +shared'))
+    index.found_terms('')
+    for i in range(500):
+        index.remove(str(i))
+    index.add('kept', parse_keywords('term1'))
+    assert index.match('term1 shared') == {'kept'}
+    assert set(index.term_ids) == {'term1'}
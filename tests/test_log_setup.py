@@ -0,0 +1,46 @@
+import json
+import logging
+import queue
+import threading
+from logging.handlers import QueueListener
+
+import log_setup
+
+
+class _Capture(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.setFormatter(log_setup.JsonFormatter())
+        self.lines = []
+        self.threads = set()
+
+    def emit(self, record):
+        self.threads.add(threading.get_ident())
+        self.lines.append(json.loads(self.format(record)))
+
+
+def test_records_are_formatted_on_the_listener_thread():
+    records = queue.SimpleQueue()
+    capture = _Capture()
+    listener = QueueListener(records, capture)
+    logger = logging.getLogger('test_log_setup')
+    logger.addHandler(log_setup._DeferredQueueHandler(records))
+    logger.propagate = False
+    listener.start()
+    try:
+        logger.warning("sent %d jobs to %s", 3, 'chat', extra={'chat_id': 7})
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            logger.exception("dispatch failed")
+    finally:
+        listener.stop()
+        logger.handlers.clear()
+
+    sent, failed = capture.lines
+    assert sent['msg'] == "sent 3 jobs to chat"
+    assert sent['chat_id'] == 7
+    assert 'exc' not in sent
+    assert failed['msg'] == "dispatch failed"
+    assert 'ZeroDivisionError' in failed['exc']
+    assert threading.get_ident() not in capture.threads
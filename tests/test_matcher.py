@@ -0,0 +1,84 @@
+import random
+
+import pytest
+
+from alert_filters import normalize_filters
+from matcher import AlertIndex, _RangeIndex, matches
+from synthetic import KEYWORD_VOCABULARY, random_filters, random_job, random_keywords
+
+
+def random_alert(rng):
+    """Wizard-style filters, with free-form ranges, keywords or no filters mixed in."""
+    roll = rng.random()
+    if roll < 0.05:
+        return normalize_filters({})
+    filters = random_filters(rng)
+    if roll < 0.3:
+        low = rng.randint(0, 200)
+        filters['amount'] = f"{low}-{low + rng.randint(0, 300)}" if rng.random() < 0.8 else f"{low}-"
+        filters['proposals'] = f"{rng.randint(0, 20)}+"
+    if rng.random() < 0.2:
+        filters['keywords'] = random_keywords(rng)
+    return normalize_filters(filters)
+
+
+def random_jobs(rng, n_jobs):
+    return [random_job(rng, i)._replace(title=' '.join(rng.sample(KEYWORD_VOCABULARY, 5))) for i in range(n_jobs)]
+
+
+def assert_matches_scan(index, alerts, jobs):
+    for job in jobs:
+        assert index.match(job) == {alert_id for alert_id, filters in alerts.items() if matches(filters, job)}
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_match_agrees_with_scalar_matcher_through_add_remove_and_readd(seed):
+    rng = random.Random(seed)
+    alerts = {str(i): random_alert(rng) for i in range(1500)}
+    jobs = random_jobs(rng, 200)
+    index = AlertIndex()
+    for alert_id, filters in alerts.items():
+        index.add(alert_id, filters)
+    assert len(index) == len(alerts)
+    assert_matches_scan(index, alerts, jobs)
+
+    removed = rng.sample(sorted(alerts), 500)
+    for alert_id in removed:
+        index.remove(alert_id)
+        del alerts[alert_id]
+    assert_matches_scan(index, alerts, jobs)
+
+    # Re-add some with their old ID but new filters, and replace others in place
+    for alert_id in removed[:250] + rng.sample(sorted(alerts), 250):
+        alerts[alert_id] = random_alert(rng)
+        index.add(alert_id, alerts[alert_id])
+    assert len(index) == len(alerts)
+    assert_matches_scan(index, alerts, jobs)
+
+
+def test_removing_every_alert_leaves_an_empty_index():
+    rng = random.Random(4)
+    index = AlertIndex()
+    for i in range(200):
+        index.add(str(i), random_alert(rng))
+    for i in range(200):
+        index.remove(str(i))
+    index.remove('unknown')
+    assert len(index) == 0
+    assert all(not index.match(job) for job in random_jobs(rng, 50))
+    assert all(not range_index.buckets for range_index in index.indexes.values() if isinstance(range_index, _RangeIndex))
+
+
+def test_range_lookup_agrees_with_scan():
+    rng = random.Random(5)
+    index, intervals = _RangeIndex(), {}
+    for i in range(2000):
+        low = rng.randint(0, 1000)
+        bounds = (low, rng.choice([low, low + rng.randint(1, 500), float('inf')]))
+        intervals[i] = bounds
+        index.add(i, bounds)
+    for i in rng.sample(range(2000), 700):
+        index.remove(i, intervals.pop(i))
+    for value in [-1, 0, 0.5, 250, 1000, 1500, 10 ** 9] + [rng.randint(0, 1600) for _ in range(200)]:
+        found = set().union(*index.lookup(value))
+        assert found == {i for i, (low, high) in intervals.items() if low <= value <= high}, value
@@ -0,0 +1,47 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+mongomock = pytest.importorskip('mongomock')
+
+from session_store import MongoSessionStore
+
+
+@pytest.fixture
+def store():
+    return MongoSessionStore(collection=mongomock.MongoClient().db.sessions, idle_timeout=60)
+
+
+def expire(store, user_id):
+    # mongomock applies TTL indexes on every read; without one this is a session the TTL monitor hasn't reached yet
+    store.collection.drop_index("touched_at_1")
+    store.collection.update_one({"_id": user_id}, {"$set": {"touched_at": datetime.now(timezone.utc) - timedelta(minutes=5)}})
+
+
+def test_fields_accumulate_in_a_live_session(store):
+    async def run():
+        await store.start(1)
+        await store.set_field(1, 't', 'fixed')
+        await store.add_to_set(1, 'categories', 'a')
+        await store.add_to_set(1, 'categories', 'a')
+        await store.set_field(2, 't', 'hourly')
+        return await store.get(1), await store.get(2)
+
+    assert asyncio.run(run()) == ({'t': 'fixed', 'categories': ['a']}, {'t': 'hourly'})
+
+
+@pytest.mark.parametrize('change', [
+    lambda store: store.set_field(1, 'amount', '100-'),
+    lambda store: store.add_to_set(1, 'amount', '100-'),
+    lambda store: store.unset_field(1, 't'),
+])
+def test_updates_to_an_expired_session_start_a_new_one(store, change):
+    async def run():
+        await store.set_field(1, 't', 'fixed')
+        expire(store, 1)
+        assert await store.get(1) == {}
+        await change(store)
+        return await store.get(1)
+
+    assert 't' not in asyncio.run(run())
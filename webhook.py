@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import threading
+import time
+
+from telegram import Update
+
+from config import Config
+from metrics import queue_depth
+
+logger = logging.getLogger(__name__)
+
+
+def update_chat_id(update):
+    """The chat an update belongs to, used to keep each chat's updates in order."""
+    chat = update.effective_chat
+    if chat is not None:
+        return chat.id
+    user = update.effective_user
+    return user.id if user is not None else update.update_id
+
+
+class UpdatePipeline:
+    """Processes updates concurrently on a fixed pool of workers while keeping per-chat order.
+
+    Every chat is pinned to one worker by its ID, so two updates from the same
+    chat never run at once or out of order, while different chats proceed in
+    parallel. Each worker queue is bounded; submit() reports a full queue so
+    the webhook can answer 503 and let Telegram redeliver later.
+    """
+
+    def __init__(self, application, workers=None, queue_size=None):
+        self.application = application
+        self.workers = workers or Config.WEBHOOK_WORKERS
+        self.queue_size = queue_size or Config.WEBHOOK_QUEUE_SIZE
+        self.queues = []
+        self.tasks = []
+        self.processed = 0
+        self.failed = 0
+
+    @property
+    def queue_depth(self):
+        return sum(queue.qsize() for queue in self.queues)
+
+    async def start(self):
+        self.queues = [asyncio.Queue(self.queue_size) for _ in range(self.workers)]
+        queue_depth.labels('webhook_updates').set_function(lambda: self.queue_depth)
+        self.tasks = [asyncio.create_task(self._work(queue)) for queue in self.queues]
+
+    async def stop(self):
+        """Finish queued updates, then stop the workers."""
+        for queue in self.queues:
+            await queue.join()
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    def submit(self, update):
+        """Queue an update for its chat's worker; returns False if that worker is saturated."""
+        queue = self.queues[update_chat_id(update) % self.workers]
+        try:
+            queue.put_nowait((update, time.monotonic()))
+        except asyncio.QueueFull:
+            return False
+        return True
+
+    async def _work(self, queue):
+        while True:
+            update, _ = await queue.get()
+            try:
+                await self.application.process_update(update)
+                self.processed += 1
+            except Exception:
+                self.failed += 1
+                logger.exception("Failed to process update %s", update.update_id)
+            finally:
+                queue.task_done()
+
+
+class WebhookServer:
+    """Runs the bot application and its UpdatePipeline on an event loop in a background thread.
+
+    The WSGI app (app.py) hands incoming webhook payloads to ``feed()`` from
+    its request threads.
+    """
+
+    def __init__(self, application, workers=None, queue_size=None):
+        self.application = application
+        self.pipeline = UpdatePipeline(application, workers, queue_size)
+        self.loop = asyncio.new_event_loop()
+        self.ready = threading.Event()
+        self.thread = None
+
+    def start(self, webhook_url=None, secret_token=None):
+        """Start the loop thread, initialize the bot and register the webhook URL with Telegram."""
+        self.thread = threading.Thread(target=self.loop.run_forever, name="webhook-loop", daemon=True)
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(webhook_url, secret_token), self.loop).result()
+        self.ready.set()
+
+    async def _start(self, webhook_url, secret_token):
+        await self.application.initialize()
+        await self.application.start()
+        await self.pipeline.start()
+        if webhook_url:
+            await self.application.bot.set_webhook(webhook_url, secret_token=secret_token,
+                                                   max_connections=self.pipeline.workers)
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self._stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.ready.clear()
+
+    async def _stop(self):
+        await self.pipeline.stop()
+        await self.application.stop()
+        await self.application.shutdown()
+
+    def feed(self, payload):
+        """Hand a decoded webhook payload to the pipeline; returns False when it must be retried."""
+        update = Update.de_json(payload, self.application.bot)
+        return asyncio.run_coroutine_threadsafe(self._submit(update), self.loop).result()
+
+    async def _submit(self, update):
+        return self.pipeline.submit(update)
+
+    def health(self):
+        return {
+            "ready": self.ready.is_set(),
+            "queue_depth": self.pipeline.queue_depth,
+            "processed": self.pipeline.processed,
+            "failed": self.pipeline.failed,
+        }